@@ -0,0 +1,121 @@
+import os
+import json
+import queue
+import threading
+
+from utils import CACHE_DIR
+from results_store import row_key
+
+#
+# 2.4 КОНТРОЛЬНІ ТОЧКИ ДЛЯ ВІДНОВЛЕННЯ ПЕРЕРВАНОГО ЗАПУСКУ
+#
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(CACHE_DIR, "checkpoint.jsonl")
+# Фоновий запис: скидаємо файл на диск після стількох записів або стількох секунд без нових
+CHECKPOINT_FLUSH_EVERY = 50
+CHECKPOINT_FLUSH_INTERVAL = 2.0
+
+_STOP = object()
+
+
+class Checkpoint:
+    """Файл контрольних точок: результат кожного завершеного рядка дописується одним JSON-рядком.
+       record() лише ставить результат у чергу — серіалізацію і запис виконує фоновий потік,
+       тож цикл перевірки не чекає на диск. Після збою --resume бере звідси вже перевірені рядки.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        self._queue = queue.Queue()
+        self._thread = None
+        self.written = 0
+
+    def load(self):
+        """Повертає збережені результати {row_key: результат}; обірваний останній рядок файлу пропускається."""
+        checkpointed = {}
+        if not self.path or not os.path.exists(self.path):
+            return checkpointed
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue # Рядок, недописаний через аварійне завершення
+                    checkpointed[record["key"]] = record["result"]
+        except OSError as e:
+            print(f"⚠️ Не вдалося прочитати контрольні точки ({self.path}): {e}")
+        return checkpointed
+
+    def fill(self, rows_data, results, pending, checkpointed=None):
+        """Заповнює results для рядків з pending, які вже є в контрольних точках. Повертає решту pending.
+           checkpointed — уже завантажені load() записи (щоб не читати файл для кожної частини таблиці).
+        """
+        if checkpointed is None:
+            checkpointed = self.load()
+        remaining = []
+        for index in pending:
+            stored = checkpointed.get(row_key(rows_data[index]))
+            if stored is None:
+                remaining.append(index)
+                continue
+            # Копія: той самий запис може знадобитися кільком рядкам з однаковим вмістом
+            results[index] = {**stored, **rows_data[index]}
+        return remaining
+
+    def start(self, resume=False):
+        """Запускає фоновий запис. resume=False починає файл заново, resume=True дописує в нього."""
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            f = open(self.path, "a" if resume else "w", encoding="utf-8")
+        except OSError as e:
+            print(f"⚠️ Не вдалося відкрити файл контрольних точок ({self.path}): {e}. Продовжуємо без них.")
+            return
+        self._thread = threading.Thread(target=self._write_loop, args=(f,), name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, row_info, result):
+        """Додає результат рядка до черги запису (не блокує)."""
+        if self._thread is not None:
+            self._queue.put((row_info, result))
+
+    def _write_loop(self, f):
+        unflushed = 0
+        with f:
+            while True:
+                try:
+                    item = self._queue.get(timeout=CHECKPOINT_FLUSH_INTERVAL)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if item is not None:
+                    row_info, result = item
+                    try:
+                        f.write(json.dumps({"key": row_key(row_info), "result": result},
+                                           ensure_ascii=False, default=str) + "\n")
+                        self.written += 1
+                        unflushed += 1
+                    except (OSError, TypeError, ValueError) as e:
+                        print(f"⚠️ Не вдалося записати контрольну точку: {e}")
+                if unflushed and (item is None or unflushed >= CHECKPOINT_FLUSH_EVERY):
+                    f.flush()
+                    unflushed = 0
+
+    def close(self):
+        """Дописує все з черги і зупиняє фоновий запис."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def remove(self):
+        """Видаляє файл після успішного завершення запуску (наступний --resume не матиме що відновлювати)."""
+        if self.path and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                print(f"⚠️ Не вдалося видалити контрольні точки ({self.path}): {e}")
@@ -0,0 +1,157 @@
+import time
+import socket
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from urllib3.util import connection
+
+#
+# 3.2 ПОПЕРЕДНЄ ВИЗНАЧЕННЯ DNS І КЕШ РЕЗОЛВЕРА
+#
+
+DEFAULT_DNS_TTL = 300        # Секунди, протягом яких визначена адреса використовується без нового запиту
+# Секунди, протягом яких хост, якого не існує (NXDOMAIN), не визначається знову. Хости, знайдені
+# відсутніми на попередньому етапі, тримаються в кеші до кінця перевірки (release_missing)
+DEFAULT_DNS_NEGATIVE_TTL = 30
+DEFAULT_DNS_WORKERS = 32     # Скільки хостів визначається одночасно під час попереднього етапу
+# Тимчасові помилки резолвера не кешуються: наступний запит спробує ще раз
+TEMPORARY_DNS_ERRORS = {socket.EAI_AGAIN}
+
+# Системний резолвер, запам'ятований під час імпорту
+_system_getaddrinfo = socket.getaddrinfo
+
+
+class DnsCache:
+    """Кеш DNS у процесі: адреси хостів визначаються одним паралельним етапом до початку перевірки,
+       а з'єднання спільного HTTP-пулу відкриваються до вже визначених адрес (create_connection).
+       Хости, яких не існує, кешуються на коротший negative_ttl, а знайдені попереднім етапом — до
+       release_missing, тобто до кінця перевірки: запити до них завершуються помилкою одразу, без з'єднання
+       і без очікування резолвера, хоч би як довго рядки чекали своєї черги. getaddrinfo не повертає TTL записів,
+       тому використовується фіксований ttl. Решта процесу (інші бібліотеки, потоки) кешем не користується.
+    """
+
+    def __init__(self, ttl=DEFAULT_DNS_TTL, workers=DEFAULT_DNS_WORKERS, resolver=None, negative_ttl=DEFAULT_DNS_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = min(ttl, negative_ttl)
+        self.workers = workers
+        self._resolver = resolver or _system_getaddrinfo
+        self._entries = {}    # host -> (час закінчення, [(family, ip)] або socket.gaierror)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, host, keep_missing=False):
+        """Повертає адреси хосту [(family, ip)] з кешу або резолвера; для неіснуючого хосту кидає socket.gaierror.
+           keep_missing=True — відсутність хосту кешується до release_missing, а не на negative_ttl.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            cached = entry is not None and entry[0] > now
+            if cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached:
+            answer = entry[1]
+        else:
+            try:
+                infos = self._resolver(host, None, 0, socket.SOCK_STREAM)
+                answer = list(dict.fromkeys((info[0], info[4][0]) for info in infos))
+            except socket.gaierror as e:
+                if e.errno in TEMPORARY_DNS_ERRORS:
+                    raise
+                answer = e
+            if not isinstance(answer, socket.gaierror):
+                expires = now + self.ttl
+            else:
+                expires = float("inf") if keep_missing else now + self.negative_ttl
+            with self._lock:
+                self._entries[host] = (expires, answer)
+        if isinstance(answer, socket.gaierror):
+            raise answer
+        return answer
+
+    def prefetch(self, hosts):
+        """Паралельно визначає адреси hosts. Повертає (missing, failed): хости, яких не існує (тримаються
+           в кеші до release_missing), і хости, які не вдалося визначити через тимчасову чи іншу помилку
+           (не кешуються — запит спробує ще раз).
+        """
+        hosts = [host for host in set(hosts) if host and not is_ip_address(host)]
+
+        def resolve_quietly(host):
+            try:
+                self.resolve(host, keep_missing=True)
+                return None
+            except socket.gaierror as e:
+                return "failed" if e.errno in TEMPORARY_DNS_ERRORS else "missing"
+            except UnicodeError:
+                return "failed"
+
+        missing, failed = set(), set()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(hosts) or 1))) as executor:
+            for host, outcome in zip(hosts, executor.map(resolve_quietly, hosts)):
+                if outcome == "missing":
+                    missing.add(host)
+                elif outcome == "failed":
+                    failed.add(host)
+        return missing, failed
+
+    def release_missing(self):
+        """Відсутні хости, збережені попереднім етапом, відтепер живуть у кеші звичайні negative_ttl секунд."""
+        expires = time.monotonic() + self.negative_ttl
+        with self._lock:
+            for host, (entry_expires, answer) in self._entries.items():
+                if entry_expires == float("inf"):
+                    self._entries[host] = (expires, answer)
+
+    def create_connection(self, address, timeout, source_address=None, socket_options=None):
+        """Аналог urllib3.util.connection.create_connection: ім'я хосту — з кешу, з'єднання — до його IP по черзі.
+           Для неіснуючого хосту кидає socket.gaierror, як і системний резолвер.
+        """
+        host, port = address
+        if is_ip_address(host):
+            return connection.create_connection(address, timeout, source_address=source_address, socket_options=socket_options)
+        last_error = None
+        for _, ip in self.resolve(host):
+            try:
+                # Числова адреса розбирається без звернення до DNS
+                return connection.create_connection((ip, port), timeout, source_address=source_address,
+                                                    socket_options=socket_options)
+            except OSError as e:
+                last_error = e
+        raise last_error or socket.gaierror(socket.EAI_NONAME, f"Немає адрес для {host}")
+
+
+def is_ip_address(host):
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+
+_shared_cache = None
+_dns_enabled = True
+_shared_cache_lock = threading.Lock()
+
+
+def get_dns_cache():
+    """Повертає спільний кеш DNS (створює під час першого звернення) або None, якщо попереднє визначення вимкнено."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if not _dns_enabled:
+            return None
+        if _shared_cache is None:
+            _shared_cache = DnsCache()
+        return _shared_cache
+
+
+def configure_dns_cache(ttl=DEFAULT_DNS_TTL, workers=DEFAULT_DNS_WORKERS, enabled=True, negative_ttl=DEFAULT_DNS_NEGATIVE_TTL):
+    """Замінює спільний кеш DNS новим. enabled=False — без попереднього етапу і без кешу (звичайний резолвер)."""
+    global _shared_cache, _dns_enabled
+    with _shared_cache_lock:
+        _dns_enabled = enabled
+        _shared_cache = DnsCache(ttl=ttl, workers=workers, negative_ttl=negative_ttl) if enabled else None
+        return _shared_cache
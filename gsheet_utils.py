@@ -1,18 +1,30 @@
-import pandas as pd
 import gspread
 import ast
+import json
+import time
+import queue
+import threading
 from urllib.parse import unquote
-from google.colab import auth
 from google.auth import default
 
-from utils import extract_sheet_params, normalize_url
+from utils import extract_sheet_params, normalize_url, get_link_pair_numbers
+from sheets_client import get_sheets_client, SheetsWriteError
 
 #
 # 4. ФУНКЦІЇ РОБОТИ З GOOGLE SHEETS
 #
+
+DEFAULT_READ_CHUNK_ROWS = 5000 # Скільки рядків таблиці читається одним запитом і перевіряється за раз
+# Стовпці, порожні комірки яких роблять рядок непридатним для перевірки
+MANDATORY_HEADERS = ["Анкор-1", "Урл-1", "Url"]
+
 def check_sheet_structure(google_sheet):
-    """Перевіряє структуру Google таблиці."""
+    """Перевіряє структуру Google таблиці за рядком заголовків. Дані не читаються: рядки віддає iter_sheet_rows,
+       а порожні обов'язкові комірки в кожній частині знаходить find_missing_data — тож таблиця читається один раз.
+    """
     print("Авторизуємося в Google...")
+    # google.colab є лише в Colab: імпортуємо під час авторизації, щоб решту модуля можна було використовувати поза ним
+    from google.colab import auth
     auth.authenticate_user()
 
     try:
@@ -24,23 +36,25 @@ def check_sheet_structure(google_sheet):
 
         sheet_id, gid = sheet_params
         gc = gspread.authorize(default()[0])
-        sheet = gc.open_by_key(sheet_id)
+        # Усі звернення до API — через спільний клієнт з квотами і повторами на 429
+        client = get_sheets_client()
+        sheet = client.read(gc.open_by_key, sheet_id)
 
         # Отримання потрібної вкладки за gid
-        all_worksheets = sheet.worksheets()
-        worksheet = next((ws for ws in all_worksheets if ws.id == gid), None) or sheet.get_worksheet(0)
+        all_worksheets = client.read(sheet.worksheets)
+        worksheet = next((ws for ws in all_worksheets if ws.id == gid), None) or client.read(sheet.get_worksheet, 0)
         print(f"{'Використовуємо вкладку: '+worksheet.title if worksheet.id == gid else f'Увага: Вкладка з gid={gid} не знайдена, використовуємо першу вкладку'}")
 
-        # Перевірка даних та заголовків
-        data = worksheet.get_all_values()
-        if not data:
+        # Перевірка заголовків: спершу читаємо лише перший рядок
+        actual_headers = [h if h is not None else "" for h in client.read(worksheet.row_values, 1)]
+        if not actual_headers:
             return {"success": False, "error": "Таблиця порожня"}
 
         # Основні обов'язкові заголовки
-        mandatory_headers = ["Анкор-1", "Урл-1", "Url"]
-        # Усі очікувані заголовки, включаючи опціональні
-        all_expected_headers_prefix = ["Анкор-1", "Урл-1", "Анкор-2", "Урл-2", "Анкор-3", "Урл-3", "Url"]
-        actual_headers = data[0]
+        mandatory_headers = MANDATORY_HEADERS
+        # Усі очікувані заголовки, включаючи опціональні пари Анкор-N/Урл-N
+        all_expected_headers_prefix = [header for number in get_link_pair_numbers(actual_headers)
+                                       for header in (f"Анкор-{number}", f"Урл-{number}")] + ["Url"]
 
         # Перевіряємо наявність і порядок основних обов'язкових заголовків
         missing_mandatory = [h for h in mandatory_headers if h not in actual_headers]
@@ -59,7 +73,7 @@ def check_sheet_structure(google_sheet):
              return {"success": False, "error": "Відсутній обов'язковий заголовок 'Url'", "actual_headers": actual_headers}
 
         # Перевіряємо, чи перші стовпці (до 'Url') відповідають очікуваному префіксу,
-        # враховуючи, що Анкор/Урл 2 і 3 можуть бути відсутніми
+        # враховуючи, що пари Анкор/Урл, починаючи з 2-ї, можуть бути відсутніми
         expected_prefix_found = True
         current_expected_index = 0
         for i in range(url_index_actual): # Перебираємо стовпці до 'Url'
@@ -89,271 +103,477 @@ def check_sheet_structure(google_sheet):
         if extra_cols:
             print(f"Знайдено додаткові стовпці після 'Url': {', '.join(extra_cols)}. Вони будуть проігноровані при обробці.")
 
-        # Перевірка обов'язкових даних (тільки для Анкор-1, Урл-1, Url)
-        df = pd.DataFrame(data[1:], columns=actual_headers) # Використовуємо актуальні заголовки
-        missing_data = {col: idxs for col in mandatory_headers
-                      if col in df.columns and (idxs := [i+2 for i in df[df[col].isin(["", None])].index.tolist()])}
-
         return {
-            "success": not missing_data,
-            "error" if missing_data else "message": f"Відсутні дані в обов'язкових стовпцях: {missing_data}" if missing_data else "Таблиця має правильну структуру.",
-            "data": data,
+            "success": True,
+            "message": "Таблиця має правильну структуру.",
+            "headers": actual_headers,
             "worksheet": worksheet
         }
 
     except Exception as e:
         return {"success": False, "error": f"Помилка: {str(e)}"}
 
-def update_sheet_with_results(worksheet, results):
-    """Оновлює Google таблицю результатами перевірок URL та посилань."""
-    print("\n\n📝 ЗБЕРЕЖЕННЯ РЕЗУЛЬТАТІВ У GOOGLE ТАБЛИЦЮ...\n")
-
-    sheet_data = worksheet.get_all_values()
-    headers = sheet_data[0] if sheet_data else []
-    if not headers:
-        print("⚠️ Помилка: Не вдалося прочитати заголовки з таблиці.")
-        return
-
-    # Визначаємо індекс стовпця "Url"
-    try:
-        url_index = headers.index("Url")
-    except ValueError:
-        print(f"⚠️ Помилка: Стовпець 'Url' не знайдено в заголовках: {headers}")
-        return
-
+def find_missing_data(headers, first_row, rows):
+    """Порожні комірки обов'язкових стовпців (Анкор-1, Урл-1, Url) у частині rows, що починається з рядка
+       first_row: {стовпець: [номери рядків]}, лише стовпці з пропусками.
+    """
+    missing_data = {}
+    for col in MANDATORY_HEADERS:
+        col_idx = headers.index(col)
+        idxs = [row_idx for row_idx, row in enumerate(rows, first_row) if row[col_idx] in ("", None)]
+        if idxs:
+            missing_data[col] = idxs
+    return missing_data
+
+def _link_result_headers(number):
+    """Заголовки стовпців результатів для пари Анкор-N/Урл-N."""
+    return [f"Урл-{number} наявність", f"Анкор-{number} співпадає", f"Урл-{number} rel"]
+
+def _result_headers(headers):
+    """Заголовки стовпців результатів для таблиці з заголовками headers і номери пар, що перевіряються."""
     # Базові заголовки результатів (завжди додаються/перевіряються)
     base_result_headers = [
         "Status Code", "Final Redirect URL", "Final Status Code",
         "Robots.txt", "Meta Robots/X-Robots-Tag", "Canonical",
-        "Урл-1 наявність", "Анкор-1 співпадає", "Урл-1 rel",
     ]
-    
-    # Перевіряємо наявність вхідних стовпців для пар 2 і 3
-    has_input_pair2 = "Анкор-2" in headers and "Урл-2" in headers
-    has_input_pair3 = "Анкор-3" in headers and "Урл-3" in headers
-    
+
+    # Пара 1 перевіряється завжди, решта — якщо в таблиці є обидва вхідні стовпці Анкор-N і Урл-N
+    link_pair_numbers = [number for number in get_link_pair_numbers(headers, min_pairs=1)
+                         if number == 1 or (f"Анкор-{number}" in headers and f"Урл-{number}" in headers)]
+
     # Формуємо список необхідних заголовків результатів
     required_headers = list(base_result_headers) # Починаємо з базових
-    if has_input_pair2:
-        required_headers.extend([
-            "Урл-2 наявність", "Анкор-2 співпадає", "Урл-2 rel"
-        ])
-    if has_input_pair3:
-         required_headers.extend([
-             "Урл-3 наявність", "Анкор-3 співпадає", "Урл-3 rel"
-         ])
-
-    new_headers = []
-    header_indices = {} # Словник для зберігання індексів ВСІХ потрібних стовпців
-
-    # Заповнюємо індекси існуючих стовпців (включаючи "Url")
-    for i, h in enumerate(headers):
-        if h in required_headers or h == "Url":
-            header_indices[h] = i
-
-    # Додаємо нові заголовки (тільки ті, що потрібні і відсутні) і оновлюємо індекси
-    current_col_index = len(headers)
-    for header in required_headers:
-        if header not in headers:
-            new_headers.append(header)
-            headers.append(header) # Оновлюємо локальний список заголовків
-            header_indices[header] = current_col_index
-            current_col_index += 1
-
-    # Оновлюємо заголовки в таблиці, якщо додалися нові
-    if new_headers:
-        print(f"Додаємо нові заголовки: {', '.join(new_headers)}")
-        # Визначаємо діапазон для оновлення заголовків (весь перший рядок)
-        header_range = f"A1:{gspread.utils.rowcol_to_a1(1, len(headers))[:-1]}1" # Використовуємо оновлену довжину headers
-        worksheet.update(values=[headers], range_name=header_range)
-        # Перечитуємо дані, щоб мати актуальну кількість стовпців для подальших оновлень
-        sheet_data = worksheet.get_all_values()
-        # Перезаповнюємо індекси, оскільки стовпці могли додатись
-        header_indices = {}
-        for i, h in enumerate(headers): # Використовуємо оновлені headers з таблиці
-            if h in required_headers or h == "Url":
-                 header_indices[h] = i
-
-    print(f"Збираємо дані для оновлення {len(results)} URL...")
+    for number in link_pair_numbers:
+        required_headers.extend(_link_result_headers(number))
+    return required_headers, link_pair_numbers
+
+def _input_columns(headers):
+    """Вхідні стовпці перевірки: пари Анкор-N/Урл-N і Url."""
+    return {f"{prefix}-{number}" for number in get_link_pair_numbers(headers) for prefix in ("Анкор", "Урл")} | {"Url"}
+
+def _read_rows(client, worksheet, headers, column_names, first_row, last_row):
+    """Читає рядки first_row..last_row лише зі стовпців column_names (один запит на всі проміжки стовпців).
+       Решта стовпців не завантажуються і в рядках лишаються порожніми. Повертає рядки довжиною len(headers)
+       без кінцевих порожніх рядків діапазону, як get_all_values.
+    """
+    spans = _column_spans(i for i, h in enumerate(headers) if h in column_names)
+    ranges = [f"{gspread.utils.rowcol_to_a1(first_row, first + 1)}:{gspread.utils.rowcol_to_a1(last_row, last + 1)}"
+              for first, last in spans]
+    value_ranges = client.read(worksheet.batch_get, ranges) if ranges else []
+    row_count = max((len(values) for values in value_ranges), default=0)
+    rows = []
+    for row_offset in range(row_count):
+        row = [""] * len(headers)
+        for (first, _), values in zip(spans, value_ranges):
+            if row_offset < len(values):
+                for col_offset, value in enumerate(values[row_offset]):
+                    row[first + col_offset] = value
+        rows.append(row)
+    return rows
+
+def iter_sheet_rows(worksheet, headers, chunk_rows=DEFAULT_READ_CHUNK_ROWS, column_names=None, client=None):
+    """Читає рядки даних частинами по chunk_rows і віддає їх по одній: (номер першого рядка, рядки).
+       column_names — які стовпці читати (типово вхідні стовпці і стовпці результатів).
+       У пам'яті одночасно лише одна частина; порожні рядки між даними зберігаються, як у get_all_values.
+       Читання закінчується на першій повністю порожній частині: порожній хвіст сітки (до row_count)
+       не читається, а проміжок завдовжки в цілу частину вважається кінцем даних.
+    """
+    client = client or get_sheets_client()
+    if column_names is None:
+        column_names = _input_columns(headers) | set(_result_headers(headers)[0])
+    gap_start = None # Порожні рядки в кінці попередньої частини: віддаються, лише якщо далі ще є дані
+    for first_row in range(2, worksheet.row_count + 1, chunk_rows):
+        last_row = min(worksheet.row_count, first_row + chunk_rows - 1)
+        rows = _read_rows(client, worksheet, headers, column_names, first_row, last_row)
+        if not rows:
+            return
+        start = first_row
+        if gap_start is not None:
+            rows = [[""] * len(headers) for _ in range(first_row - gap_start)] + rows
+            start = gap_start
+        yield start, rows
+        next_row = start + len(rows)
+        gap_start = next_row if next_row <= last_row else None
+
+# Фоновий запис: пакет результатів надсилається після стількох рядків або стількох секунд від першого в пакеті
+WRITE_FLUSH_ROWS = 200
+WRITE_FLUSH_INTERVAL = 30.0
+_STOP = object()
+# Службові записи черги фонового запису: реєстрація рядків знімка і їх звільнення
+_ADD_ROWS = object()
+_RELEASE_ROWS = object()
+def _column_spans(col_indices):
+    """Розбиває індекси стовпців на суцільні проміжки [(перший, останній)]."""
+    spans = []
+    for col_idx in sorted(set(col_indices)):
+        if spans and col_idx == spans[-1][1] + 1:
+            spans[-1][1] = col_idx
+        else:
+            spans.append([col_idx, col_idx])
+    return [tuple(span) for span in spans]
+
+def _pack_blocks(row_targets):
+    """Пакує змінені комірки {row_idx: {col_idx: value}} у прямокутники: серія рядків поспіль з однаковим
+       набором стовпців × кожен суцільний проміжок цих стовпців. Прямокутники містять лише змінені комірки,
+       тож решта таблиці (зокрема правки користувача під час перевірки) не перезаписується.
+       Повертає [(A1-діапазон, values)].
+    """
+    runs = []
+    for row_idx in sorted(row_targets):
+        columns = sorted(row_targets[row_idx])
+        if runs and row_idx == runs[-1][0][-1] + 1 and columns == runs[-1][1]:
+            runs[-1][0].append(row_idx)
+        else:
+            runs.append(([row_idx], columns))
+    blocks = []
+    for run, columns in runs:
+        for first_col, last_col in _column_spans(columns):
+            values = [[str(row_targets[row_idx][col_idx]) for col_idx in range(first_col, last_col + 1)] for row_idx in run]
+            range_name = (f"{gspread.utils.rowcol_to_a1(run[0], first_col + 1)}:"
+                          f"{gspread.utils.rowcol_to_a1(run[-1], last_col + 1)}")
+            blocks.append((range_name, values))
+    return blocks
+
+def _write_blocks(client, worksheet, blocks):
+    """Надсилає блоки через клієнт Sheets API якомога меншою кількістю викликів values_batch_update.
+       Повертає (кількість викликів, надіслано байтів); незаписані блоки — SheetsWriteError, інші помилки — як є.
+    """
+    entries = [{"range": gspread.utils.absolute_range_name(worksheet.title, range_name), "values": values}
+               for range_name, values in blocks]
+    return client.batch_write(worksheet.spreadsheet, entries)
+
+def _range_rows(range_names):
+    """Номери рядків, які охоплюють A1-діапазони (з назвою аркуша або без)."""
+    rows = set()
+    for range_name in range_names:
+        first, _, last = range_name.rsplit("!", 1)[-1].partition(":")
+        first_row = gspread.utils.a1_to_rowcol(first)[0]
+        last_row = gspread.utils.a1_to_rowcol(last or first)[0]
+        rows.update(range(first_row, last_row + 1))
+    return rows
+
+def _result_row_updates(result, original_url, header_indices, link_pair_numbers):
+    """Значення стовпців результатів для одного результату перевірки: {col_index: value}."""
+    row_updates = {} # Оновлення для поточного рядка [col_index] = value
+
+    # --- Оновлення для базових полів ---
+    # (Status Code, Final URL, Final Status, Robots, Meta, Canonical) - ця логіка залишається
+    has_redirects = len(result.get("redirect_chain", [])) > 0
+    # Status Code / Final Status Code / Final Redirect URL
+    if has_redirects:
+        if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = "Redirect"
+        if "Final Redirect URL" in header_indices and result.get("final_url") and result["final_url"] != original_url:
+             row_updates[header_indices["Final Redirect URL"]] = result["final_url"]
+        else:
+             if "Final Redirect URL" in header_indices: row_updates[header_indices["Final Redirect URL"]] = "" # Очищаємо, якщо URL такий самий
+        if "Final Status Code" in header_indices and result.get("final_status_code") is not None:
+             row_updates[header_indices["Final Status Code"]] = str(result["final_status_code"])
+    elif "status_code" in result and result.get("status_code") is not None:
+         if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = str(result["status_code"])
+         # Якщо не було редиректів, очищуємо Final URL та Final Status
+         if header_indices.get("Final Redirect URL"):
+             row_updates[header_indices["Final Redirect URL"]] = ""
+         if header_indices.get("Final Status Code"):
+             row_updates[header_indices["Final Status Code"]] = ""
+    elif result.get("error"): # Якщо була помилка запиту (не редирект і не успішний статус)
+        if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = "Error" # Або result["error"]?
+        if header_indices.get("Final Redirect URL"): row_updates[header_indices["Final Redirect URL"]] = ""
+        if header_indices.get("Final Status Code"): row_updates[header_indices["Final Status Code"]] = ""
+
+
+    # Robots.txt
+    if "Robots.txt" in header_indices:
+         robots_disallowed = []
+         if result.get("robots_star_allowed") is False: robots_disallowed.append("*")
+         if result.get("robots_googlebot_allowed") is False: robots_disallowed.append("Googlebot")
+         row_updates[header_indices["Robots.txt"]] = f"Заборонено ({', '.join(robots_disallowed)})" if robots_disallowed else ""
+
+    # Meta Robots/X-Robots-Tag
+    if "Meta Robots/X-Robots-Tag" in header_indices:
+         if dr := result.get("indexing_directives"):
+             tags = []
+             if dr.get("noindex"): tags.append("noindex")
+             if dr.get("nofollow"): tags.append("nofollow")
+             if tags and dr.get("source"):
+                 row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = f"{dr['source']}: {', '.join(tags)}"
+             else:
+                  row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = "" # Очищаємо, якщо немає тегів або джерела
+         else:
+              row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = "" # Очищаємо, якщо немає директив
+
+    # Canonical
+    if "Canonical" in header_indices:
+         if canon_url := result.get("canonical_url"):
+             decoded_canon = unquote(canon_url)
+             target_url_to_compare = result.get("final_url") if has_redirects else normalize_url(original_url)
+             decoded_target = unquote(target_url_to_compare) if target_url_to_compare else ""
+             # Записуємо тільки якщо відрізняється і не порожній
+             row_updates[header_indices["Canonical"]] = canon_url if canon_url and decoded_canon != decoded_target else ""
+         else:
+              row_updates[header_indices["Canonical"]] = "" # Очищаємо, якщо немає
+
+    # --- Оновлення для полів перевірки посилань (з перевірками) ---
+    for number in link_pair_numbers:
+        found_header, match_header, rel_header = _link_result_headers(number)
+        # Записуємо результати посилань тільки якщо була перевірка (статус 200) і для пари були дані
+        # (пара 1 завжди перевіряється); інакше очищаємо поля пари
+        if result.get("final_status_code") == 200 and (number == 1 or (result.get(f"Анкор-{number}") and result.get(f"Урл-{number}"))):
+            rel_value = result.get(f"url{number}_rel")
+            pair_values = {
+                found_header: result.get(f"url{number}_found", "Ні"),
+                match_header: result.get(f"anchor{number}_match", "Ні"),
+                rel_header: rel_value if rel_value is not None else ""
+            }
+        else:
+            pair_values = {found_header: "", match_header: "", rel_header: ""}
+        for header, value in pair_values.items():
+            if header in header_indices: row_updates[header_indices[header]] = value
+    return row_updates
+
+class SheetResultWriter:
+    """Запис результатів у таблицю. start()/record()/close() — фоновий споживач: завершені рядки
+       збираються в черзі і записуються пакетами раз на flush_rows рядків або flush_interval секунд,
+       тож запис у таблицю йде паралельно з перевіркою, а збій не втрачає вже записане.
+       write() — той самий запис синхронно для готового списку результатів.
+       Зміни визначаються відносно знімка рядків, зробленого до їх перевірки: увесь sheet_data одразу
+       або частинами через add_rows(); release_rows() звільняє частину, щойно її результати записано.
+    """
+
+    def __init__(self, worksheet, sheet_data=None, flush_rows=WRITE_FLUSH_ROWS, flush_interval=WRITE_FLUSH_INTERVAL,
+                 client=None, headers=None):
+        self.worksheet = worksheet
+        self.client = client or get_sheets_client()
+        self.sheet_data = sheet_data
+        self.headers = headers
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.ready = False
+        self.api_calls = 0
+        self.api_bytes = 0
+        self.changed_cells = 0
+        self.updated_rows = 0
+        self.failed_rows = 0 # Рядки, зміни яких не записано через неочікувану помилку
+        self.not_found_urls = []
+        self._rows = {}    # Знімок зареєстрованих рядків: {row_idx: рядок}
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def prepare(self):
+        """Знаходить (і за потреби додає) стовпці результатів. Повертає False, якщо записувати нікуди.
+           Без sheet_data і headers таблиця читається повністю.
+        """
+        if self.sheet_data is None and self.headers is None:
+            self.sheet_data = self.client.read(self.worksheet.get_all_values)
+        sheet_data = self.sheet_data
+        # Копія рядка заголовків: нові стовпці додаються локально, не змінюючи знімок викликача
+        headers = list(self.headers if self.headers is not None else (sheet_data[0] if sheet_data else []))
+        if not headers:
+            print("⚠️ Помилка: Не вдалося прочитати заголовки з таблиці.")
+            return False
+
+        # Визначаємо індекс стовпця "Url"
+        try:
+            url_index = headers.index("Url")
+        except ValueError:
+            print(f"⚠️ Помилка: Стовпець 'Url' не знайдено в заголовках: {headers}")
+            return False
+
+        required_headers, link_pair_numbers = _result_headers(headers)
+
+        # Додаємо нові заголовки (тільки ті, що потрібні і відсутні)
+        new_headers = [header for header in required_headers if header not in headers]
+        headers.extend(new_headers)
+
+        # Оновлюємо заголовки в таблиці, якщо додалися нові
+        if new_headers:
+            print(f"Додаємо нові заголовки: {', '.join(new_headers)}")
+            # Визначаємо діапазон для оновлення заголовків (весь перший рядок)
+            header_range = f"A1:{gspread.utils.rowcol_to_a1(1, len(headers))[:-1]}1" # Використовуємо оновлену довжину headers
+            self.client.write(self.worksheet.update, values=[headers], range_name=header_range)
+            self.api_calls += 1
+            self.api_bytes += len(json.dumps([headers], ensure_ascii=False).encode("utf-8"))
+            # Нові стовпці порожні, тож знімок не перечитуємо: відсутні комірки рядків вважаються порожніми
+
+        # Індекси ВСІХ потрібних стовпців (включаючи "Url")
+        self.header_indices = {h: i for i, h in enumerate(headers) if h in required_headers or h == "Url"}
+        self.link_pair_numbers = link_pair_numbers
+
+        # Словник для швидкого пошуку рядків за URL (один URL може бути в кількох рядках)
+        self.url_index = url_index
+        self.url_to_row_indices = {}
+        if sheet_data:
+            self._add_rows(2, sheet_data[1:])
+        self.ready = True
+        return True
+
+    def add_rows(self, first_row, rows):
+        """Додає до знімка рядки first_row, first_row + 1, ... (перед записом їхніх результатів)."""
+        if self._thread is not None:
+            self._queue.put((_ADD_ROWS, first_row, rows))
+        else:
+            self._add_rows(first_row, rows)
 
-    all_updates = []
-    updated_rows = 0
-    not_found_urls = []
-
-    # Створюємо словник для швидкого пошуку рядка за URL
-    url_to_row_index = {row[url_index]: i + 2 for i, row in enumerate(sheet_data[1:]) if url_index < len(row) and row[url_index]}
-
-    for result in results:
-        original_url = result.get("url") # Використовуємо оригінальний URL з результатів
-        if not original_url: continue # Пропускаємо, якщо URL не було
-
-        row_idx = url_to_row_index.get(original_url) # Шукаємо індекс рядка
-
-        if row_idx:
-            row_updates = {} # Оновлення для поточного рядка [col_index] = value
-
-            # --- Оновлення для базових полів ---
-            # (Status Code, Final URL, Final Status, Robots, Meta, Canonical) - ця логіка залишається
-            has_redirects = len(result.get("redirect_chain", [])) > 0
-            # Status Code / Final Status Code / Final Redirect URL
-            if has_redirects:
-                if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = "Redirect"
-                if "Final Redirect URL" in header_indices and result.get("final_url") and result["final_url"] != original_url:
-                     row_updates[header_indices["Final Redirect URL"]] = result["final_url"]
-                else:
-                     if "Final Redirect URL" in header_indices: row_updates[header_indices["Final Redirect URL"]] = "" # Очищаємо, якщо URL такий самий
-                if "Final Status Code" in header_indices and result.get("final_status_code") is not None:
-                     row_updates[header_indices["Final Status Code"]] = str(result["final_status_code"])
-            elif "status_code" in result and result.get("status_code") is not None:
-                 if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = str(result["status_code"])
-                 # Якщо не було редиректів, очищуємо Final URL та Final Status
-                 if header_indices.get("Final Redirect URL"):
-                     row_updates[header_indices["Final Redirect URL"]] = ""
-                 if header_indices.get("Final Status Code"):
-                     row_updates[header_indices["Final Status Code"]] = ""
-            elif result.get("error"): # Якщо була помилка запиту (не редирект і не успішний статус)
-                if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = "Error" # Або result["error"]?
-                if header_indices.get("Final Redirect URL"): row_updates[header_indices["Final Redirect URL"]] = ""
-                if header_indices.get("Final Status Code"): row_updates[header_indices["Final Status Code"]] = ""
-
-
-            # Robots.txt
-            if "Robots.txt" in header_indices:
-                 robots_disallowed = []
-                 if result.get("robots_star_allowed") is False: robots_disallowed.append("*")
-                 if result.get("robots_googlebot_allowed") is False: robots_disallowed.append("Googlebot")
-                 row_updates[header_indices["Robots.txt"]] = f"Заборонено ({', '.join(robots_disallowed)})" if robots_disallowed else ""
-
-            # Meta Robots/X-Robots-Tag
-            if "Meta Robots/X-Robots-Tag" in header_indices:
-                 if dr := result.get("indexing_directives"):
-                     tags = []
-                     if dr.get("noindex"): tags.append("noindex")
-                     if dr.get("nofollow"): tags.append("nofollow")
-                     if tags and dr.get("source"):
-                         row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = f"{dr['source']}: {', '.join(tags)}"
-                     else:
-                          row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = "" # Очищаємо, якщо немає тегів або джерела
-                 else:
-                      row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = "" # Очищаємо, якщо немає директив
-
-            # Canonical
-            if "Canonical" in header_indices:
-                 if canon_url := result.get("canonical_url"):
-                     decoded_canon = unquote(canon_url)
-                     target_url_to_compare = result.get("final_url") if has_redirects else normalize_url(original_url)
-                     decoded_target = unquote(target_url_to_compare) if target_url_to_compare else ""
-                     # Записуємо тільки якщо відрізняється і не порожній
-                     row_updates[header_indices["Canonical"]] = canon_url if canon_url and decoded_canon != decoded_target else ""
-                 else:
-                      row_updates[header_indices["Canonical"]] = "" # Очищаємо, якщо немає
-
-            # --- Оновлення для полів перевірки посилань (з перевірками) ---
-            if result.get("final_status_code") == 200: # Записуємо результати посилань тільки якщо була перевірка (статус 200)
-
-                # Пара 1 (завжди перевіряється)
-                if "Урл-1 наявність" in header_indices: row_updates[header_indices["Урл-1 наявність"]] = result.get("url1_found", "Ні")
-                if "Анкор-1 співпадає" in header_indices: row_updates[header_indices["Анкор-1 співпадає"]] = result.get("anchor1_match", "Ні")
-                if "Урл-1 rel" in header_indices:
-                    rel_val_1 = result.get("url1_rel")
-                    row_updates[header_indices["Урл-1 rel"]] = rel_val_1 if rel_val_1 is not None else ""
-
-                # Пара 2 (тільки якщо відповідні стовпці існують)
-                if has_input_pair2 and "Урл-2 наявність" in header_indices:
-                    if result.get("Анкор-2") and result.get("Урл-2"): # Чи були дані для перевірки пари 2?
-                        row_updates[header_indices["Урл-2 наявність"]] = result.get("url2_found", "Ні")
-                        if "Анкор-2 співпадає" in header_indices: row_updates[header_indices["Анкор-2 співпадає"]] = result.get("anchor2_match", "Ні")
-                        if "Урл-2 rel" in header_indices:
-                             rel_val_2 = result.get("url2_rel")
-                             row_updates[header_indices["Урл-2 rel"]] = rel_val_2 if rel_val_2 is not None else ""
-                    else: # Якщо даних для пари 2 не було, очищаємо результати (якщо стовпці є)
-                        row_updates[header_indices["Урл-2 наявність"]] = ""
-                        if "Анкор-2 співпадає" in header_indices: row_updates[header_indices["Анкор-2 співпадає"]] = ""
-                        if "Урл-2 rel" in header_indices: row_updates[header_indices["Урл-2 rel"]] = ""
-
-                # Пара 3 (тільки якщо відповідні стовпці існують)
-                if has_input_pair3 and "Урл-3 наявність" in header_indices:
-                    if result.get("Анкор-3") and result.get("Урл-3"): # Чи були дані для перевірки пари 3?
-                        row_updates[header_indices["Урл-3 наявність"]] = result.get("url3_found", "Ні")
-                        if "Анкор-3 співпадає" in header_indices: row_updates[header_indices["Анкор-3 співпадає"]] = result.get("anchor3_match", "Ні")
-                        if "Урл-3 rel" in header_indices:
-                            rel_val_3 = result.get("url3_rel")
-                            row_updates[header_indices["Урл-3 rel"]] = rel_val_3 if rel_val_3 is not None else ""
-                    else: # Якщо даних для пари 3 не було, очищаємо результати (якщо стовпці є)
-                        row_updates[header_indices["Урл-3 наявність"]] = ""
-                        if "Анкор-3 співпадає" in header_indices: row_updates[header_indices["Анкор-3 співпадає"]] = ""
-                        if "Урл-3 rel" in header_indices: row_updates[header_indices["Урл-3 rel"]] = ""
-
-            else: # Очищаємо всі поля посилань, якщо перевірка не проводилась (статус не 200)
-                 # Перевіряємо наявність стовпців перед очищенням
-                 if "Урл-1 наявність" in header_indices: row_updates[header_indices["Урл-1 наявність"]] = ""
-                 if "Анкор-1 співпадає" in header_indices: row_updates[header_indices["Анкор-1 співпадає"]] = ""
-                 if "Урл-1 rel" in header_indices: row_updates[header_indices["Урл-1 rel"]] = ""
-                 # Очищення для пари 2, якщо стовпці є
-                 if has_input_pair2:
-                     if "Урл-2 наявність" in header_indices: row_updates[header_indices["Урл-2 наявність"]] = ""
-                     if "Анкор-2 співпадає" in header_indices: row_updates[header_indices["Анкор-2 співпадає"]] = ""
-                     if "Урл-2 rel" in header_indices: row_updates[header_indices["Урл-2 rel"]] = ""
-                 # Очищення для пари 3, якщо стовпці є
-                 if has_input_pair3:
-                     if "Урл-3 наявність" in header_indices: row_updates[header_indices["Урл-3 наявність"]] = ""
-                     if "Анкор-3 співпадає" in header_indices: row_updates[header_indices["Анкор-3 співпадає"]] = ""
-                     if "Урл-3 rel" in header_indices: row_updates[header_indices["Урл-3 rel"]] = ""
-
-
-            # Додаємо оновлення до масиву, якщо є зміни
-            if row_updates:
-                current_row_data = sheet_data[row_idx - 1] # row_idx починається з 2, індекс масиву з 0
+    def release_rows(self, first_row, last_row):
+        """Звільняє рядки first_row..last_row, щойно всі їхні результати, додані раніше, записано."""
+        if self._thread is not None:
+            self._queue.put((_RELEASE_ROWS, first_row, last_row))
+        else:
+            self._release_rows(first_row, last_row)
+
+    def _add_rows(self, first_row, rows):
+        for row_idx, row in enumerate(rows, first_row):
+            self._rows[row_idx] = row
+            if self.url_index < len(row) and row[self.url_index]:
+                self.url_to_row_indices.setdefault(row[self.url_index], []).append(row_idx)
+
+    def _release_rows(self, first_row, last_row):
+        for row_idx in range(first_row, last_row + 1):
+            row = self._rows.pop(row_idx, None)
+            if row is None or self.url_index >= len(row) or not row[self.url_index]:
+                continue
+            row_indices = self.url_to_row_indices.get(row[self.url_index])
+            if row_indices and row_idx in row_indices:
+                row_indices.remove(row_idx)
+                if not row_indices:
+                    del self.url_to_row_indices[row[self.url_index]]
+
+    def _collect(self, results):
+        """Порівнює результати зі знімком і повертає змінені комірки {row_idx: {col_idx: value}}."""
+        row_targets = {}
+        for result in results:
+            original_url = result.get("url") # Використовуємо оригінальний URL з результатів
+            if not original_url: continue # Пропускаємо, якщо URL не було
+
+            # Шукаємо рядки для запису: рядок, з якого взято дані (row_number), інакше всі рядки з цим URL
+            row_indices = self.url_to_row_indices.get(original_url, [])
+            if result.get("row_number") in row_indices:
+                row_indices = [result["row_number"]]
+            if not row_indices:
+                self.not_found_urls.append(original_url)
+                continue
+
+            row_updates = _result_row_updates(result, original_url, self.header_indices, self.link_pair_numbers)
+            for row_idx in row_indices:
+                current_row_data = self._rows[row_idx]
                 update_needed_for_row = False
                 for col_idx, value in row_updates.items():
-                    # Переконуємося, що індекс існує в словнику (стовпець був створений/знайдений)
-                    if col_idx is not None: # header_indices повертає індекс або None якщо немає
-                        # Формуємо Cell ID (напр. "A2", "K5")
-                        col_letter = gspread.utils.rowcol_to_a1(1, col_idx + 1)[:-1] # +1 бо індекси з 0
-                        cell_id = f"{col_letter}{row_idx}"
-
-                        # Порівнюємо нове значення з існуючим (якщо колонка існує в рядку даних)
-                        current_value = str(current_row_data[col_idx]) if col_idx < len(current_row_data) else ""
-                        new_value = str(value) # Порівнюємо як рядки
-
-                        if new_value != current_value:
-                             all_updates.append((cell_id, value))
-                             update_needed_for_row = True # Позначаємо, що для цього рядка потрібне оновлення
-
+                    # Порівнюємо нове значення з існуючим (якщо колонка існує в рядку даних)
+                    current_value = str(current_row_data[col_idx]) if col_idx < len(current_row_data) else ""
+                    if str(value) != current_value: # Порівнюємо як рядки
+                        row_targets.setdefault(row_idx, {})[col_idx] = value
+                        self.changed_cells += 1
+                        update_needed_for_row = True # Позначаємо, що для цього рядка потрібне оновлення
                 if update_needed_for_row:
-                     updated_rows += 1
-        else:
-            not_found_urls.append(original_url)
-
-    if all_updates:
-        print(f"Виконується пакетне оновлення {len(all_updates)} комірок...")
-        batch_updates_payload = [{'range': cell_id, 'values': [[value]]} for cell_id, value in all_updates]
-
-        # Розбиваємо на частини, якщо оновлень забагато (API може мати ліміти)
-        BATCH_SIZE = 500
-        for i in range(0, len(batch_updates_payload), BATCH_SIZE):
-            batch = batch_updates_payload[i:i + BATCH_SIZE]
-            print(f"  Надсилаємо пакет {i//BATCH_SIZE + 1} ({len(batch)} оновлень)...")
+                    self.updated_rows += 1
+        return row_targets
+
+    def write(self, results):
+        """Записує пакет результатів; повертає кількість рядків таблиці, що отримали зміни."""
+        row_targets = self._collect(results)
+        if not row_targets:
+            return 0
+        blocks = _pack_blocks(row_targets)
+        print(f"Виконується пакетне оновлення {sum(map(len, row_targets.values()))} комірок у {len(row_targets)} рядках ({len(blocks)} блоків)...")
+        try:
+            calls, sent_bytes = _write_blocks(self.client, self.worksheet, blocks)
+        except SheetsWriteError as write_e:
+            # Записано все, крім відхилених блоків: незаписаними вважаємо рядки саме цих блоків
+            self.api_calls += write_e.calls
+            self.api_bytes += write_e.sent_bytes
+            self.failed_rows += len(_range_rows(write_e.failed_ranges))
+            raise
+        except Exception:
+            self.failed_rows += len(row_targets)
+            raise
+        self.api_calls += calls
+        self.api_bytes += sent_bytes
+        return len(row_targets)
+
+    def start(self):
+        """Готує стовпці і запускає фоновий запис. Повертає False, якщо записувати нікуди."""
+        if not self.prepare():
+            return False
+        self._thread = threading.Thread(target=self._write_loop, name="sheet-writer", daemon=True)
+        self._thread.start()
+        return True
+
+    def record(self, result):
+        """Додає результат рядка до черги запису (не блокує)."""
+        if self._thread is not None:
+            self._queue.put(result)
+
+    def _write_loop(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
             try:
-                worksheet.batch_update(batch)
-            except gspread.exceptions.APIError as api_e:
-                print(f"   ⚠️ Помилка API при оновленні пакету: {api_e}")
-                # Можна додати логіку повторної спроби або пропуску
-            except Exception as batch_e:
-                print(f"   ⚠️ Невідома помилка при оновленні пакету: {batch_e}")
-
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            control = item[0] if isinstance(item, tuple) else None
+            if control is _ADD_ROWS:
+                self._add_rows(item[1], item[2])
+                continue
+            if item is not None and item is not _STOP and control is None:
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            # Перед звільненням рядків записуємо все, що до них надійшло
+            if pending and (item is None or item is _STOP or control is _RELEASE_ROWS or len(pending) >= self.flush_rows):
+                try:
+                    written_rows = self.write(pending)
+                    print(f"📝 Записано в таблицю: {len(pending)} результатів, змінено рядків: {written_rows}")
+                except Exception as write_e:
+                    print(f"   ⚠️ Помилка запису пакету результатів: {write_e}")
+                pending = []
+                deadline = None
+            if control is _RELEASE_ROWS:
+                self._release_rows(item[1], item[2])
+            if item is _STOP:
+                break
+
+    def close(self):
+        """Записує все, що лишилося в черзі, і зупиняє фоновий запис."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def print_summary(self):
+        print(f"\nРезультати оновлення:")
+        if self.failed_rows:
+            print(f"⚠️ Запис неповний: зміни в {self.failed_rows} рядках не записано "
+                  f"(рядків з реальними змінами значень: {self.updated_rows})")
+        else:
+            print(f"✅ Оновлено рядків (з реальним змінами значень): {self.updated_rows}")
+        print(f"📤 Запис у таблицю: {self.api_calls} викликів API, {self.api_bytes / 1024:.1f} КБ")
+        if self.not_found_urls:
+            print(f"⚠️ URL, не знайдені в таблиці ({len(self.not_found_urls)}): {', '.join(self.not_found_urls[:5])}...")
+            if len(self.not_found_urls) > 5:
+                print(f"   ... та ще {len(self.not_found_urls) - 5}")
+
+def update_sheet_with_results(worksheet, results, sheet_data=None):
+    """Оновлює Google таблицю результатами перевірок URL та посилань.
+       sheet_data — знімок таблиці з check_sheet_structure; без нього таблиця читається заново.
+    """
+    print("\n\n📝 ЗБЕРЕЖЕННЯ РЕЗУЛЬТАТІВ У GOOGLE ТАБЛИЦЮ...\n")
 
-        print(f"Пакетне оновлення завершено!")
-    else:
-        print("Немає змін для запису в таблицю.")
+    writer = SheetResultWriter(worksheet, sheet_data)
+    if not writer.prepare():
+        return
 
+    print(f"Збираємо дані для оновлення {len(results)} URL...")
+    try:
+        if writer.write(results):
+            print(f"Пакетне оновлення завершено!")
+        else:
+            print("Немає змін для запису в таблицю.")
+    except Exception as write_e:
+        print(f"   ⚠️ Невідома помилка при оновленні таблиці: {write_e}")
 
-    print(f"\nРезультати оновлення:")
-    print(f"✅ Оновлено рядків (з реальним змінами значень): {updated_rows}")
-    if not_found_urls:
-        print(f"⚠️ URL, не знайдені в таблиці ({len(not_found_urls)}): {', '.join(not_found_urls[:5])}...")
-        if len(not_found_urls) > 5:
-            print(f"   ... та ще {len(not_found_urls) - 5}")
+    writer.print_summary()
 
 #
 # 4.5 ФУНКЦІЇ ОБРОБКИ ПОМИЛОК (Google Sheet)
@@ -375,7 +595,10 @@ def handle_header_error(error, result):
 
 def handle_missing_data_error(error):
     """Обробляє помилки відсутніх даних."""
-    missing_data = ast.literal_eval(error.split("Відсутні дані в обов'язкових стовпцях: ")[1])
+    print_missing_data(ast.literal_eval(error.split("Відсутні дані в обов'язкових стовпцях: ")[1]))
+
+def print_missing_data(missing_data):
+    """Виводить порожні обов'язкові комірки: {стовпець: [номери рядків]}, як повертає find_missing_data."""
     print("• Відсутні дані в обов'язкових стовпцях:")
     [print(f"  - У стовпці '{col}' порожні комірки в рядках: {', '.join(map(str, rows))}")
      for col, rows in missing_data.items()]
@@ -392,7 +615,7 @@ def display_sheet_validation_results(result):
     if result["success"]:
         print("✅ УСПІХ! Таблиця має правильну структуру.",
               "\n• Всі необхідні заголовки стовпців розташовані правильно",
-              "\n• Всі обов'язкові дані присутні")
+              "\n• Рядки з порожніми обов'язковими полями буде пропущено під час перевірки")
         return
 
     # Обробка помилок - використовуємо словник для диспетчеризації типів помилок
@@ -0,0 +1,81 @@
+import time
+import asyncio
+from collections import OrderedDict, deque
+
+#
+# 3.5 ПЛАНУВАЛЬНИК ЗАПИТІВ З УРАХУВАННЯМ ХОСТІВ
+#
+
+class HostScheduler:
+    """Розподіляє завдання між хостами: окрема черга на кожен origin, ліміт одночасних запитів
+       на хост, мінімальна пауза між запитами до одного хосту та почергове чергування хостів.
+    """
+
+    def __init__(self, max_concurrency, per_host_limit=2, min_host_delay=0.5):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.min_host_delay = max(0.0, min_host_delay)
+
+    async def run(self, items, key, worker):
+        """Виконує await worker(item) для кожного елемента. key(item) повертає origin
+           (None — без обмежень по хосту). Повертає результати в порядку items.
+        """
+        queues = OrderedDict()   # origin -> deque[(index, item)]
+        results = []
+        for index, item in enumerate(items):
+            results.append(None)
+            queues.setdefault(key(item), deque()).append((index, item))
+
+        ring = deque(queues)     # Хости з незапущеними завданнями, по колу
+        in_flight = {origin: 0 for origin in queues}
+        last_start = {}
+        running = {}             # task -> (index, origin)
+
+        while ring or running:
+            now = time.monotonic()
+            next_ready_at = None
+
+            # Проходи по колу: не більше одного нового завдання на хост за прохід,
+            # повторюємо, доки хоч щось запускається
+            started = True
+            while started and ring and len(running) < self.max_concurrency:
+                started = False
+                for _ in range(len(ring)):
+                    if len(running) >= self.max_concurrency or not ring:
+                        break
+                    origin = ring[0]
+                    ring.rotate(-1)
+                    if origin is not None:
+                        if in_flight[origin] >= self.per_host_limit:
+                            continue
+                        ready_at = last_start.get(origin, float("-inf")) + self.min_host_delay
+                        if ready_at > now:
+                            next_ready_at = ready_at if next_ready_at is None else min(next_ready_at, ready_at)
+                            continue
+
+                    index, item = queues[origin].popleft()
+                    if not queues[origin]:
+                        ring.remove(origin)
+                    in_flight[origin] += 1
+                    last_start[origin] = now
+                    running[asyncio.ensure_future(worker(item))] = (index, origin)
+                    started = True
+
+            timeout = None if next_ready_at is None else max(0.0, next_ready_at - time.monotonic())
+            if not running:
+                if timeout is not None:
+                    await asyncio.sleep(timeout)
+                continue
+
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, origin = running.pop(task)
+                in_flight[origin] -= 1
+                try:
+                    results[index] = task.result()
+                except BaseException:
+                    for pending in running:
+                        pending.cancel()
+                    raise
+
+        return results
@@ -0,0 +1,200 @@
+import html
+from html.entities import html5
+import codecs
+from collections import Counter
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from utils import normalize_text, normalize_url
+
+#
+# 2.5 ПОТОКОВИЙ РОЗБІР HTML
+#
+
+# Порожні (void) елементи, як їх трактує BeautifulSoup: вони не мають вмісту і закривального тегу
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr', 'image', 'img',
+    'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid', 'param', 'source', 'spacer', 'track', 'wbr'
+])
+# Елементи, текст усередині яких BeautifulSoup не включає в get_text()
+NON_TEXT_CONTAINERS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+# Іменовані посилання на символи без крапки з комою (як їх розпізнає BeautifulSoup)
+ENTITY_CHARACTERS = {}
+for _name, _character in sorted(html5.items()):
+    ENTITY_CHARACTERS.setdefault(_name.rstrip(';'), _character)
+
+
+class HtmlStreamExtractor(HTMLParser):
+    """Інкрементальний екстрактор HTML без побудови DOM: приймає байти (або текст) частинами
+       в міру надходження з мережі і збирає лише три види елементів — <meta name=robots/googlebot>,
+       <link rel=canonical> та <a href>. Про кожне завершене посилання повідомляє через on_link(href, text, rel).
+       Вкладеність тегів відтворюється так само, як у BeautifulSoup з 'html.parser'.
+    """
+
+    def __init__(self, encoding='utf-8', on_link=None):
+        # Посилання на символи розбираємо самі, щоб текст збігався з BeautifulSoup
+        super().__init__(convert_charrefs=False)
+        self.encoding = codecs.lookup(encoding).name
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self.on_link = on_link
+        self.head_closed = False
+        self.meta = {}              # Перший <meta> для 'googlebot' і 'robots': {'name', 'content'}
+        self.canonical_href = None
+        self.canonical_found = False
+        self.links = []             # Усі <a href> у порядку документа: {'href', 'text', 'rel'}
+        self._stack = []            # Відкриті елементи: (тег, запис посилання або None)
+        self._text = []             # Поточний текстовий вузол (HTMLParser може віддавати його частинами)
+        self._non_text_depth = 0
+        self._closed_void = []      # Порожні елементи, чий явний закривальний тег слід проігнорувати
+        self._closed = False
+
+    @property
+    def robots_meta(self):
+        """Мета-тег директив з пріоритетом googlebot, як у check_indexing_directives."""
+        return self.meta.get('googlebot') or self.meta.get('robots')
+
+    def feed_bytes(self, chunk):
+        """Декодує і подає на розбір черговий фрагмент байтів."""
+        self.feed(self._decoder.decode(chunk))
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.feed(self._decoder.decode(b'', final=True))
+        super().close()
+        self._flush_text()
+        # Незакриті посилання вважаємо завершеними наприкінці документа
+        self._pop_until(0)
+
+    def _flush_text(self, include=None):
+        # Як get_text(strip=True) у BeautifulSoup: кожен текстовий вузол обрізаємо, порожні пропускаємо
+        if not self._text:
+            return
+        text = "".join(self._text).strip()
+        self._text = []
+        if include is None:
+            include = not self._non_text_depth
+        if text and include:
+            for _, link in self._stack:
+                if link is not None:
+                    link['text'].append(text)
+
+    def _pop_until(self, depth):
+        while len(self._stack) > depth:
+            tag, link = self._stack.pop()
+            if tag in NON_TEXT_CONTAINERS:
+                self._non_text_depth -= 1
+            if link is not None:
+                link['text'] = "".join(link['text'])
+                if self.on_link:
+                    self.on_link(link['href'], link['text'], link['rel'])
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            self._closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # <tag/> — початок і кінець одночасно (для <a href=.../> теж)
+        self._start(tag, attrs)
+        self._end(tag)
+
+    def handle_endtag(self, tag):
+        # Як у BeautifulSoup: перший </br> після <br> просто відкидається, навіть без розриву тексту
+        if tag in self._closed_void:
+            self._closed_void.remove(tag)
+            return
+        self._end(tag)
+
+    def _start(self, tag, attrs):
+        self._flush_text()
+        # Як у BeautifulSoup: атрибут без значення — порожній рядок, дублікати — останнє значення
+        attributes = {name: value if value is not None else '' for name, value in attrs}
+
+        if tag == 'body':
+            self.head_closed = True
+        elif tag == 'meta':
+            name = attributes.get('name')
+            if name in ('googlebot', 'robots') and name not in self.meta:
+                self.meta[name] = {'name': name, 'content': attributes.get('content')}
+        elif tag == 'link' and not self.canonical_found and 'canonical' in attributes.get('rel', '').split():
+            self.canonical_found = True
+            self.canonical_href = attributes.get('href')
+
+        if tag in VOID_ELEMENTS:
+            return
+
+        link = None
+        if tag == 'a' and 'href' in attributes:
+            rel = attributes.get('rel')
+            link = {'href': attributes['href'], 'text': [], 'rel': rel.split() if rel is not None else []}
+            self.links.append(link)
+        if tag in NON_TEXT_CONTAINERS:
+            self._non_text_depth += 1
+        self._stack.append((tag, link))
+
+    def _end(self, tag):
+        self._flush_text()
+        if tag == 'head':
+            self.head_closed = True
+        # Закриваємо найближчий відкритий елемент з цим ім'ям разом з усіма вкладеними (як _popToTag)
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth][0] == tag:
+                self._pop_until(depth)
+                break
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def handle_charref(self, name):
+        self._text.append(html.unescape(f"&#{name};"))
+
+    def handle_entityref(self, name):
+        # Невідоме посилання лишається текстом "&name", як у BeautifulSoup
+        self._text.append(ENTITY_CHARACTERS.get(name, f"&{name}"))
+
+    def unknown_decl(self, data):
+        # CDATA-блоки BeautifulSoup включає в текст незалежно від контейнера
+        self._flush_text()
+        if data.upper().startswith('CDATA['):
+            self._text.append(data[len('CDATA['):])
+            self._flush_text(include=True)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+
+class LinkTargets:
+    """Відстежує, чи знайдено точні співпадіння (URL + анкор) для всіх пар з рядка.
+       Одне посилання зараховується не більше ніж одній парі, як і в check_links_on_page.
+    """
+
+    def __init__(self, page_url, link_pairs):
+        self.page_url = page_url
+        # Пари без URL або без анкору не можуть мати точного співпадіння, тож їх не чекаємо
+        self.remaining = Counter(
+            (normalize_url(url), normalize_text(anchor))
+            for anchor, url in link_pairs if url and anchor
+        )
+
+    @property
+    def complete(self):
+        return not self.remaining
+
+    def add_link(self, href, text, rel=None):
+        """Зараховує посилання, якщо воно точно співпадає з однією з ще не знайдених пар."""
+        try:
+            key = (normalize_url(urljoin(self.page_url, href)), normalize_text(text))
+        except Exception:
+            return
+        if self.remaining.get(key):
+            self.remaining[key] -= 1
+            if not self.remaining[key]:
+                del self.remaining[key]
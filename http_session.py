@@ -0,0 +1,508 @@
+import time
+import random
+import socket
+import threading
+import contextlib
+import requests
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+
+#
+# 3.1 СПІЛЬНИЙ HTTP-ШАР З ПУЛОМ З'ЄДНАНЬ
+#
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.6167.184 Safari/537.36'}
+
+# Скільки хостів тримати в пулі одночасно та скільки keep-alive з'єднань на кожен хост
+DEFAULT_POOL_HOSTS = 1000
+DEFAULT_POOL_PER_HOST = 2
+
+# Повтори тимчасових відмов: статуси, кількість повторів і межі паузи між ними (сек)
+RETRY_STATUSES = (429, 503)
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_BASE = 1.0
+DEFAULT_BACKOFF_MAX = 30.0
+# Запобіжник хосту: після стількох невдалих запитів поспіль хост пропускається на cooldown секунд (0 — вимкнено)
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_COOLDOWN = 60.0
+# Адаптивні таймаути: p95 затримки хосту * множник у межах [floor, ceiling] (сек); поки зразків
+# менше за мінімум, діє фіксований таймаут, переданий у запит.
+# Таймаут з'єднання рахується окремо — з часу встановлення нових з'єднань до хосту
+DEFAULT_TIMEOUT_FLOOR = 2.0
+DEFAULT_CONNECT_TIMEOUT_FLOOR = 1.0
+DEFAULT_TIMEOUT_CEILING = 30.0
+DEFAULT_TIMEOUT_MULTIPLIER = 4.0
+MIN_LATENCY_SAMPLES = 5
+# Ознаки помилки DNS: повтор не допоможе
+NAME_RESOLUTION_MARKERS = ("NameResolutionError", "Failed to resolve", "Name or service not known", "nodename nor servname")
+
+
+class _CachedDnsConnectionMixin:
+    """Нове з'єднання спільного пулу відкривається через кеш DNS перевірки (див. use_dns_cache), якщо він активний.
+       Винятки — ті самі, що в urllib3, тож requests обробляє їх як звичайні помилки з'єднання.
+       Час успішного з'єднання (з TLS) стає зразком для таймауту з'єднання хосту.
+    """
+
+    def connect(self):
+        started = time.monotonic()
+        super().connect()
+        _latency.record_connect(self.host, time.monotonic() - started)
+
+    def _new_conn(self):
+        cache = _dns_cache
+        if cache is None:
+            return super()._new_conn()
+        try:
+            return cache.create_connection((self._dns_host, self.port), self.timeout,
+                                           source_address=self.source_address, socket_options=self.socket_options)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        except socket.timeout as e:
+            raise ConnectTimeoutError(self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})") from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+
+
+# Класи з'єднань і пулів мають стандартні імена urllib3: вони потрапляють у тексти помилок, а звідти — в таблицю
+_CachedDnsHTTPConnection = type("HTTPConnection", (_CachedDnsConnectionMixin, HTTPConnection), {})
+_CachedDnsHTTPSConnection = type("HTTPSConnection", (_CachedDnsConnectionMixin, HTTPSConnection), {})
+_CachedDnsHTTPConnectionPool = type("HTTPConnectionPool", (HTTPConnectionPool,), {"ConnectionCls": _CachedDnsHTTPConnection})
+_CachedDnsHTTPSConnectionPool = type("HTTPSConnectionPool", (HTTPSConnectionPool,), {"ConnectionCls": _CachedDnsHTTPSConnection})
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter, що не втрачає статистику пулів, які витісняються з PoolManager,
+       і відкриває з'єднання через кеш DNS перевірки.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.retired_stats = {"requests": 0, "connections": 0}
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _CachedDnsHTTPConnectionPool,
+                                                   "https": _CachedDnsHTTPSConnectionPool}
+        pools = self.poolmanager.pools
+        dispose = pools.dispose_func
+
+        def retire(pool):
+            self.retired_stats["requests"] += pool.num_requests
+            self.retired_stats["connections"] += pool.num_connections
+            if dispose:
+                dispose(pool)
+
+        pools.dispose_func = retire
+
+
+class HostCircuitOpenError(requests.exceptions.ConnectionError):
+    """Запит не надсилався: запобіжник хосту розімкнено після серії невдалих запитів."""
+
+
+class RetryPolicy:
+    """Повтори для відповідей 429/503 і тимчасових помилок з'єднання:
+       експоненційна пауза з jitter або Retry-After від сервера (якщо він не довший за backoff_max).
+    """
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX):
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def delay(self, attempt, response=None):
+        """Пауза перед повтором номер attempt (з 0) або None, якщо сервер просить чекати довше за backoff_max."""
+        retry_after = _retry_after_seconds(response) if response is not None else None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.backoff_max else None
+        # Full jitter: випадкова пауза до експоненційної межі, щоб паралельні рядки не повторювали синхронно
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+
+class CircuitBreaker:
+    """Запобіжник по хостах: після threshold невдалих запитів поспіль (таймаути, відмови з'єднання)
+       наступні запити до хосту одразу отримують HostCircuitOpenError. Через cooldown секунд
+       запити знову пропускаються, і перша ж невдача знову розмикає запобіжник.
+    """
+
+    def __init__(self, threshold=DEFAULT_BREAKER_THRESHOLD, cooldown=DEFAULT_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._hosts = {}          # host -> {"failures", "opened_at", "last_error"}
+        self._lock = threading.Lock()
+        self.opened = 0           # Скільки разів запобіжник розмикався
+        self.fast_failures = 0    # Скільки запитів відхилено без з'єднання
+
+    def before_request(self, host):
+        """Кидає HostCircuitOpenError, якщо запобіжник хосту розімкнено і cooldown ще не минув."""
+        if not self.threshold:
+            return
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state["opened_at"] is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - state["opened_at"])
+            if remaining <= 0:
+                return
+            self.fast_failures += 1
+            failures, last_error = state["failures"], state["last_error"]
+        # Без імені хосту і тексту помилки: повідомлення не повинно бути схожим на SSL-помилку (див. is_ssl_error)
+        raise HostCircuitOpenError(f"Хост тимчасово пропускається: {failures} невдалих запитів поспіль "
+                                   f"(остання: {last_error}), наступна спроба через {remaining:.0f} с")
+
+    def record_success(self, host):
+        if not self.threshold:
+            return
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self, host, error):
+        if not self.threshold:
+            return
+        with self._lock:
+            state = self._hosts.setdefault(host, {"failures": 0, "opened_at": None, "last_error": None})
+            state["failures"] += 1
+            state["last_error"] = type(error).__name__
+            if state["failures"] >= self.threshold:
+                if state["opened_at"] is None:
+                    self.opened += 1
+                state["opened_at"] = time.monotonic()
+
+
+class P2Quantile:
+    """Потокова оцінка квантиля p алгоритмом P² (Jain & Chlamtac): п'ять маркерів замість усіх зразків."""
+
+    def __init__(self, p=0.95):
+        self.p = p
+        self.count = 0
+        self._heights = []                                   # Висоти маркерів (перші 5 — просто зразки)
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value):
+        self.count += 1
+        heights = self._heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+        # Комірка, в яку потрапив зразок; крайні маркери розсуваються до нового мінімуму/максимуму
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if heights[i] <= value < heights[i + 1])
+        for i in range(cell + 1, 5):
+            self._positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+        # Середні маркери зсуваються до бажаних позицій параболічною (або лінійною) інтерполяцією
+        for i in range(1, 4):
+            offset = self._desired[i] - self._positions[i]
+            if (offset >= 1 and self._positions[i + 1] - self._positions[i] > 1) or \
+                    (offset <= -1 and self._positions[i - 1] - self._positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._linear(i, step)
+                heights[i] = height
+                self._positions[i] += step
+
+    def _parabolic(self, i, step):
+        q, n = self._heights, self._positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def _linear(self, i, step):
+        q, n = self._heights, self._positions
+        return q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+
+    def value(self):
+        """Поточна оцінка квантиля (None без зразків)."""
+        if not self._heights:
+            return None
+        if self.count < 5:
+            ordered = sorted(self._heights)
+            return ordered[min(len(ordered) - 1, int(round(self.p * (len(ordered) - 1))))]
+        return self._heights[2]
+
+
+class LatencyTracker:
+    """Затримки відповідей і час встановлення з'єднань по хостах (p95 через P²) і таймаути запитів на їх основі:
+       p95 * multiplier у межах [floor, ceiling] — швидкі хости отримують коротший за фіксований таймаут,
+       повільні, але справні — довший, аж до ceiling. Запити, що не дочекалися відповіді, зразками не є:
+       інакше таймаут повільного чи недоступного хосту зростав би з кожною невдачею.
+    """
+
+    def __init__(self, floor=DEFAULT_TIMEOUT_FLOOR, ceiling=DEFAULT_TIMEOUT_CEILING,
+                 multiplier=DEFAULT_TIMEOUT_MULTIPLIER, enabled=True, connect_floor=DEFAULT_CONNECT_TIMEOUT_FLOOR):
+        self.floor = floor
+        self.connect_floor = connect_floor
+        self.ceiling = ceiling
+        self.multiplier = multiplier
+        self.enabled = enabled
+        self._hosts = {}    # host -> P2Quantile затримки відповіді
+        self._connect = {}  # host -> P2Quantile часу встановлення з'єднання
+        self._lock = threading.Lock()
+
+    def _add(self, estimators, host, seconds):
+        with self._lock:
+            estimator = estimators.get(host)
+            if estimator is None:
+                estimator = estimators[host] = P2Quantile(0.95)
+            estimator.add(seconds)
+
+    def _p95(self, estimators, host):
+        with self._lock:
+            estimator = estimators.get(host)
+            if estimator is None or estimator.count < MIN_LATENCY_SAMPLES:
+                return None
+            return estimator.value()
+
+    def record(self, host, seconds):
+        """Зразок затримки відповіді хосту (до отримання заголовків)."""
+        self._add(self._hosts, host, seconds)
+
+    def record_connect(self, host, seconds):
+        """Зразок часу встановлення нового з'єднання з хостом (TCP і TLS)."""
+        self._add(self._connect, host, seconds)
+
+    def p95(self, host):
+        return self._p95(self._hosts, host)
+
+    def connect_p95(self, host):
+        return self._p95(self._connect, host)
+
+    def _bounded(self, p95, floor):
+        return min(self.ceiling, max(floor, p95 * self.multiplier))
+
+    def timeout_for(self, host, default):
+        """Таймаут (connect, read) для запиту до host або default, поки даних про хост замало.
+           Кожна частина — з власних зразків у межах [floor, ceiling]; без зразків — default.
+        """
+        if not self.enabled:
+            return default
+        read_p95, connect_p95 = self.p95(host), self.connect_p95(host)
+        if read_p95 is None and connect_p95 is None:
+            return default
+        connect = default if connect_p95 is None else self._bounded(connect_p95, self.connect_floor)
+        read = default if read_p95 is None else self._bounded(read_p95, self.floor)
+        return (connect, read)
+
+    def report(self):
+        """[(host, кількість зразків, p95, таймаут)] для хостів з достатньою кількістю зразків, найповільніші першими."""
+        with self._lock:
+            hosts = [(host, estimator.count, estimator.value()) for host, estimator in self._hosts.items()
+                     if estimator.count >= MIN_LATENCY_SAMPLES]
+        return sorted(((host, count, p95, self._bounded(p95, self.floor))
+                       for host, count, p95 in hosts), key=lambda item: -item[2])
+
+
+def _retry_after_seconds(response):
+    """Retry-After у секундах (число або HTTP-дата) або None."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _is_host_failure(error):
+    """Помилка, що свідчить про недоступність хосту. SSL-помилки сюди не входять:
+       для них є окремий повтор без перевірки сертифіката.
+    """
+    return (isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+            and not isinstance(error, (requests.exceptions.SSLError, HostCircuitOpenError)))
+
+
+def _is_transient_error(error):
+    """Помилка з'єднання, яку має сенс повторити (обрив, відмова). Таймаути і DNS не повторюються:
+       повтор лише вдруге чекав би той самий таймаут.
+    """
+    if not _is_host_failure(error) or isinstance(error, requests.exceptions.Timeout):
+        return False
+    error_text = str(error)
+    return not any(marker in error_text for marker in NAME_RESOLUTION_MARKERS)
+
+
+_adapter = None
+_adapter_lock = threading.Lock()
+_retry_policy = RetryPolicy()
+_breaker = CircuitBreaker()
+_latency = LatencyTracker()
+_dns_cache = None
+
+
+def configure_pool(pool_hosts=DEFAULT_POOL_HOSTS, pool_per_host=DEFAULT_POOL_PER_HOST):
+    """Створює (або перестворює) спільний пул з'єднань із заданими розмірами."""
+    global _adapter
+    with _adapter_lock:
+        if _adapter is not None:
+            _adapter.close()
+        _adapter = _PooledAdapter(pool_connections=pool_hosts, pool_maxsize=pool_per_host)
+    return _adapter
+
+
+def _get_adapter():
+    with _adapter_lock:
+        adapter = _adapter
+    return adapter or configure_pool()
+
+
+@contextlib.contextmanager
+def use_dns_cache(cache):
+    """На час блоку нові з'єднання спільного пулу визначають адреси через cache (dns_cache.DnsCache).
+       socket.getaddrinfo не підміняється: інші бібліотеки і потоки процесу (gspread тощо) працюють як зазвичай.
+    """
+    global _dns_cache
+    previous, _dns_cache = _dns_cache, cache
+    try:
+        yield cache
+    finally:
+        _dns_cache = previous
+
+
+def new_session():
+    """Повертає нову requests.Session, що використовує спільний пул з'єднань.
+       Cookies живуть лише в межах однієї сесії (як у requests.get), а TCP/TLS з'єднання — спільні.
+    """
+    adapter = _get_adapter()
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def configure_retries(max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX,
+                      breaker_threshold=DEFAULT_BREAKER_THRESHOLD, breaker_cooldown=DEFAULT_BREAKER_COOLDOWN):
+    """Замінює політику повторів і запобіжник хостів (breaker_threshold=0 вимикає запобіжник)."""
+    global _retry_policy, _breaker
+    _retry_policy = RetryPolicy(max_retries, backoff_base, backoff_max)
+    _breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+    return _retry_policy, _breaker
+
+
+def configure_timeouts(floor=DEFAULT_TIMEOUT_FLOOR, ceiling=DEFAULT_TIMEOUT_CEILING,
+                       multiplier=DEFAULT_TIMEOUT_MULTIPLIER, enabled=True, connect_floor=DEFAULT_CONNECT_TIMEOUT_FLOOR):
+    """Замінює трекер затримок. enabled=False — завжди фіксовані таймаути, передані в запит."""
+    global _latency
+    _latency = LatencyTracker(floor, ceiling, multiplier, enabled, connect_floor)
+    return _latency
+
+
+def request(method, url, **kwargs):
+    """Аналог requests.request, але через спільний пул keep-alive з'єднань,
+       з повторами 429/503 і тимчасових помилок та запобіжником для недоступних хостів.
+       Числовий timeout діє, поки про хост мало даних; далі таймаути з'єднання і читання беруться
+       з p95 часу з'єднання і затримки відповіді хосту (у межах [floor, ceiling] з configure_timeouts).
+    """
+    kwargs.setdefault('headers', DEFAULT_HEADERS)
+    policy, breaker, latency = _retry_policy, _breaker, _latency
+    host = urlsplit(url).hostname or url
+    breaker.before_request(host)
+    timeout = kwargs.get('timeout')
+    if isinstance(timeout, (int, float)):
+        kwargs['timeout'] = latency.timeout_for(host, timeout)
+    attempt = 0
+    while True:
+        try:
+            # Сесію не закриваємо: close() закрив би спільний адаптер разом з усіма пулами
+            response = new_session().request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            if attempt < policy.max_retries and _is_transient_error(e):
+                policy.record_retry()
+                time.sleep(policy.delay(attempt))
+                attempt += 1
+                continue
+            if _is_host_failure(e):
+                breaker.record_failure(host, e)
+            raise
+        breaker.record_success(host)
+        # Кожен крок редиректу — зразок для хосту, який на нього відповів
+        for hop in (*response.history, response):
+            latency.record(urlsplit(hop.url).hostname or host, hop.elapsed.total_seconds())
+        if response.status_code in RETRY_STATUSES and attempt < policy.max_retries:
+            delay = policy.delay(attempt, response)
+            if delay is not None:
+                response.close()
+                policy.record_retry()
+                time.sleep(delay)
+                attempt += 1
+                continue
+        return response
+
+
+def head(url, **kwargs):
+    """Аналог requests.head через спільний пул."""
+    kwargs.setdefault('allow_redirects', False)
+    return request('HEAD', url, **kwargs)
+
+
+def get(url, **kwargs):
+    """Аналог requests.get через спільний пул."""
+    return request('GET', url, **kwargs)
+
+
+def get_pool_stats():
+    """Повертає статистику пулу: кількість запитів, нових з'єднань, частку повторного використання та відкриті сокети."""
+    adapter = _get_adapter()
+    stats = {"hosts": 0, "requests": adapter.retired_stats["requests"],
+             "connections": adapter.retired_stats["connections"], "open_sockets": 0, "in_use": 0}
+    pools = adapter.poolmanager.pools
+    with pools.lock:
+        active_pools = list(pools._container.values())
+    for pool in active_pools:
+        stats["hosts"] += 1
+        stats["requests"] += pool.num_requests
+        stats["connections"] += pool.num_connections
+        if pool.pool is None:
+            continue
+        idle = list(pool.pool.queue)
+        # Вільні слоти черги містять None, зайняті з'єднання з черги вилучені
+        stats["in_use"] += pool.pool.maxsize - len(idle)
+        stats["open_sockets"] += sum(1 for conn in idle if conn is not None and getattr(conn, 'sock', None) is not None)
+    stats["open_sockets"] += stats["in_use"]
+    stats["reused"] = max(0, stats["requests"] - stats["connections"])
+    stats["reuse_ratio"] = stats["reused"] / stats["requests"] if stats["requests"] else 0.0
+    return stats
+
+
+def print_timeout_stats(limit=5):
+    """Виводить адаптивні таймаути: скільки хостів їх отримали і найповільніші з них."""
+    report = _latency.report()
+    if not _latency.enabled or not report:
+        return
+    print(f"⏱️ Адаптивні таймаути для {len(report)} хостів (p95 * {_latency.multiplier:g}, "
+          f"межі {_latency.floor:g}–{_latency.ceiling:g} с); найповільніші:")
+    for host, count, p95, timeout in report[:limit]:
+        print(f"   {host}: p95 {p95:.2f} с за {count} запитами → таймаут читання {timeout:.1f} с")
+
+
+def print_pool_stats():
+    """Виводить статистику пулу з'єднань, повторів і запобіжника хостів."""
+    stats = get_pool_stats()
+    print(f"🔌 HTTP-пул: {stats['requests']} запитів, {stats['connections']} нових з'єднань, "
+          f"повторне використання {stats['reuse_ratio']:.0%}, відкритих сокетів: {stats['open_sockets']} "
+          f"(хостів у пулі: {stats['hosts']})")
+    print(f"🛟 Повтори запитів: {_retry_policy.retries}; запобіжник хостів спрацював {_breaker.opened} раз(ів), "
+          f"відхилено без з'єднання: {_breaker.fast_failures}")
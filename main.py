@@ -1,7 +1,48 @@
 import sys
+import argparse
 
-if len(sys.argv) > 1:
-    google_sheet_url = sys.argv[1]
+parser = argparse.ArgumentParser(description="Перевірка статус-кодів, SEO-параметрів та посилань з Google таблиці.")
+parser.add_argument("google_sheet_url", nargs="?", help="URL Google таблиці")
+parser.add_argument("--concurrency", type=int, default=20, help="Скільки рядків перевіряти одночасно (1 — послідовно)")
+parser.add_argument("--per-host", type=int, default=2, help="Максимум одночасних рядків на один хост")
+parser.add_argument("--host-delay", type=float, default=0.5, help="Мінімальна пауза між запитами до одного хосту, сек")
+parser.add_argument("--fetch-mode", choices=["get", "head+get", "head"], default="head+get",
+                    help="head+get — HEAD і окремий GET (за замовчуванням); get — один потоковий GET; "
+                         "head — лише статуси без SEO/посилань")
+parser.add_argument("--max-body-kb", type=int, default=5120, help="Максимальний обсяг HTML однієї сторінки, КБ")
+parser.add_argument("--parser", choices=["stream", "bs4"], default="stream",
+                    help="stream — потоковий екстрактор HTML; bs4 — еталонний розбір через BeautifulSoup")
+parser.add_argument("--parse-workers", type=int, default=0,
+                    help="Кількість процесів для розбору HTML (0 — розбір у потоках завантаження)")
+parser.add_argument("--no-page-cache", action="store_true",
+                    help="Не зберігати сторінки між запусками і не надсилати умовні запити (ETag/Last-Modified)")
+parser.add_argument("--incremental", action="store_true",
+                    help="Перевіряти лише нові, змінені або застарілі рядки; решту брати з локального сховища результатів")
+parser.add_argument("--max-age", type=float, default=24,
+                    help="Скільки годин результат рядка вважається свіжим у режимі --incremental")
+parser.add_argument("--resume", action="store_true",
+                    help="Продовжити перерваний запуск: рядки з контрольних точок не перевіряються повторно")
+parser.add_argument("--retries", type=int, default=2, help="Скільки разів повторювати запит на 429/503 або обрив з'єднання")
+parser.add_argument("--breaker-threshold", type=int, default=5,
+                    help="Після скількох невдалих запитів поспіль пропускати решту рядків хосту (0 — вимкнено)")
+parser.add_argument("--fixed-timeouts", action="store_true",
+                    help="Не підлаштовувати таймаути під затримку хостів (завжди 10 с HEAD, 15 с GET, 5 с robots.txt)")
+parser.add_argument("--timeout-floor", type=float, default=2, help="Найкоротший адаптивний таймаут запиту, секунди")
+parser.add_argument("--timeout-ceiling", type=float, default=30, help="Найдовший адаптивний таймаут запиту, секунди")
+parser.add_argument("--no-dns-prefetch", action="store_true",
+                    help="Не визначати адреси хостів заздалегідь (кожен запит звертається до системного резолвера)")
+parser.add_argument("--remember-ssl-fallback", action="store_true",
+                    help="Зберігати між запусками хости, яким знадобилося вимкнення SSL (наступного разу запит одразу без перевірки)")
+parser.add_argument("--sheets-read-quota", type=int, default=60, help="Скільки запитів на читання до Sheets API за хвилину")
+parser.add_argument("--sheets-write-quota", type=int, default=60, help="Скільки запитів на запис до Sheets API за хвилину")
+parser.add_argument("--chunk-rows", type=int, default=5000,
+                    help="Скільки рядків таблиці читати й перевіряти за раз (менше — менше пам'яті на великих таблицях)")
+parser.add_argument("--robots-ttl-hours", type=float, default=24, help="Скільки годин збережений robots.txt вважається актуальним")
+# parse_known_args, бо в Colab/Jupyter до sys.argv додаються службові аргументи ядра
+args, _ = parser.parse_known_args()
+
+if args.google_sheet_url:
+    google_sheet_url = args.google_sheet_url
     print(f"Отримано URL Google Sheet: {google_sheet_url}")
     # Тепер ви можете використовувати змінну google_sheet_url у вашому скрипті
 else:
@@ -47,14 +88,36 @@ except ImportError:
     pass # Наразі нічого не робимо, якщо не в Colab
 
 # Імпорт основних функцій з модулів
-from gsheet_utils import check_sheet_structure, display_sheet_validation_results, update_sheet_with_results
-from request_processor import check_status_code_requests
+from gsheet_utils import (check_sheet_structure, display_sheet_validation_results, iter_sheet_rows, SheetResultWriter,
+                          find_missing_data, print_missing_data)
+from request_processor import check_run
+from robots_cache import configure_robots_cache
+from page_cache import configure_page_cache
+from http_session import configure_retries, configure_timeouts
+from dns_cache import configure_dns_cache
+from ssl_policy import configure_ssl_policy, DEFAULT_SSL_POLICY_PATH
+from sheets_client import configure_sheets_client, get_sheets_client
+from results_store import ResultsStore
+from checkpoint import Checkpoint
+from utils import get_link_pair_numbers
 
 #
 # 6. ГОЛОВНА ФУНКЦІЯ
 #
-def main(google_sheet):
-    """Головна функція, що запускає перевірку та виводить результати."""
+def main(google_sheet, max_concurrency=1, per_host_limit=2, min_host_delay=0.5, fetch_mode="head+get",
+         max_body_bytes=5 * 1024 * 1024, parser_backend="stream", parse_workers=0, incremental=False, max_age_hours=24,
+         resume=False, chunk_rows=5000):
+    """Головна функція, що запускає перевірку та виводить результати.
+       max_concurrency > 1 вмикає асинхронний рушій з паралельною перевіркою рядків;
+       per_host_limit і min_host_delay обмежують навантаження на кожен окремий хост;
+       fetch_mode задає спосіб отримання сторінки (див. request_processor.FETCH_MODES),
+       max_body_bytes — скільки байт HTML завантажувати зі сторінки щонайбільше,
+       parser_backend — бекенд розбору HTML (seo_checks.PARSER_BACKENDS),
+       parse_workers — скільки процесів розбирають HTML окремо від завантаження (0 — без пулу процесів),
+       incremental — перевіряти лише нові, змінені або старші за max_age_hours рядки, решту брати зі сховища результатів,
+       resume — продовжити перерваний запуск з контрольних точок (результати кожного рядка пишуться туди одразу),
+       chunk_rows — скільки рядків таблиці читати й перевіряти за раз (обмежує пам'ять на великих таблицях).
+    """
     # Якщо в Colab, авторизуємося
     if COLAB_ENV:
         try:
@@ -75,60 +138,163 @@ def main(google_sheet):
     display_sheet_validation_results(result)
 
     if result["success"]:
-        data = result["data"]
-        headers = data[0]
-        rows = data[1:]
+        headers = result["headers"]
+        worksheet = result["worksheet"]
 
         # Знаходимо індекси потрібних стовпців
         try:
             idx_url = headers.index("Url")
             idx_anchor1 = headers.index("Анкор-1")
             idx_url1 = headers.index("Урл-1")
-            # Додаємо обробку можливої відсутності Анкор-2/Урл-2 та Анкор-3/Урл-3
-            idx_anchor2 = headers.index("Анкор-2") if "Анкор-2" in headers else -1
-            idx_url2 = headers.index("Урл-2") if "Урл-2" in headers else -1
-            idx_anchor3 = headers.index("Анкор-3") if "Анкор-3" in headers else -1
-            idx_url3 = headers.index("Урл-3") if "Урл-3" in headers else -1
+            # Решта пар Анкор-N/Урл-N опціональні: -1, якщо стовпця немає
+            pair_numbers = get_link_pair_numbers(headers)
+            pair_indices = {
+                number: (headers.index(f"Анкор-{number}") if f"Анкор-{number}" in headers else -1,
+                         headers.index(f"Урл-{number}") if f"Урл-{number}" in headers else -1)
+                for number in pair_numbers
+            }
         except ValueError as e:
-            print(f"Помилка: Не знайдено обов'язковий стовпець ('Анкор-1', 'Урл-1', 'Url', або опціональні 'Анкор-2/3', 'Урл-2/3') у заголовках: {e}")
+            print(f"Помилка: Не знайдено обов'язковий стовпець ('Анкор-1', 'Урл-1', 'Url', або опціональні 'Анкор-N', 'Урл-N') у заголовках: {e}")
             return
 
-        # Формуємо список словників для передачі в check_status_code_requests
-        rows_to_check = []
-        for row_idx, row in enumerate(rows, 2): # Починаємо нумерацію рядків з 2 для повідомлень
-            # Перевіряємо, чи рядок достатньо довгий для зчитування *обов'язкових* полів
-            min_required_len = max(idx_anchor1, idx_url1, idx_url) + 1
-            if len(row) < min_required_len:
-                 print(f"Попередження: Рядок {row_idx}: Пропускаємо короткий рядок (менше {min_required_len} стовпців): {row}")
-                 continue
-
-            row_data = {
-                "Анкор-1": row[idx_anchor1],
-                "Урл-1": row[idx_url1],
-                # Додаємо Анкор/Урл 2 і 3 з перевіркою індексу та довжини рядка
-                "Анкор-2": row[idx_anchor2] if idx_anchor2 != -1 and idx_anchor2 < len(row) else None,
-                "Урл-2": row[idx_url2] if idx_url2 != -1 and idx_url2 < len(row) else None,
-                "Анкор-3": row[idx_anchor3] if idx_anchor3 != -1 and idx_anchor3 < len(row) else None,
-                "Урл-3": row[idx_url3] if idx_url3 != -1 and idx_url3 < len(row) else None,
-                "Url": row[idx_url]
-            }
-            # Додаємо тільки якщо є URL для перевірки
-            if row_data["Url"]:
-                rows_to_check.append(row_data)
-            else:
-                 print(f"Попередження: Рядок {row_idx}: Порожній 'Url', пропускаємо.")
+        results_store = ResultsStore()
+        checkpoint = Checkpoint()
+        # Контрольні точки читаються один раз, до того як фоновий запис почне дописувати у файл
+        checkpointed = checkpoint.load() if resume else None
+
+        def on_result(row_info, row_result):
+            checkpoint.record(row_info, row_result)
+            sheet_writer.record(row_result)
+
+        # Рушій перевірки (пул з'єднань, об'єднання запитів, кеш DNS, статистика) — один на весь запуск,
+        # підсумок виводить після останньої частини. Він запускається раніше за фоновий запис контрольних точок
+        # і таблиці: пул процесів розбору створюється через fork, а fork процесу з робочими потоками небезпечний
+        with check_run(fetch_mode=fetch_mode, max_body_bytes=max_body_bytes, parser_backend=parser_backend,
+                       parse_workers=parse_workers, on_result=on_result,
+                       max_concurrency=max_concurrency if max_concurrency > 1 else None,
+                       per_host_limit=per_host_limit, min_host_delay=min_host_delay) as run:
+            checkpoint.start(resume=resume)
+
+            # Результати пишуться в таблицю фоново, пакетами, ще під час перевірки (таблиця не перечитується)
+            print("\n\n📝 ЗБЕРЕЖЕННЯ РЕЗУЛЬТАТІВ У GOOGLE ТАБЛИЦЮ (під час перевірки)...\n")
+            sheet_writer = SheetResultWriter(worksheet, headers=headers)
+            sheet_writer.start()
+
+            # Таблиця читається частинами по chunk_rows рядків: кожна частина перевіряється і записується,
+            # перш ніж читати наступну, тож у пам'яті лише одна частина незалежно від розміру таблиці
+            total_rows = 0
+            # Порожні обов'язкові комірки перевіряються в кожній частині під час цього ж читання:
+            # такі рядки пропускаються, а їх перелік виводиться після перевірки
+            missing_data = {}
+            for first_row, rows in iter_sheet_rows(worksheet, headers, chunk_rows):
+                sheet_writer.add_rows(first_row, rows)
+                chunk_missing = find_missing_data(headers, first_row, rows)
+                for col, idxs in chunk_missing.items():
+                    missing_data.setdefault(col, []).extend(idxs)
+                skipped_rows = {row_idx for idxs in chunk_missing.values() for row_idx in idxs}
 
-        if not rows_to_check:
+                # Формуємо список словників для перевірки
+                rows_to_check = []
+                for row_idx, row in enumerate(rows, first_row): # Номери рядків у таблиці (дані починаються з 2)
+                    if row_idx in skipped_rows:
+                        continue
+                    # Перевіряємо, чи рядок достатньо довгий для зчитування *обов'язкових* полів
+                    min_required_len = max(idx_anchor1, idx_url1, idx_url) + 1
+                    if len(row) < min_required_len:
+                         print(f"Попередження: Рядок {row_idx}: Пропускаємо короткий рядок (менше {min_required_len} стовпців): {row}")
+                         continue
+
+                    row_data = {}
+                    # Додаємо Анкор/Урл кожної пари з перевіркою індексу та довжини рядка
+                    for number, (idx_anchor, idx_link_url) in pair_indices.items():
+                        row_data[f"Анкор-{number}"] = row[idx_anchor] if idx_anchor != -1 and idx_anchor < len(row) else None
+                        row_data[f"Урл-{number}"] = row[idx_link_url] if idx_link_url != -1 and idx_link_url < len(row) else None
+                    row_data["Url"] = row[idx_url]
+                    # Номер рядка в таблиці: результати записуються саме в нього, навіть якщо Url повторюється
+                    row_data["row_number"] = row_idx
+                    # Додаємо тільки якщо є URL для перевірки
+                    if row_data["Url"]:
+                        rows_to_check.append(row_data)
+                    else:
+                         print(f"Попередження: Рядок {row_idx}: Порожній 'Url', пропускаємо.")
+
+                if rows_to_check:
+                    total_rows += len(rows_to_check)
+                    print(f"\n📄 Рядки {first_row}–{first_row + len(rows) - 1}: {len(rows_to_check)} URL для перевірки")
+                    _check_chunk(rows_to_check, run, results_store, checkpoint, checkpointed, sheet_writer,
+                                 incremental=incremental, max_age_hours=max_age_hours, resume=resume)
+                # Результати частини вже в черзі запису: після їх запису рядки частини звільняються
+                sheet_writer.release_rows(first_row, first_row + len(rows) - 1)
+
+        checkpoint.close()
+        results_store.close()
+        # Дописуємо останній пакет і зупиняємо фоновий запис
+        sheet_writer.close()
+
+        if missing_data:
+            print(f"\n⚠️ Пропущено рядків з порожніми обов'язковими полями: "
+                  f"{len({row_idx for idxs in missing_data.values() for row_idx in idxs})}")
+            print_missing_data(missing_data)
+
+        if not total_rows:
             print("Не знайдено жодного URL для перевірки в таблиці.")
+            checkpoint.remove()
             return
 
-        check_results = check_status_code_requests(rows_to_check)
+        if sheet_writer.ready:
+            sheet_writer.print_summary()
+        get_sheets_client().print_stats()
+        # Контрольні точки — єдина копія результатів, яку може відтворити --resume:
+        # видаляємо їх лише тоді, коли всі результати справді записано в таблицю
+        if sheet_writer.ready and not sheet_writer.failed_rows and not get_sheets_client().failed_writes:
+            checkpoint.remove()
+        else:
+            print(f"⚠️ Не всі результати записано в таблицю — контрольні точки збережено ({checkpoint.path}).")
+            print("   Щоб дописати їх без повторних запитів, запустіть перевірку ще раз з --resume.")
+
+def _check_chunk(rows_to_check, run, results_store, checkpoint, checkpointed, sheet_writer, incremental=False,
+                 max_age_hours=24, resume=False):
+    """Перевіряє одну частину таблиці: свіжі результати — зі сховища чи контрольних точок, решта — рушієм
+       спільного для всіх частин запуску (run — з request_processor.check_run).
+    """
+    # Інкрементальний режим: свіжі результати зі сховища, перевіряються лише решта рядків
+    if incremental:
+        check_results, pending = results_store.split_rows(rows_to_check, max_age=max_age_hours * 60 * 60)
+        print(f"♻️ Інкрементальний режим: {len(rows_to_check) - len(pending)} рядків зі сховища результатів, "
+              f"{len(pending)} до перевірки")
+    else:
+        check_results, pending = [None] * len(rows_to_check), list(range(len(rows_to_check)))
+    # Відновлення: рядки, перевірені до збою попереднього запуску, беремо з контрольних точок
+    if resume:
+        remaining = checkpoint.fill(rows_to_check, check_results, pending, checkpointed)
+        print(f"⏯️ Відновлення запуску: {len(pending) - len(remaining)} рядків з контрольних точок, {len(remaining)} до перевірки")
+        pending = remaining
+    rows_to_run = [rows_to_check[index] for index in pending]
+
+    for row_result in check_results:
+        if row_result is not None: # Рядки зі сховища результатів або контрольних точок
+            sheet_writer.record(row_result)
 
-        update_sheet_with_results(result["worksheet"], check_results)
+    fresh_results = run.check(rows_to_run) if rows_to_run else []
+    # Зберігаємо свіжі результати, щоб наступний інкрементальний запуск міг їх використати
+    results_store.put_many(zip(rows_to_run, fresh_results))
 
 # Перевірка Google таблиці
 google_sheet = google_sheet_url
 
 # Запуск головної функції
 if __name__ == "__main__":
-    main(google_sheet)
+    configure_robots_cache(ttl=args.robots_ttl_hours * 60 * 60)
+    configure_retries(max_retries=args.retries, breaker_threshold=args.breaker_threshold)
+    configure_timeouts(floor=args.timeout_floor, ceiling=args.timeout_ceiling, enabled=not args.fixed_timeouts)
+    configure_sheets_client(read_per_minute=args.sheets_read_quota, write_per_minute=args.sheets_write_quota)
+    if args.remember_ssl_fallback:
+        configure_ssl_policy(path=DEFAULT_SSL_POLICY_PATH)
+    if args.no_dns_prefetch:
+        configure_dns_cache(enabled=False)
+    if args.no_page_cache:
+        configure_page_cache(path=None)
+    main(google_sheet, max_concurrency=args.concurrency, per_host_limit=args.per_host, min_host_delay=args.host_delay,
+         fetch_mode=args.fetch_mode, max_body_bytes=args.max_body_kb * 1024, parser_backend=args.parser,
+         parse_workers=args.parse_workers, incremental=args.incremental, max_age_hours=args.max_age,
+         resume=args.resume, chunk_rows=args.chunk_rows)
@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from utils import CACHE_DIR
+
+#
+# 2.2 ЗБЕРЕЖЕНІ СТОРІНКИ ДЛЯ УМОВНИХ ЗАПИТІВ (ETag/Last-Modified)
+#
+
+DEFAULT_PAGE_CACHE_PATH = os.path.join(CACHE_DIR, "page_cache.sqlite")
+
+
+class PageCache:
+    """Сторінки з попередніх запусків: валідатори ETag/Last-Modified і витягнуті з HTML дані
+       (мета-теги, canonical, посилання). Дозволяє надіслати умовний запит і на 304 не завантажувати
+       й не розбирати тіло. Записи зберігаються в SQLite за URL, до якого надсилається GET.
+    """
+
+    def __init__(self, path=DEFAULT_PAGE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.revalidated = 0    # Скільки сторінок не змінились (304) і взяті зі збереженої копії
+        self.stored = 0         # Скільки сторінок збережено або оновлено за запуск
+        self._conn = self._connect()
+
+    def _connect(self):
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                return self._open(self.path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️ Не вдалося відкрити збережені сторінки ({self.path}): {e}. Працюємо без збереження.")
+        return self._open(":memory:")
+
+    @staticmethod
+    def _open(path):
+        # Одне з'єднання на всі потоки; доступ серіалізується власним замком
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, data TEXT NOT NULL, stored_at REAL NOT NULL)")
+        return conn
+
+    def get(self, url):
+        """Повертає збережений запис для url (словник) або None."""
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT data FROM pages WHERE url = ?", (url,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Не вдалося прочитати збережену сторінку {url}: {e}")
+            return None
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def put(self, url, entry):
+        """Зберігає (або замінює) запис для url."""
+        try:
+            data = json.dumps(entry, ensure_ascii=False)
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO pages (url, data, stored_at) VALUES (?, ?, ?)",
+                                   (url, data, time.time()))
+                self.stored += 1
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            print(f"⚠️ Не вдалося зберегти сторінку {url}: {e}")
+
+    def record_revalidated(self):
+        """Відмічає сторінку, що не змінилась (відповідь 304)."""
+        with self._lock:
+            self.revalidated += 1
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """Повертає спільне для запуску сховище сторінок (створює його під час першого звернення)."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = PageCache()
+        return _shared_cache
+
+
+def peek_page_cache():
+    """Повертає спільне сховище сторінок, лише якщо його вже створено (інакше None, не створюючи файл)."""
+    with _shared_cache_lock:
+        return _shared_cache
+
+
+def configure_page_cache(path=DEFAULT_PAGE_CACHE_PATH):
+    """Замінює спільне сховище сторінок новим. path=None — лише в пам'яті (нічого не зберігається між запусками)."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is not None:
+            _shared_cache.close()
+        _shared_cache = PageCache(path=path)
+        return _shared_cache
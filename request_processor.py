@@ -1,14 +1,210 @@
+import io
+import codecs
+import sys
+import asyncio
+import contextlib
+import multiprocessing
+import time
+import threading
 import requests
 import warnings
 import pandas as pd
-from urllib.parse import unquote
+from requests.structures import CaseInsensitiveDict
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+from utils import normalize_url, normalize_text_cache_info, detect_encoding, ENCODING_DETECTION_STATS, is_ssl_error, get_origin, get_charset_from_content_type, get_mime_type, get_link_pair_numbers
+from html_stream import HtmlStreamExtractor, LinkTargets
+from host_scheduler import HostScheduler
+from single_flight import SingleFlight
+from robots_cache import get_robots_cache
+from page_cache import get_page_cache, peek_page_cache
+from dns_cache import get_dns_cache, is_ip_address
+from ssl_policy import get_ssl_policy, host_key
+import http_session
+from http_session import DEFAULT_HEADERS
+from seo_checks import ParsedPage, DEFAULT_PARSER_BACKEND, PARSER_BACKEND_STREAM, check_robots_txt, check_indexing_directives, check_canonical_tag, check_links_on_page
+
+REQUEST_HEADERS = DEFAULT_HEADERS
+
+# Режими отримання сторінки
+FETCH_MODE_GET = "get"            # Один потоковий GET з редиректами (статус, редиректи і тіло з одного запиту)
+FETCH_MODE_HEAD_GET = "head+get"  # HEAD з редиректами, потім окремий GET для сторінок зі статусом 200
+FETCH_MODE_HEAD = "head"          # Лише HEAD: статуси та редиректи без SEO та перевірки посилань
+FETCH_MODES = (FETCH_MODE_GET, FETCH_MODE_HEAD_GET, FETCH_MODE_HEAD)
+# Як і раніше, за замовчуванням HEAD, потім GET; один потоковий GET вмикається явно
+DEFAULT_FETCH_MODE = FETCH_MODE_HEAD_GET
+
+# Потокове читання тіла сторінки: максимальний розмір і розмір фрагмента (байти)
+DEFAULT_MAX_BODY_BYTES = 5 * 1024 * 1024
+BODY_CHUNK_SIZE = 64 * 1024
+# Типи контенту, для яких виконуються SEO та перевірка посилань
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Глобальне обмеження кількості рядків, що перевіряються одночасно
+DEFAULT_MAX_CONCURRENCY = 20
+# Ввічливість до хостів: скільки рядків одного origin перевіряються одночасно і пауза між ними (сек)
+DEFAULT_PER_HOST_LIMIT = 2
+DEFAULT_MIN_HOST_DELAY = 0.5
+# Кількість процесів для розбору HTML (0 — розбір у потоках завантаження)
+DEFAULT_PARSE_WORKERS = 0
+
+# Скільки завантажених сторінок тримати в пам'яті для інших рядків з тим самим фінальним URL
+DEFAULT_PAGE_CACHE_SIZE = 64
+
+# Заголовки відповіді, що зберігаються разом зі сторінкою (потрібні перевіркам без повторного запиту)
+STORED_RESPONSE_HEADERS = ("X-Robots-Tag",)
+
+# Поля результату, які визначає запит до Url (статус, редиректи, помилка запиту, SSL)
+_REQUEST_RESULT_FIELDS = ("status_code", "redirect_chain", "final_url", "final_status_code", "error", "ssl_disabled")
+# Поля результату перевірки сторінки, спільні для всіх рядків (без полів пар Анкор-N/Урл-N)
+_PAGE_RESULT_FIELDS = ("robots_star_allowed", "robots_googlebot_allowed", "indexing_directives",
+                       "canonical_url", "seo_check_error", "link_check_error")
+
+# Пул процесів етапу розбору на час поточної перевірки (див. _parse_stage)
+_parse_pool = None
+# Об'єднання однакових запитів на час поточної перевірки (див. _coalescing_stage)
+_coalescer = None
+
+
+class _FetchedPage:
+    """Сторінка, завантажена один раз за запуск і спільна для всіх рядків з цим фінальним URL.
+       page — розібрана ParsedPage; якщо розбір виконує пул процесів — None, а сирі байти в html_content_bytes.
+    """
+
+    def __init__(self, final_url, headers, page=None, stopped_early=False, html_content_bytes=None, encoding=None):
+        self.final_url = final_url
+        self.headers = headers
+        self.page = page
+        self.stopped_early = stopped_early
+        self.html_content_bytes = html_content_bytes
+        self.encoding = encoding
+        # Валідатори для умовного запиту в наступних запусках
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+        # Ключ PageCache для сторінки, яку розбирає пул процесів: її зберігають після першого розбору
+        self.cache_key = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_stored(cls, entry):
+        """Відновлює сторінку із запису PageCache (без HTML, лише витягнуті дані)."""
+        headers = CaseInsensitiveDict(entry["headers"])
+        page = ParsedPage.from_data(entry["robots_meta"], entry["canonical_href"], entry["links"], entry["backend"])
+        fetched = cls(entry["final_url"], headers, page=page, stopped_early=entry["stopped_early"])
+        fetched.etag = entry["etag"]
+        fetched.last_modified = entry["last_modified"]
+        return fetched
+
+    def to_stored(self):
+        """Запис для PageCache: валідатори, потрібні заголовки та витягнуті дані сторінки."""
+        return {
+            "final_url": self.final_url, "etag": self.etag, "last_modified": self.last_modified,
+            "headers": {name: self.headers[name] for name in STORED_RESPONSE_HEADERS if name in self.headers},
+            "backend": self.page.backend, "stopped_early": self.stopped_early,
+            "robots_meta": self.page.robots_meta, "canonical_href": self.page.canonical_href, "links": self.page.links,
+        }
+
+    def conditional_headers(self):
+        """Заголовки умовного запиту (If-None-Match/If-Modified-Since) для цієї сторінки."""
+        conditional = {}
+        if self.etag:
+            conditional['If-None-Match'] = self.etag
+        if self.last_modified:
+            conditional['If-Modified-Since'] = self.last_modified
+        return conditional
+
+    def claim_cache_key(self):
+        """Повертає ключ для збереження сторінки лише першому рядку, що його запитав (далі None)."""
+        with self._lock:
+            cache_key, self.cache_key = self.cache_key, None
+        return cache_key
+
+    def covers(self, anchors):
+        """Чи придатна сторінка для пар anchors. Тіло, завантаження якого зупинено раніше
+           (знайдено все для пар іншого рядка), підходить лише якщо на ньому є точні співпадіння всіх пар.
+        """
+        if not self.stopped_early:
+            return True
+        targets = LinkTargets(self.final_url, list(zip(anchors[0::2], anchors[1::2])))
+        for link in self.page.links:
+            targets.add_link(link['href'], link['text'])
+        return targets.complete
+
+
+class _RunCoalescer:
+    """Об'єднання запитів у межах запуску: один запит на кожен унікальний Url
+       і одне завантаження та розбір на кожен унікальний фінальний URL.
+    """
 
-from utils import normalize_url, detect_encoding, is_ssl_error
-from seo_checks import check_robots_txt, check_indexing_directives, check_canonical_tag, check_links_on_page
+    def __init__(self, page_cache_size=DEFAULT_PAGE_CACHE_SIZE):
+        # Звільнені результати Url (як і сторінки) тримаються в межах page_cache_size — для рядків наступних частин
+        self.urls = SingleFlight(keep_released=page_cache_size)
+        self.pages = SingleFlight(max_entries=page_cache_size)
+
+    def expect_rows(self, rows_data):
+        """Реєструє рядки частини: результат запиту до Url звільняється, щойно його отримали всі рядки з цим Url."""
+        url_counts = Counter(row.get("Url") for row in rows_data)
+        for url, count in url_counts.items():
+            if isinstance(url, str) and url:
+                self.urls.expect(url, count)
 
 # --- НОВА ДОПОМІЖНА ФУНКЦІЯ для SEO та перевірки посилань ---
-def _perform_seo_and_link_checks(final_url, html_content, get_headers, anchor1, url1, anchor2, url2, anchor3, url3, verify_ssl=True):
-    """Виконує перевірки robots.txt, директив індексації, canonical та посилань на сторінці."""
+def _empty_link_results(pair_count):
+    """Початкові значення полів перевірки посилань для pair_count пар."""
+    link_results = {}
+    for number in range(1, pair_count + 1):
+        link_results.update({f"url{number}_found": "Н/Д", f"anchor{number}_match": "Н/Д", f"url{number}_rel": None})
+    return link_results
+
+def _run_page_checks(final_url, html_content, get_headers, anchors, seo_results):
+    """Етап розбору: директиви індексації, canonical та посилання на сторінці (CPU-робота без мережі).
+       html_content — HTML-рядок або вже розібрана ParsedPage. Результати записуються в seo_results.
+    """
+    # HTML розбирається один раз і спільно використовується всіма перевірками нижче
+    page = html_content if isinstance(html_content, ParsedPage) else ParsedPage(html_content)
+
+    # b. Перевірка Meta Robots / X-Robots-Tag
+    seo_results["indexing_directives"] = check_indexing_directives(final_url, get_headers, page)
+
+    # c. Перевірка Canonical
+    seo_results["canonical_url"] = check_canonical_tag(final_url, page)
+
+    # d. Перевірка посилань та анкорів
+    link_check_results = check_links_on_page(page, final_url, *anchors)
+    # Оновлюємо seo_results полями з link_check_results
+    seo_results.update(link_check_results)
+    if "error" in link_check_results and link_check_results["error"]:
+         seo_results["link_check_error"] = link_check_results["error"]
+         # Усуваємо поле 'error' з link_check_results, щоб воно не перезаписало інші помилки
+         del seo_results["error"]
+
+def _check_page_in_process(final_url, html_content_bytes, encoding, get_headers, anchors, parser_backend, page_data=False):
+    """Етап розбору в процесі пулу: декодує HTML і виконує _run_page_checks.
+       Повертає (результати, виведений текст, текст помилки або None, дані сторінки або None) — друкує їх уже потік рядка.
+       page_data=True — також повертає витягнуті дані сторінки (аргументи ParsedPage.from_data) для PageCache.
+    """
+    seo_results = {}
+    error = None
+    extracted = None
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            page = ParsedPage(html_content_bytes.decode(encoding, errors='replace'), parser_backend)
+            _run_page_checks(final_url, page, get_headers, anchors, seo_results)
+            if page_data:
+                extracted = {"robots_meta": page.robots_meta, "canonical_href": page.canonical_href,
+                             "links": page.links, "backend": page.backend}
+        except Exception as e:
+            error = str(e)
+    return seo_results, output.getvalue(), error, extracted
+
+def _perform_seo_and_link_checks(final_url, html_content, get_headers, anchors, verify_ssl=True, parse_job=None):
+    """Виконує перевірки robots.txt, директив індексації, canonical та посилань на сторінці.
+       html_content — HTML-рядок або вже розібрана ParsedPage; anchors — (anchor1, url1, anchor2, url2, ...).
+       parse_job — Future з _check_page_in_process, якщо сторінка розбирається в пулі процесів.
+    """
     print(f"   ├── Виконуємо SEO та перевірку посилань для: {final_url} (SSL Verify: {verify_ssl})")
     seo_results = {
         "robots_star_allowed": None,
@@ -17,9 +213,7 @@ def _perform_seo_and_link_checks(final_url, html_content, get_headers, anchor1,
         "canonical_url": None,
         "seo_check_error": None,
         # Результати перевірки посилань
-        "url1_found": "Н/Д", "anchor1_match": "Н/Д", "url1_rel": None,
-        "url2_found": "Н/Д", "anchor2_match": "Н/Д", "url2_rel": None,
-        "url3_found": "Н/Д", "anchor3_match": "Н/Д", "url3_rel": None,
+        **_empty_link_results(len(anchors) // 2),
         "link_check_error": None
     }
     try:
@@ -27,20 +221,15 @@ def _perform_seo_and_link_checks(final_url, html_content, get_headers, anchor1,
         seo_results["robots_star_allowed"] = check_robots_txt(final_url, '*', verify_ssl=verify_ssl)
         seo_results["robots_googlebot_allowed"] = check_robots_txt(final_url, 'Googlebot', verify_ssl=verify_ssl)
 
-        # b. Перевірка Meta Robots / X-Robots-Tag
-        seo_results["indexing_directives"] = check_indexing_directives(final_url, get_headers, html_content)
-
-        # c. Перевірка Canonical
-        seo_results["canonical_url"] = check_canonical_tag(final_url, html_content)
-
-        # d. Перевірка посилань та анкорів
-        link_check_results = check_links_on_page(html_content, final_url, anchor1, url1, anchor2, url2, anchor3, url3)
-        # Оновлюємо seo_results полями з link_check_results
-        seo_results.update(link_check_results)
-        if "error" in link_check_results and link_check_results["error"]:
-             seo_results["link_check_error"] = link_check_results["error"]
-             # Усуваємо поле 'error' з link_check_results, щоб воно не перезаписало інші помилки
-             del seo_results["error"]
+        # b-d. Перевірки сторінки: тут же або в пулі процесів (тоді потік лише чекає на результат)
+        if parse_job is None:
+            _run_page_checks(final_url, html_content, get_headers, anchors, seo_results)
+        else:
+            page_results, output, error, _ = parse_job.result()
+            sys.stdout.write(output)
+            seo_results.update(page_results)
+            if error is not None:
+                raise RuntimeError(error)
 
     except Exception as seo_e:
         error_msg = f"Помилка під час SEO/Link перевірок: {seo_e}"
@@ -83,159 +272,411 @@ def _process_response(response, url, ssl_disabled=False):
 
     return redirect_chain, final_url, final_status_code, status_code
 
-def check_status_code_requests(rows_data):
-    """Перевіряє статус-коди URL, редиректи та виконує SEO та перевірки посилань."""
-    print("\n\n🔍 ПЕРЕВІРКА СТАТУС-КОДІВ URL, SEO-ПАРАМЕТРІВ ТА ПОСИЛАНЬ...\n")
-
-    results = []
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.6167.184 Safari/537.36'}
-
-    for i, row_info in enumerate(rows_data, 1):
-        url = row_info.get("Url")
-        anchor1 = row_info.get("Анкор-1")
-        url1 = row_info.get("Урл-1")
-        anchor2 = row_info.get("Анкор-2")
-        url2 = row_info.get("Урл-2")
-        anchor3 = row_info.get("Анкор-3")
-        url3 = row_info.get("Урл-3")
-
-        # Ініціалізація результатів для поточного URL
-        current_result = {
-            "url": url, "status_code": 0, "redirect_chain": [],
-            "final_url": url, "final_status_code": 0, "error": None,
-            "ssl_disabled": False, "robots_star_allowed": None,
-            "robots_googlebot_allowed": None, "indexing_directives": None,
-            "canonical_url": None, "seo_check_error": None,
-            # Поля для результатів перевірки посилань
-            "url1_found": "Н/Д", "anchor1_match": "Н/Д", "url1_rel": None,
-            "url2_found": "Н/Д", "anchor2_match": "Н/Д", "url2_rel": None,
-            "url3_found": "Н/Д", "anchor3_match": "Н/Д", "url3_rel": None,
-            "link_check_error": None
-        }
-
-        # Зберігаємо початкові дані для оновлення таблиці
-        current_result.update(row_info)
-
-        if not url or pd.isna(url):
-            print(f"{i}. URL порожній, пропускаємо")
-            current_result["error"] = "URL порожній"
-            results.append(current_result)
-            continue
-
-        print(f"{i}. Перевіряємо: {url}")
-        ssl_verify = True # Починаємо з увімкненим SSL
+def _page_check_error(current_result, error_label, error, ssl_verify):
+    """Записує помилку отримання/обробки контенту сторінки в поля SEO та перевірки посилань."""
+    error_msg = f"{error_label}{' (SSL вимкнено)' if not ssl_verify else ''}: {error}"
+    print(f"   └── ⚠️ {error_msg}")
+    # Записуємо помилку і в seo_check_error і в link_check_error, оскільки контент недоступний для обох
+    current_result["seo_check_error"] = error_msg
+    current_result["link_check_error"] = error_msg
+
+def _read_body(response, final_url, anchors, max_body_bytes=DEFAULT_MAX_BODY_BYTES, extract=True):
+    """Потоково читає тіло відповіді: не більше max_body_bytes і зупиняється раніше,
+       щойно пройдено <head> (директиви, canonical) і знайдено точні співпадіння для всіх пар Урл/Анкор.
+       Кожен фрагмент одразу подається в екстрактор; повертає (байти тіла, екстрактор, чи зупинено раніше).
+       extract=False — лише читання без розбору і ранньої зупинки (розбір виконає пул процесів), екстрактор None.
+    """
+    extractor = None
+    if extract:
+        targets = LinkTargets(final_url, list(zip(anchors[0::2], anchors[1::2])))
+        extractor = HtmlStreamExtractor(
+            encoding=get_charset_from_content_type(response.headers.get('Content-Type')) or 'utf-8',
+            on_link=targets.add_link
+        )
+    chunks = []
+    size = 0
+    stopped_early = False
+    for chunk in response.iter_content(BODY_CHUNK_SIZE):
+        chunk = chunk[:max_body_bytes - size]
+        chunks.append(chunk)
+        size += len(chunk)
+        if extractor is not None:
+            extractor.feed_bytes(chunk)
+        if size >= max_body_bytes:
+            print(f"   ├── ⚠️ Тіло сторінки обрізано до {max_body_bytes} байт")
+            break
+        if extractor is not None and extractor.head_closed and targets.complete:
+            print(f"   ├── Знайдено все необхідне після {size} байт, завантаження зупинено")
+            stopped_early = True
+            break
+    return b"".join(chunks), extractor, stopped_early
+
+def _load_page(response, final_url, anchors, max_body_bytes=DEFAULT_MAX_BODY_BYTES, parser_backend=DEFAULT_PARSER_BACKEND,
+               cache_key=None, stored=None):
+    """Завантажує тіло сторінки і (якщо немає пулу процесів) розбирає його. Повертає _FetchedPage.
+       Відповідь 304 — сторінка не змінилась: повертається збережена stored без завантаження і розбору.
+       Нова сторінка з ETag/Last-Modified зберігається в PageCache під ключем cache_key.
+    """
+    if response.status_code == 304 and stored is not None:
+        print(f"   ├── Сторінка не змінилась з попереднього запуску (304), використовуємо збережені дані")
+        get_page_cache().record_revalidated()
+        return stored
+
+    content_type = response.headers.get('Content-Type')
+    parse_pool = _parse_pool
+    html_content_bytes, extractor, stopped_early = _read_body(response, final_url, anchors, max_body_bytes,
+                                                              extract=parse_pool is None)
+    encoding = detect_encoding(html_content_bytes, content_type)
+    if parse_pool is not None:
+        # Сирі байти розбере пул процесів — окремо для пар кожного рядка; у PageCache сторінка
+        # потрапить після першого розбору (див. _check_fetched_page)
+        fetched = _FetchedPage(final_url, response.headers, html_content_bytes=html_content_bytes, encoding=encoding)
+        if cache_key and (fetched.etag or fetched.last_modified):
+            fetched.cache_key = cache_key
+        return fetched
+
+    html_content = html_content_bytes.decode(encoding, errors='replace')
+    if parser_backend == PARSER_BACKEND_STREAM and codecs.lookup(encoding).name == extractor.encoding:
+        # Екстрактор уже розібрав тіло під час завантаження в правильному кодуванні
+        page = ParsedPage.from_extractor(extractor, html_content)
+    else:
+        page = ParsedPage(html_content, parser_backend)
+    fetched = _FetchedPage(final_url, response.headers, page=page, stopped_early=stopped_early)
+    if cache_key and (fetched.etag or fetched.last_modified):
+        get_page_cache().put(cache_key, fetched.to_stored())
+    return fetched
+
+def _get_page(response, final_url, anchors, max_body_bytes=DEFAULT_MAX_BODY_BYTES, parser_backend=DEFAULT_PARSER_BACKEND,
+              cache_key=None, stored=None):
+    """Повертає сторінку final_url: завантажує її лише раз за запуск, інші рядки беруть уже завантажену."""
+    coalescer = _coalescer
+    if coalescer is None:
+        return _load_page(response, final_url, anchors, max_body_bytes, parser_backend, cache_key, stored)
+
+    fetched, shared = coalescer.pages.run(
+        final_url, lambda: _load_page(response, final_url, anchors, max_body_bytes, parser_backend, cache_key, stored)
+    )
+    if not shared:
+        return fetched
+    if fetched.covers(anchors):
+        print(f"   ├── Сторінку вже завантажено для іншого рядка, використовуємо її")
+        return fetched
+    # Інший рядок зупинив завантаження раніше, ніж трапились посилання цього рядка — читаємо своє тіло
+    return _load_page(response, final_url, anchors, max_body_bytes, parser_backend, cache_key, stored)
+
+def _check_fetched_page(fetched, current_result, anchors, ssl_verify, parser_backend=DEFAULT_PARSER_BACKEND):
+    """Виконує SEO та перевірку посилань для пар anchors на вже завантаженій сторінці."""
+    parse_job = None
+    cache_key = None
+    if fetched.page is None:
+        # Сирі байти йдуть у пул процесів, а потік тим часом перевіряє robots.txt
+        cache_key = fetched.claim_cache_key()
+        parse_job = _parse_pool.submit(_check_page_in_process, fetched.final_url, fetched.html_content_bytes,
+                                       fetched.encoding, fetched.headers, anchors, parser_backend, cache_key is not None)
+    seo_link_results = _perform_seo_and_link_checks(
+        fetched.final_url, fetched.page, fetched.headers, anchors, verify_ssl=ssl_verify, parse_job=parse_job
+    )
+    current_result.update(seo_link_results)
+    if cache_key is not None and parse_job.exception() is None:
+        page_data = parse_job.result()[3]
+        if page_data is not None:
+            # Сторінка з ETag/Last-Modified зберігається для умовного запиту в наступному запуску
+            fetched.page = ParsedPage.from_data(**page_data)
+            get_page_cache().put(cache_key, fetched.to_stored())
+
+def _check_page(response, final_url, current_result, anchors, ssl_verify, max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+                parser_backend=DEFAULT_PARSER_BACKEND, cache_key=None, stored=None):
+    """Читає тіло відповіді зі статусом 200 і виконує SEO та перевірку посилань.
+       Повертає (сторінка, поля запиту до перевірки сторінки) для інших рядків з тим самим Url
+       або None, якщо сторінку не перевірено.
+    """
+    content_type = response.headers.get('Content-Type')
+    mime_type = get_mime_type(content_type)
+    if content_type and mime_type not in HTML_CONTENT_TYPES:
+        # Не HTML (PDF, зображення тощо) — тіло навіть не завантажуємо
+        _page_check_error(current_result, "Пропущено перевірку контенту", f"тип '{mime_type}' не є HTML", ssl_verify)
+        return None
 
-        try:
-            # 1. Перша спроба запиту (з SSL або без, залежно від попередніх помилок)
-            response = requests.head(url, allow_redirects=True, timeout=10, headers=headers, verify=ssl_verify)
-            redirect_chain, final_url, final_status_code, status_code = _process_response(response, url)
+    try:
+        fetched = _get_page(response, final_url, anchors, max_body_bytes, parser_backend, cache_key, stored)
+        request_result = {field: current_result[field] for field in _REQUEST_RESULT_FIELDS}
+        # Викликаємо функцію для SEO та перевірки посилань
+        _check_fetched_page(fetched, current_result, anchors, ssl_verify, parser_backend)
+        return fetched, request_result
+    except requests.exceptions.RequestException as get_e:
+        _page_check_error(current_result, "Помилка GET-запиту", get_e, ssl_verify)
+    except Exception as general_e: # Загальна помилка під час обробки GET відповіді
+        _page_check_error(current_result, "Загальна помилка обробки контенту", general_e, ssl_verify)
+    return None
+
+def _stored_page(cache_key, anchors):
+    """Збережена з попереднього запуску сторінка для умовного запиту або None.
+       Копія, завантаження якої було зупинено раніше, придатна лише якщо на ній є всі пари цього рядка.
+    """
+    entry = get_page_cache().get(cache_key)
+    if entry is None:
+        return None
+    try:
+        stored = _FetchedPage.from_stored(entry)
+    except (KeyError, TypeError, ValueError):
+        return None # Запис старого або пошкодженого формату — завантажуємо сторінку звичайно
+    if not (stored.etag or stored.last_modified) or not stored.covers(anchors):
+        return None
+    return stored
+
+def _conditional_get(url, headers, stored, **kwargs):
+    """GET з умовними заголовками збереженої сторінки stored (якщо вона є).
+       304 для іншої сторінки (редирект тепер веде деінде) не придатний — запит повторюється без умовних заголовків.
+    """
+    if stored is None:
+        return http_session.get(url, headers=headers, **kwargs)
+    response = http_session.get(url, headers={**headers, **stored.conditional_headers()}, **kwargs)
+    if response.status_code == 304 and normalize_url(response.url) != stored.final_url:
+        response.close()
+        response = http_session.get(url, headers=headers, **kwargs)
+    return response
+
+def _fetch_and_check(url, current_result, headers, anchors, fetch_mode, ssl_verify, max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+                     parser_backend=DEFAULT_PARSER_BACKEND):
+    """Виконує запит(и) до URL відповідно до fetch_mode і заповнює current_result.
+       Помилки основного запиту (HEAD або GET) прокидаються назовні для обробки SSL.
+       Сторінки, збережені в PageCache, запитуються умовно: на 304 тіло не завантажується.
+       Повертає результат _check_page (None, якщо сторінку не перевіряли).
+    """
+    ssl_disabled = not ssl_verify
+    page_visit = None
+
+    if fetch_mode == FETCH_MODE_GET:
+        # Один потоковий GET: редиректи та статус беремо з нього ж, тіло читаємо лише для 200
+        stored = _stored_page(url, anchors)
+        with _conditional_get(url, headers, stored, allow_redirects=True, stream=True, timeout=15, verify=ssl_verify) as response:
+            redirect_chain, final_url, final_status_code, status_code = _process_response(response, url, ssl_disabled=ssl_disabled)
+            if final_status_code == 304 and stored is not None:
+                # Сторінка не змінилась: для результатів це та сама відповідь 200
+                final_status_code = 200
+                status_code = 200 if not redirect_chain else status_code
             current_result.update({
                 "status_code": status_code, "redirect_chain": redirect_chain,
-                "final_url": final_url, "final_status_code": final_status_code,
-                "error": None, "ssl_disabled": not ssl_verify
+                "final_url": final_url, "final_status_code": final_status_code
             })
-
-            # 2. Якщо фінальний статус 200, виконуємо SEO та перевірку посилань
             if final_status_code == 200:
-                try:
-                    # Робимо GET запит для отримання контенту
-                    with requests.get(final_url, timeout=15, headers=headers, verify=ssl_verify) as response_get:
-                        response_get.raise_for_status()
-                        html_content_bytes = response_get.content
-                        encoding = detect_encoding(html_content_bytes)
-                        html_content = html_content_bytes.decode(encoding, errors='replace')
-                        get_headers = response_get.headers
-
-                        # Викликаємо нову функцію для SEO та перевірки посилань
-                        seo_link_results = _perform_seo_and_link_checks(
-                            final_url, html_content, get_headers,
-                            anchor1, url1, anchor2, url2, anchor3, url3, verify_ssl=ssl_verify
-                        )
-                        current_result.update(seo_link_results)
-
-                except requests.exceptions.RequestException as get_e:
-                    error_msg = f"Помилка GET-запиту {'(SSL вимкнено)' if not ssl_verify else ''}: {get_e}"
-                    print(f"   └── ⚠️ {error_msg}")
-                    # Записуємо помилку і в seo_check_error і в link_check_error, оскільки GET провалився для обох
-                    current_result["seo_check_error"] = error_msg
-                    current_result["link_check_error"] = error_msg
-                except Exception as general_e: # Загальна помилка під час обробки GET відповіді
-                    error_msg = f"Загальна помилка обробки контенту {'(SSL вимкнено)' if not ssl_verify else ''}: {general_e}"
-                    print(f"   └── ⚠️ {error_msg}")
-                    current_result["seo_check_error"] = error_msg
-                    current_result["link_check_error"] = error_msg
+                page_visit = _check_page(response, final_url, current_result, anchors, ssl_verify, max_body_bytes, parser_backend,
+                                         cache_key=url, stored=stored)
+        return page_visit
+
+    response = http_session.head(url, allow_redirects=True, timeout=10, headers=headers, verify=ssl_verify)
+    redirect_chain, final_url, final_status_code, status_code = _process_response(response, url, ssl_disabled=ssl_disabled)
+    current_result.update({
+        "status_code": status_code, "redirect_chain": redirect_chain,
+        "final_url": final_url, "final_status_code": final_status_code
+    })
+
+    # Якщо фінальний статус 200 і потрібне тіло сторінки, робимо окремий GET
+    if final_status_code == 200 and fetch_mode == FETCH_MODE_HEAD_GET:
+        try:
+            stored = _stored_page(final_url, anchors)
+            with _conditional_get(final_url, headers, stored, stream=True, timeout=15, verify=ssl_verify) as response_get:
+                response_get.raise_for_status()
+                page_visit = _check_page(response_get, final_url, current_result, anchors, ssl_verify, max_body_bytes, parser_backend,
+                                         cache_key=final_url, stored=stored)
+        except requests.exceptions.RequestException as get_e:
+            _page_check_error(current_result, "Помилка GET-запиту", get_e, ssl_verify)
+    return page_visit
+
+def _check_row(i, row_info, headers, fetch_mode=DEFAULT_FETCH_MODE, max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+               parser_backend=DEFAULT_PARSER_BACKEND):
+    """Перевіряє один рядок таблиці: статус-код, редиректи, SEO та посилання. Повертає словник результатів."""
+    url = row_info.get("Url")
+    # Пари Анкор-N/Урл-N рядка: (anchor1, url1, anchor2, url2, ...)
+    pair_numbers = get_link_pair_numbers(row_info)
+    anchors = tuple(value for number in pair_numbers
+                    for value in (row_info.get(f"Анкор-{number}"), row_info.get(f"Урл-{number}")))
+
+    # Ініціалізація результатів для поточного URL
+    current_result = {
+        "url": url, "status_code": 0, "redirect_chain": [],
+        "final_url": url, "final_status_code": 0, "error": None,
+        "ssl_disabled": False, "robots_star_allowed": None,
+        "robots_googlebot_allowed": None, "indexing_directives": None,
+        "canonical_url": None, "seo_check_error": None,
+        # Поля для результатів перевірки посилань
+        **_empty_link_results(len(pair_numbers)),
+        "link_check_error": None
+    }
+
+    # Зберігаємо початкові дані для оновлення таблиці
+    current_result.update(row_info)
+
+    if not url or pd.isna(url):
+        print(f"{i}. URL порожній, пропускаємо")
+        current_result["error"] = "URL порожній"
+        return current_result
+
+    print(f"{i}. Перевіряємо: {url}")
+    coalescer = _coalescer
+    if coalescer is None:
+        _check_url(url, current_result, headers, anchors, fetch_mode, max_body_bytes, parser_backend)
+    else:
+        # Рядки з однаковим Url чекають на перший запит і використовують його результат
+        first_check, shared = coalescer.urls.run(url, lambda: (
+            i, current_result, _check_url(url, current_result, headers, anchors, fetch_mode, max_body_bytes, parser_backend)
+        ))
+        if shared:
+            _reuse_url_check(first_check, url, current_result, headers, anchors, fetch_mode, max_body_bytes, parser_backend)
+
+    print("---")
+    return current_result
+
+def _check_url(url, current_result, headers, anchors, fetch_mode=DEFAULT_FETCH_MODE, max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+               parser_backend=DEFAULT_PARSER_BACKEND):
+    """Запит до Url з повтором без перевірки SSL у разі SSL-помилки; заповнює current_result.
+       Повертає результат _check_page (None, якщо сторінку не перевіряли).
+    """
+    request_label = "GET" if fetch_mode == FETCH_MODE_GET else "HEAD"
+    page_visit = None
+    ssl_policy = get_ssl_policy()
+    # Хост уже потребував вимкнення SSL у цьому (або збереженому) запуску — перевірена спроба знову не вдасться
+    ssl_error_text = ssl_policy.fallback_error(url)
+
+    if ssl_error_text is not None:
+        current_result["status_code"] = 0
+        current_result["final_status_code"] = 0
+        print(f"   🔓 Хост раніше потребував вимкнення SSL ({ssl_error_text})")
+        print(f"   🔄 Запит одразу з вимкненою перевіркою SSL...")
+    else:
+        try:
+            # 1. Перша спроба запиту з увімкненою перевіркою SSL
+            return _fetch_and_check(url, current_result, headers, anchors, fetch_mode, True, max_body_bytes, parser_backend)
 
         except requests.exceptions.RequestException as e:
             error_text = str(e)
-            current_result["status_code"] = 0 # Встановлюємо тут, бо запит HEAD не вдався
+            current_result["status_code"] = 0 # Встановлюємо тут, бо основний запит не вдався
             current_result["final_status_code"] = 0
 
-            # Перевірка на SSL помилку ТІЛЬКИ при першій спробі (коли ssl_verify=True)
-            if ssl_verify and is_ssl_error(error_text):
-                print(f"   ⚠️ Виявлено помилку SSL: {error_text}")
-                print(f"   🔄 Повторюємо запит з вимкненою перевіркою SSL...")
-                ssl_verify = False # Вимикаємо SSL для наступної спроби
-                current_result["ssl_disabled"] = True # Відмічаємо, що SSL вимкнено
-
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
-                    try:
-                        # Повторюємо HEAD запит без SSL
-                        response_nossl = requests.head(url, allow_redirects=True, timeout=10, headers=headers, verify=ssl_verify)
-                        redirect_chain, final_url, final_status_code, status_code = _process_response(response_nossl, url, ssl_disabled=True)
-                        current_result.update({
-                            "status_code": status_code, "redirect_chain": redirect_chain,
-                            "final_url": final_url, "final_status_code": final_status_code,
-                            "error": "SSL вимкнено: " + error_text # Зберігаємо початкову помилку SSL
-                        })
-
-                        # Якщо фінальний статус 200 після SSL retry, виконуємо SEO та перевірку посилань
-                        if final_status_code == 200:
-                            try:
-                                # Робимо GET запит без SSL
-                                with requests.get(final_url, timeout=15, headers=headers, verify=ssl_verify) as response_get_nossl:
-                                    response_get_nossl.raise_for_status()
-                                    html_content_bytes = response_get_nossl.content
-                                    encoding = detect_encoding(html_content_bytes)
-                                    html_content = html_content_bytes.decode(encoding, errors='replace')
-                                    get_headers = response_get_nossl.headers
-
-                                    # Викликаємо нову функцію для SEO та перевірки посилань
-                                    seo_link_results = _perform_seo_and_link_checks(
-                                        final_url, html_content, get_headers,
-                                        anchor1, url1, anchor2, url2, anchor3, url3, verify_ssl=ssl_verify
-                                    )
-                                    current_result.update(seo_link_results)
-
-                            except requests.exceptions.RequestException as get_e:
-                                error_msg = f"Помилка GET-запиту (SSL вимкнено): {get_e}"
-                                print(f"   └── ⚠️ {error_msg}")
-                                current_result["seo_check_error"] = error_msg
-                                current_result["link_check_error"] = error_msg
-                            except Exception as general_e:
-                                error_msg = f"Загальна помилка обробки контенту (SSL вимкнено): {general_e}"
-                                print(f"   └── ⚠️ {error_msg}")
-                                current_result["seo_check_error"] = error_msg
-                                current_result["link_check_error"] = error_msg
-
-                    except requests.exceptions.RequestException as e2:
-                        # Помилка навіть з вимкненим SSL
-                        final_error = f"Помилка HEAD і з вимкненим SSL: {str(e2)}"
-                        current_result["error"] = final_error # Перезаписуємо помилку
-                        current_result["status_code"] = 0 # Статус невідомий
-                        current_result["final_status_code"] = 0
-                        print(f"   ❌ {final_error}")
-
-            else: # Якщо помилка не SSL, або це вже друга спроба (з вимкненим SSL)
+            if not is_ssl_error(error_text): # Якщо помилка не SSL
                 current_result["error"] = error_text # Зберігаємо поточну помилку
-                print(f"   ❌ Помилка HEAD: {current_result['error']}")
+                print(f"   ❌ Помилка {request_label}: {current_result['error']}")
                 # status_code та final_status_code вже встановлені на 0 на початку блоку except
+                return page_visit
+
+            # Перевірка на SSL помилку: повторюємо запит з вимкненою перевіркою SSL
+            print(f"   ⚠️ Виявлено помилку SSL: {error_text}")
+            print(f"   🔄 Повторюємо запит з вимкненою перевіркою SSL...")
+            # Запам'ятовуємо хост, на якому сталася помилка (це може бути і хост редиректу), і хост Url рядка:
+            # наступні рядки перевіряються за хостом свого Url, а їх редирект веде туди ж
+            failed_url = getattr(getattr(e, "request", None), "url", None) or url
+            ssl_policy.record(failed_url, e)
+            if host_key(failed_url) != host_key(url):
+                ssl_policy.record(url, e)
+            ssl_error_text = error_text
+
+    current_result["ssl_disabled"] = True # Відмічаємо, що SSL вимкнено
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            current_result["error"] = "SSL вимкнено: " + ssl_error_text # Зберігаємо початкову помилку SSL
+            page_visit = _fetch_and_check(url, current_result, headers, anchors, fetch_mode, False, max_body_bytes, parser_backend)
+        except requests.exceptions.RequestException as e2:
+            # Помилка навіть з вимкненим SSL
+            final_error = f"Помилка {request_label} і з вимкненим SSL: {str(e2)}"
+            current_result["error"] = final_error # Перезаписуємо помилку
+            current_result["status_code"] = 0 # Статус невідомий
+            current_result["final_status_code"] = 0
+            print(f"   ❌ {final_error}")
 
-        results.append(current_result)
-        print("---")
+    return page_visit
 
+def _reuse_url_check(first_check, url, current_result, headers, anchors, fetch_mode=DEFAULT_FETCH_MODE,
+                     max_body_bytes=DEFAULT_MAX_BODY_BYTES, parser_backend=DEFAULT_PARSER_BACKEND):
+    """Заповнює current_result з результату першого рядка з тим самим Url;
+       SEO та перевірка посилань виконуються для власних пар рядка на вже завантаженій сторінці.
+    """
+    first_row, first_result, page_visit = first_check
+    print(f"   ↪ Запит уже виконано для рядка {first_row}: {first_result['final_url']} → {first_result['final_status_code']}")
+    if page_visit is None:
+        # Сторінку не перевіряли (не 200, лише HEAD, не HTML або помилка завантаження) — результат той самий
+        for field in _REQUEST_RESULT_FIELDS + _PAGE_RESULT_FIELDS:
+            current_result[field] = first_result[field]
+        return
+
+    fetched, request_result = page_visit
+    if not fetched.covers(anchors):
+        print(f"   ↪ Посилання цього рядка можуть бути далі, ніж завантажено, перевіряємо сторінку заново")
+        _check_url(url, current_result, headers, anchors, fetch_mode, max_body_bytes, parser_backend)
+        return
+    current_result.update(request_result)
+    _check_fetched_page(fetched, current_result, anchors, not request_result["ssl_disabled"], parser_backend)
+
+@contextlib.contextmanager
+def _parse_stage(parse_workers=DEFAULT_PARSE_WORKERS):
+    """Запускає пул процесів для розбору HTML на час перевірки. parse_workers=0 — без пулу."""
+    global _parse_pool
+    if not parse_workers:
+        yield None
+        return
+    # fork (Linux, Colab): дочірнім процесам не потрібно заново імпортувати main.py
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    pool = ProcessPoolExecutor(max_workers=parse_workers, mp_context=context)
+    # Процеси створюються першим же завданням — ще до запуску потоків завантаження
+    pool.submit(int).result()
+    _parse_pool = pool
+    try:
+        yield pool
+    finally:
+        _parse_pool = None
+        pool.shutdown()
+
+@contextlib.contextmanager
+def _coalescing_stage():
+    """Вмикає на час перевірки об'єднання однакових запитів: кожен Url і кожен фінальний URL — один раз."""
+    global _coalescer
+    coalescer = _RunCoalescer()
+    _coalescer = coalescer
+    try:
+        yield coalescer
+    finally:
+        _coalescer = None
+
+@contextlib.contextmanager
+def _dns_stage():
+    """На час перевірки з'єднання спільного HTTP-пулу відкриваються до адрес з кешу DNS (див. dns_cache)."""
+    cache = get_dns_cache()
+    if cache is None:
+        yield None
+        return
+    try:
+        with http_session.use_dns_cache(cache):
+            yield cache
+    finally:
+        # Відсутні хости трималися в кеші до кінця перевірки
+        cache.release_missing()
+
+def _prefetch_hosts(cache, rows_data):
+    """Перед перевіркою рядків паралельно визначає адреси всіх хостів зі стовпця Url.
+       Відсутні хости лишаються в кеші до кінця перевірки; тимчасові збої резолвера не кешуються.
+    """
+    hosts = {urlsplit(url).hostname for url in (row.get("Url") for row in rows_data) if isinstance(url, str) and url}
+    hosts = {host for host in hosts if host and not is_ip_address(host)}
+    started = time.monotonic()
+    missing, failed = cache.prefetch(hosts)
+    print(f"🌐 DNS: визначено {len(hosts) - len(missing) - len(failed)} з {len(hosts)} хостів за {time.monotonic() - started:.1f} с"
+          + (f", не існують: {len(missing)} (їх рядки завершаться помилкою без з'єднання)" if missing else "")
+          + (f", не вдалося визначити: {len(failed)} (запити спробують ще раз)" if failed else ""))
+
+def _print_dns_stats(cache):
+    """Виводить статистику кешу DNS за перевірку."""
+    if cache is not None:
+        print(f"🌐 Кеш DNS: {cache.hits} з кешу, {cache.misses} звернень до резолвера")
+
+def _print_coalescing_stats(coalescer):
+    """Виводить, скільки запитів і завантажень сторінок заощаджено об'єднанням."""
+    print(f"🔁 Об'єднання запитів: {coalescer.urls.hits} рядків з уже перевіреним Url, "
+          f"{coalescer.pages.hits} сторінок з уже завантаженим фінальним URL")
+
+def _count_results(results):
+    """Лічильники підсумкової статистики для результатів перевірки (лічильники частин запуску додаються)."""
     # Статистика перевірок
-    stats = {
+    stats = Counter({
         "всього": len(results),
         "успішні_200_з_перевірками": sum(1 for r in results if r["final_status_code"] == 200 and not r.get("seo_check_error") and not r.get("link_check_error")),
         "помилки_seo_link": sum(1 for r in results if r["final_status_code"] == 200 and (r.get("seo_check_error") or r.get("link_check_error"))),
@@ -243,7 +684,15 @@ def check_status_code_requests(rows_data):
         "помилки_запиту": sum(1 for r in results if r.get("error") and r["final_status_code"] != 200),
         "ssl_вимкнено": sum(1 for r in results if r["ssl_disabled"]),
         "інші_коди": sum(1 for r in results if r["final_status_code"] not in [0, 200] and not r["error"]) # Коди, які не 0 або 200 і без помилок запиту
-    }
+    })
+    # Посилання кожної пари: знайдені Урл-N і співпадіння Анкор-N
+    for number in get_link_pair_numbers(key for r in results for key in r):
+        stats[f"Урл-{number}"] = sum(1 for r in results if r.get(f'url{number}_found') == 'Так')
+        stats[f"Анкор-{number}"] = sum(1 for r in results if r.get(f'anchor{number}_match') == 'Так')
+    return stats
+
+def _print_stats(stats):
+    """Виводить підсумкову статистику перевірок за лічильниками _count_results."""
 
     # Оновлюємо вивід статистики
     print(f"\n📊 РЕЗУЛЬТАТИ ПЕРЕВІРКИ {stats['всього']} URL:")
@@ -253,20 +702,234 @@ def check_status_code_requests(rows_data):
     print(f"🔄 Запити з вимкненим SSL (успішні або з помилками): {stats['ssl_вимкнено']}")
     print(f"📶 Фінальні статус-коди відмінні від 0 або 200: {stats['інші_коди']}")
 
-    # Додаткова статистика по посиланнях
-    url1_found_count = sum(1 for r in results if r.get('url1_found') == 'Так')
-    url2_found_count = sum(1 for r in results if r.get('url2_found') == 'Так')
-    anchor1_match_count = sum(1 for r in results if r.get('anchor1_match') == 'Так')
-    anchor2_match_count = sum(1 for r in results if r.get('anchor2_match') == 'Так')
-    print(f"🔗 Знайдено Урл-1: {url1_found_count}")
-    print(f"🔗 Знайдено Урл-2: {url2_found_count}")
-    print(f"⚓ Співпадінь Анкор-1: {anchor1_match_count}")
-    print(f"⚓ Співпадінь Анкор-2: {anchor2_match_count}")
-
-    # Додаткова статистика для пари 3
-    url3_found_count = sum(1 for r in results if r.get('url3_found') == 'Так')
-    anchor3_match_count = sum(1 for r in results if r.get('anchor3_match') == 'Так')
-    print(f"🔗 Знайдено Урл-3: {url3_found_count}")
-    print(f"⚓ Співпадінь Анкор-3: {anchor3_match_count}")
-
-    return results 
\ No newline at end of file
+    # Додаткова статистика по посиланнях (для кожної пари Анкор-N/Урл-N)
+    for number in get_link_pair_numbers(stats):
+        print(f"🔗 Знайдено Урл-{number}: {stats[f'Урл-{number}']}")
+        print(f"⚓ Співпадінь Анкор-{number}: {stats[f'Анкор-{number}']}")
+
+def _print_text_cache_stats():
+    """Виводить статистику кешу нормалізації анкорів."""
+    info = normalize_text_cache_info()
+    print(f"🔤 Кеш нормалізації анкорів: {info.hits} з кешу, {info.misses} обчислено ({info.currsize} записів)")
+
+def _print_encoding_stats():
+    """Виводить, скільки разів кожне джерело визначило кодування сторінки."""
+    stats = ENCODING_DETECTION_STATS
+    print(f"🔎 Кодування визначено: із заголовка {stats['header']}, за BOM {stats['bom']}, "
+          f"з <meta> {stats['meta']}, через chardet {stats['chardet']}")
+
+def _print_page_cache_stats():
+    """Виводить, скільки сторінок не змінились з попереднього запуску і скільки збережено.
+       Якщо за запуск сторінки не зберігались і не читались (наприклад, режим head), нічого не виводить.
+    """
+    cache = peek_page_cache()
+    if cache is None:
+        return
+    print(f"💾 Збережені сторінки: {cache.revalidated} не змінились (304), {cache.stored} збережено")
+
+def _finish_ssl_policy():
+    """Зберігає SSL-політики хостів (якщо увімкнено збереження) і виводить, скільки запитів обійшлися без зайвої спроби."""
+    policy = get_ssl_policy()
+    policy.save()
+    if len(policy):
+        print(f"🔓 Хостів з вимкненим SSL: {len(policy)}; запитів одразу без перевірки SSL: {policy.hits}")
+
+def _finish_robots_cache():
+    """Зберігає кеш robots.txt на диск і виводить його статистику."""
+    cache = get_robots_cache()
+    cache.save()
+    print(f"🤖 Кеш robots.txt: {cache.hits} з кешу, {cache.misses} завантажено")
+
+class _CheckRun:
+    """Один запуск перевірки, рядки якого надходять частинами (див. check_run): номери рядків, очікування
+       об'єднання запитів і лічильники статистики наскрізні для всіх частин.
+    """
+
+    def __init__(self, coalescer, dns_cache, fetch_mode, max_body_bytes, parser_backend, on_result,
+                 max_concurrency=None, per_host_limit=DEFAULT_PER_HOST_LIMIT, min_host_delay=DEFAULT_MIN_HOST_DELAY):
+        self.coalescer = coalescer
+        self.dns_cache = dns_cache
+        self.fetch_mode = fetch_mode
+        self.max_body_bytes = max_body_bytes
+        self.parser_backend = parser_backend
+        self.on_result = on_result
+        self.max_concurrency = max_concurrency
+        self.scheduler = None if max_concurrency is None else HostScheduler(
+            max_concurrency, per_host_limit=per_host_limit, min_host_delay=min_host_delay)
+        self.executor = None    # Пул потоків асинхронного рушія (задає check_run)
+        self.row_output = None  # Вивід рядків цілими блоками (задає check_run)
+        self.rows_started = 0
+        self.stats = Counter()
+
+    def _start_chunk(self, rows_data):
+        """Готує частину до перевірки і повертає її рядки з наскрізними номерами."""
+        self.coalescer.expect_rows(rows_data)
+        if self.dns_cache is not None:
+            _prefetch_hosts(self.dns_cache, rows_data)
+        numbered_rows = list(enumerate(rows_data, self.rows_started + 1))
+        self.rows_started += len(rows_data)
+        return numbered_rows
+
+    def check(self, rows_data):
+        """Перевіряє частину рядків і повертає словники результатів у порядку рядків."""
+        if self.scheduler is not None:
+            return _run_coroutine(self.check_async(rows_data))
+        results = []
+        for i, row_info in self._start_chunk(rows_data):
+            results.append(_check_row(i, row_info, REQUEST_HEADERS, self.fetch_mode, self.max_body_bytes, self.parser_backend))
+            if self.on_result is not None:
+                self.on_result(row_info, results[-1])
+        self.stats.update(_count_results(results))
+        return results
+
+    async def check_async(self, rows_data):
+        """Асинхронна перевірка частини рядків (check_run з max_concurrency)."""
+        loop = asyncio.get_running_loop()
+
+        async def check_row(numbered_row):
+            i, row_info = numbered_row
+            # requests блокує потік, тому кожен рядок виконується в пулі потоків
+            result = await loop.run_in_executor(self.executor, self.row_output.run, _check_row, i, row_info, REQUEST_HEADERS,
+                                                self.fetch_mode, self.max_body_bytes, self.parser_backend)
+            if self.on_result is not None:
+                self.on_result(row_info, result)
+            return result
+
+        results = await self.scheduler.run(
+            self._start_chunk(rows_data),
+            key=lambda numbered_row: get_origin(numbered_row[1].get("Url")),
+            worker=check_row
+        )
+        self.stats.update(_count_results(results))
+        return results
+
+@contextlib.contextmanager
+def check_run(fetch_mode=DEFAULT_FETCH_MODE, max_body_bytes=DEFAULT_MAX_BODY_BYTES, parser_backend=DEFAULT_PARSER_BACKEND,
+              parse_workers=DEFAULT_PARSE_WORKERS, on_result=None, max_concurrency=None,
+              per_host_limit=DEFAULT_PER_HOST_LIMIT, min_host_delay=DEFAULT_MIN_HOST_DELAY):
+    """Запуск перевірки, рядки якого надходять частинами: run.check(rows_data) перевіряє частину і повертає її результати.
+       Пул процесів розбору, об'єднання запитів, кеш DNS і пул з'єднань створюються один раз на запуск, тож
+       Url і хости, що повторюються в різних частинах, не запитуються заново; підсумкова статистика виводиться
+       один раз, після виходу з блоку. max_concurrency — асинхронний рушій з такою кількістю рядків одночасно
+       (None — послідовна перевірка); решта параметрів — як у check_status_code_requests і check_status_code_requests_async.
+    """
+    if max_concurrency is None:
+        print("\n\n🔍 ПЕРЕВІРКА СТАТУС-КОДІВ URL, SEO-ПАРАМЕТРІВ ТА ПОСИЛАНЬ...\n")
+    else:
+        print(f"\n\n🔍 ПЕРЕВІРКА СТАТУС-КОДІВ URL, SEO-ПАРАМЕТРІВ ТА ПОСИЛАНЬ (паралельно: {max_concurrency}, на хост: {per_host_limit})...\n")
+        # Кожен рядок тримає не більше одного з'єднання до хосту, тож пулу на per_host_limit вистачає
+        http_session.configure_pool(pool_per_host=per_host_limit)
+
+    with _parse_stage(parse_workers), _coalescing_stage() as coalescer, _dns_stage() as dns_cache, \
+            contextlib.ExitStack() as engine_stack:
+        run = _CheckRun(coalescer, dns_cache, fetch_mode, max_body_bytes, parser_backend, on_result,
+                        max_concurrency, per_host_limit, min_host_delay)
+        if max_concurrency is not None:
+            run.executor = engine_stack.enter_context(ThreadPoolExecutor(max_workers=max_concurrency))
+            run.row_output = engine_stack.enter_context(_BufferedRowOutput())
+        yield run
+
+    _print_stats(run.stats)
+    _print_coalescing_stats(coalescer)
+    _print_dns_stats(dns_cache)
+    http_session.print_pool_stats()
+    http_session.print_timeout_stats()
+    _print_text_cache_stats()
+    _print_encoding_stats()
+    _print_page_cache_stats()
+    _finish_ssl_policy()
+    _finish_robots_cache()
+
+def check_status_code_requests(rows_data, fetch_mode=DEFAULT_FETCH_MODE, max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+                               parser_backend=DEFAULT_PARSER_BACKEND, parse_workers=DEFAULT_PARSE_WORKERS, on_result=None):
+    """Перевіряє статус-коди URL, редиректи та виконує SEO та перевірки посилань.
+       fetch_mode: "get" — один потоковий GET, "head+get" — HEAD і окремий GET, "head" — лише статуси.
+       max_body_bytes обмежує обсяг завантаженого HTML однієї сторінки.
+       parser_backend: "stream" — потоковий екстрактор, "bs4" — еталонний розбір через BeautifulSoup.
+       parse_workers > 0 — розбір HTML і перевірки сторінки виконуються в стільких окремих процесах.
+       Кожен унікальний Url і кожен фінальний URL завантажуються один раз; пари рядків перевіряються окремо.
+       on_result(row_info, result) викликається одразу після завершення кожного рядка (контрольні точки).
+    """
+    with check_run(fetch_mode, max_body_bytes, parser_backend, parse_workers, on_result) as run:
+        return run.check(rows_data)
+
+
+class _BufferedRowOutput:
+    """Підміняє sys.stdout так, щоб print() кожного рядка накопичувався окремо і виводився цілим блоком."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stdout = None
+
+    def __enter__(self):
+        self._stdout = sys.stdout
+        sys.stdout = self
+        return self
+
+    def __exit__(self, *exc_info):
+        sys.stdout = self._stdout
+
+    def __getattr__(self, name):
+        # encoding, isatty тощо беремо з оригінального потоку
+        return getattr(self._stdout, name)
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None:
+            return buffer.write(text)
+        with self._lock:
+            return self._stdout.write(text)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None:
+            self._stdout.flush()
+
+    def run(self, func, *args):
+        """Виконує func у поточному потоці, а потім атомарно друкує все, що вона вивела."""
+        self._local.buffer = io.StringIO()
+        try:
+            return func(*args)
+        finally:
+            output = self._local.buffer.getvalue()
+            self._local.buffer = None
+            with self._lock:
+                self._stdout.write(output)
+                self._stdout.flush()
+
+
+async def check_status_code_requests_async(rows_data, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                                           per_host_limit=DEFAULT_PER_HOST_LIMIT, min_host_delay=DEFAULT_MIN_HOST_DELAY,
+                                           fetch_mode=DEFAULT_FETCH_MODE, max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+                                           parser_backend=DEFAULT_PARSER_BACKEND, parse_workers=DEFAULT_PARSE_WORKERS,
+                                           on_result=None):
+    """Асинхронна версія check_status_code_requests: перевіряє до max_concurrency рядків одночасно,
+       але не більше per_host_limit на один хост і з паузою min_host_delay між запусками для хосту.
+       parse_workers > 0 виносить розбір HTML у пул процесів, щоб він не блокував потоки завантаження.
+       on_result(row_info, result) викликається в циклі подій після завершення кожного рядка.
+       Повертає ті самі словники результатів у порядку рядків.
+    """
+    with check_run(fetch_mode, max_body_bytes, parser_backend, parse_workers, on_result, max_concurrency,
+                   per_host_limit, min_host_delay) as run:
+        return await run.check_async(rows_data)
+
+def check_status_code_requests_concurrent(rows_data, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                                          per_host_limit=DEFAULT_PER_HOST_LIMIT, min_host_delay=DEFAULT_MIN_HOST_DELAY,
+                                          fetch_mode=DEFAULT_FETCH_MODE, max_body_bytes=DEFAULT_MAX_BODY_BYTES,
+                                          parser_backend=DEFAULT_PARSER_BACKEND, parse_workers=DEFAULT_PARSE_WORKERS,
+                                          on_result=None):
+    """Синхронна точка входу для асинхронного рушія. Працює і всередині вже запущеного циклу подій (Colab)."""
+    with check_run(fetch_mode, max_body_bytes, parser_backend, parse_workers, on_result, max_concurrency,
+                   per_host_limit, min_host_delay) as run:
+        return run.check(rows_data)
+
+def _run_coroutine(coroutine):
+    """Виконує корутину до завершення і повертає її результат, навіть якщо цикл подій уже працює (Colab)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    # Цикл подій уже працює (Colab/Jupyter) — запускаємо корутину у власному циклі в окремому потоці
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(asyncio.run, coroutine).result()
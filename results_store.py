@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+from utils import CACHE_DIR, get_link_pair_numbers
+
+#
+# 2.3 СХОВИЩЕ РЕЗУЛЬТАТІВ ДЛЯ ІНКРЕМЕНТАЛЬНИХ ЗАПУСКІВ
+#
+
+DEFAULT_RESULTS_STORE_PATH = os.path.join(CACHE_DIR, "results.sqlite")
+DEFAULT_MAX_AGE = 24 * 60 * 60  # Секунди, протягом яких збережений результат рядка вважається свіжим
+
+
+def row_key(row_info):
+    """Ключ рядка за його вмістом: Url і непорожні пари Анкор-N/Урл-N.
+       Змінений рядок отримує новий ключ, а номер рядка в таблиці на ключ не впливає.
+    """
+    pairs = []
+    for number in get_link_pair_numbers(row_info):
+        anchor = row_info.get(f"Анкор-{number}") or ""
+        link_url = row_info.get(f"Урл-{number}") or ""
+        if anchor or link_url:
+            pairs.append([number, anchor, link_url])
+    content = json.dumps([row_info.get("Url") or "", pairs], ensure_ascii=False)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class ResultsStore:
+    """Останній результат перевірки кожного рядка (за row_key) і час перевірки, у SQLite між запусками."""
+
+    def __init__(self, path=DEFAULT_RESULTS_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self):
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                return self._open(self.path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️ Не вдалося відкрити сховище результатів ({self.path}): {e}. Працюємо без збереження.")
+        return self._open(":memory:")
+
+    @staticmethod
+    def _open(path):
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("CREATE TABLE IF NOT EXISTS results (row_key TEXT PRIMARY KEY, result TEXT NOT NULL, checked_at REAL NOT NULL)")
+        return conn
+
+    def get(self, row_info, max_age=DEFAULT_MAX_AGE):
+        """Повертає збережений результат рядка, якщо він молодший за max_age секунд, інакше None."""
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT result, checked_at FROM results WHERE row_key = ?",
+                                         (row_key(row_info),)).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Не вдалося прочитати сховище результатів: {e}")
+            return None
+        if row is None or time.time() - row[1] > max_age:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def put_many(self, rows_and_results):
+        """Зберігає результати [(row_info, result)] однією транзакцією з поточним часом перевірки."""
+        checked_at = time.time()
+        try:
+            records = [(row_key(row_info), json.dumps(result, ensure_ascii=False, default=str), checked_at)
+                       for row_info, result in rows_and_results]
+            with self._lock:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany("INSERT OR REPLACE INTO results (row_key, result, checked_at) VALUES (?, ?, ?)", records)
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            print(f"⚠️ Не вдалося зберегти результати: {e}")
+
+    def split_rows(self, rows_data, max_age=DEFAULT_MAX_AGE):
+        """Розділяє рядки на свіжі (результат береться зі сховища) і ті, що треба перевірити.
+           Повертає (results, pending): results — список у порядку rows_data з None для рядків до перевірки,
+           pending — індекси цих рядків. Рядки, чий минулий запит не вдався (статус 0), перевіряються знову.
+        """
+        results = []
+        pending = []
+        for index, row_info in enumerate(rows_data):
+            stored = self.get(row_info, max_age)
+            if stored is None or not stored.get("final_status_code"):
+                results.append(None)
+                pending.append(index)
+                continue
+            # Поля рядка (номер у таблиці тощо) беремо з поточного запуску
+            stored.update(row_info)
+            results.append(stored)
+        return results, pending
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
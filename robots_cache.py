@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import threading
+import requests
+from urllib.parse import urljoin
+from urllib.robotparser import RobotFileParser
+
+import http_session
+from utils import CACHE_DIR, get_origin
+
+#
+# 2.1 КЕШ ROBOTS.TXT
+#
+
+DEFAULT_ROBOTS_CACHE_PATH = os.path.join(CACHE_DIR, "robots_cache.json")
+DEFAULT_ROBOTS_CACHE_TTL = 24 * 60 * 60  # Секунди, протягом яких збережений robots.txt вважається актуальним
+
+
+class RobotsCache:
+    """Кеш robots.txt за origin: один запит на origin за запуск, розібрані правила в пам'яті
+       та збереження на диск з TTL між запусками. Відповідає на запит для будь-якого user-agent без мережі.
+    """
+
+    def __init__(self, path=DEFAULT_ROBOTS_CACHE_PATH, ttl=DEFAULT_ROBOTS_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._entries = {}        # origin -> {"status", "text", "error", "fetched_at"}
+        self._parsers = {}        # origin -> RobotFileParser (лише для статусу 200)
+        self._origin_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        """Завантажує збережені записи з диска, відкидаючи прострочені."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Не вдалося прочитати кеш robots.txt ({self.path}): {e}")
+            return
+        with self._lock:
+            for origin, entry in stored.items():
+                if not self._is_expired(entry):
+                    self._entries[origin] = entry
+
+    def save(self):
+        """Зберігає на диск актуальні записи (помилки мережі не зберігаються)."""
+        if not self.path:
+            return
+        with self._lock:
+            stored = {origin: entry for origin, entry in self._entries.items()
+                      if entry.get("error") is None and not self._is_expired(entry)}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stored, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Не вдалося зберегти кеш robots.txt ({self.path}): {e}")
+
+    def _is_expired(self, entry):
+        return time.time() - entry.get("fetched_at", 0) > self.ttl
+
+    def get(self, url, verify_ssl=True):
+        """Повертає запис robots.txt для origin цього URL, завантажуючи його лише за потреби."""
+        origin = get_origin(url) or url
+        with self._lock:
+            origin_lock = self._origin_locks.setdefault(origin, threading.Lock())
+        # Окремий замок на origin: паралельні рядки одного хосту чекають на один запит
+        with origin_lock:
+            with self._lock:
+                entry = self._entries.get(origin)
+                cached = entry is not None and not self._is_expired(entry)
+                if cached:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if cached:
+                return entry
+            entry = _fetch_robots(origin, verify_ssl)
+            with self._lock:
+                self._entries[origin] = entry
+                self._parsers.pop(origin, None)
+            return entry
+
+    def can_fetch(self, url, user_agent, verify_ssl=True):
+        """Перевіряє правила robots.txt для URL; повертає (дозволено, запис кешу)."""
+        entry = self.get(url, verify_ssl)
+        if entry["status"] != 200:
+            return True, entry
+        origin = get_origin(url) or url
+        with self._lock:
+            parser = self._parsers.get(origin)
+        if parser is None:
+            parser = RobotFileParser()
+            parser.set_url(urljoin(origin, "/robots.txt"))
+            parser.parse(entry["text"].splitlines())
+            with self._lock:
+                self._parsers[origin] = parser
+        return parser.can_fetch(user_agent, url), entry
+
+
+def _fetch_robots(origin, verify_ssl=True):
+    """Завантажує robots.txt для origin і повертає запис для кешу."""
+    robots_url = urljoin(origin, "/robots.txt")
+    entry = {"status": None, "text": "", "error": None, "fetched_at": time.time()}
+    try:
+        # Використовуємо стандартний User-Agent для запиту robots.txt
+        with http_session.get(robots_url, timeout=5, headers=http_session.DEFAULT_HEADERS, verify=verify_ssl) as resp:
+            entry["status"] = resp.status_code
+            if resp.status_code == 200:
+                entry["text"] = resp.text
+    except requests.exceptions.RequestException as e:
+        entry["error"] = str(e)
+    return entry
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_robots_cache():
+    """Повертає спільний для запуску кеш robots.txt (створює його під час першого звернення)."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = RobotsCache()
+        return _shared_cache
+
+
+def configure_robots_cache(path=DEFAULT_ROBOTS_CACHE_PATH, ttl=DEFAULT_ROBOTS_CACHE_TTL):
+    """Замінює спільний кеш robots.txt новим (інший файл або TTL). path=None — лише в пам'яті."""
+    global _shared_cache
+    with _shared_cache_lock:
+        _shared_cache = RobotsCache(path=path, ttl=ttl)
+        return _shared_cache
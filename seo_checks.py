@@ -1,38 +1,146 @@
-import requests
+from collections import Counter
+from functools import cached_property
 from urllib.parse import urljoin, unquote
-from urllib.robotparser import RobotFileParser
 from bs4 import BeautifulSoup
 
-from utils import normalize_text, normalize_url
+from html_stream import HtmlStreamExtractor
+from robots_cache import get_robots_cache
+from utils import normalize_text, normalize_texts, normalize_url
 
 #
 # 2. ФУНКЦІЇ SEO-ПЕРЕВІРОК
 #
 
-def check_robots_txt(url_to_check, user_agent='*', verify_ssl=True):
-    """Перевіряє доступність URL в robots.txt для вказаного user-agent."""
+def check_robots_txt(url_to_check, user_agent='*', verify_ssl=True, cache=None):
+    """Перевіряє доступність URL в robots.txt для вказаного user-agent.
+       robots.txt береться з кешу за origin (cache або спільний кеш запуску).
+    """
     print(f"   ├── Перевірка robots.txt для User-agent: {user_agent}...")
     normalized_url = normalize_url(url_to_check) # Нормалізуємо перед перевіркою
-    robots_url = urljoin(normalized_url, '/robots.txt')
-    rp = RobotFileParser()
-    rp.set_url(robots_url)
-    try:
-        # Використовуємо стандартний User-Agent для запиту robots.txt
-        with requests.get(robots_url, timeout=5, headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.6167.184 Safari/537.36'}, verify=verify_ssl) as resp:
-            if resp.status_code == 200:
-                rp.parse(resp.text.splitlines())
-                is_allowed = rp.can_fetch(user_agent, normalized_url)
-                print(f"   │   └── {'✅ Дозволено' if is_allowed else '❌ Заборонено'} в robots.txt для {user_agent}")
-                return is_allowed
-            elif resp.status_code == 404:
-                print(f"   │   └── ✅ robots.txt не знайдено (404), сканування дозволено")
-                return True # Якщо robots.txt немає, сканування дозволено
-            else:
-                print(f"   │   └── ⚠️ Не вдалося отримати robots.txt (Статус: {resp.status_code}), припускаємо, що дозволено")
-                return True # В разі помилки краще вважати, що дозволено
-    except requests.exceptions.RequestException as e:
-        print(f"   │   └── ⚠️ Помилка при запиті до robots.txt: {e}, припускаємо, що дозволено")
-        return True
+    is_allowed, entry = (cache or get_robots_cache()).can_fetch(normalized_url, user_agent, verify_ssl=verify_ssl)
+    if entry["error"] is not None:
+        print(f"   │   └── ⚠️ Помилка при запиті до robots.txt: {entry['error']}, припускаємо, що дозволено")
+    elif entry["status"] == 200:
+        print(f"   │   └── {'✅ Дозволено' if is_allowed else '❌ Заборонено'} в robots.txt для {user_agent}")
+    elif entry["status"] == 404:
+        print(f"   │   └── ✅ robots.txt не знайдено (404), сканування дозволено")
+    else:
+        print(f"   │   └── ⚠️ Не вдалося отримати robots.txt (Статус: {entry['status']}), припускаємо, що дозволено")
+    # Якщо robots.txt немає або його не вдалося отримати, вважаємо, що сканування дозволено
+    return is_allowed
+
+# Бекенди розбору HTML: потоковий екстрактор (основний) та BeautifulSoup (еталонний)
+PARSER_BACKEND_STREAM = "stream"
+PARSER_BACKEND_BS4 = "bs4"
+PARSER_BACKENDS = (PARSER_BACKEND_STREAM, PARSER_BACKEND_BS4)
+DEFAULT_PARSER_BACKEND = PARSER_BACKEND_STREAM
+
+class ParsedPage:
+    """HTML-сторінка, розібрана один раз і спільна для всіх SEO-перевірок.
+       Мета-теги, canonical та посилання витягуються ліниво і кешуються на об'єкті.
+       backend="stream" — потоковий екстрактор без DOM, backend="bs4" — еталонний розбір через BeautifulSoup.
+    """
+
+    def __init__(self, html_content, backend=DEFAULT_PARSER_BACKEND):
+        if backend not in PARSER_BACKENDS:
+            raise ValueError(f"Невідомий бекенд розбору HTML: {backend}")
+        self.html_content = html_content
+        self.backend = backend
+        self._normalized_links = {}
+        self._links_by_url = {}
+
+    @classmethod
+    def from_extractor(cls, extractor, html_content=None):
+        """Створює сторінку з екстрактора, який уже отримав увесь HTML (наприклад, прямо з мережі)."""
+        extractor.close()
+        page = cls(html_content, PARSER_BACKEND_STREAM)
+        page.__dict__['extractor'] = extractor
+        return page
+
+    @classmethod
+    def from_data(cls, robots_meta, canonical_href, links, backend=DEFAULT_PARSER_BACKEND):
+        """Створює сторінку з уже витягнутих даних (наприклад, збережених з попереднього запуску) без HTML."""
+        page = cls(None, backend)
+        page.__dict__.update(robots_meta=robots_meta, canonical_href=canonical_href, links=links)
+        return page
+
+    @cached_property
+    def extractor(self):
+        extractor = HtmlStreamExtractor()
+        extractor.feed(self.html_content)
+        extractor.close()
+        return extractor
+
+    @cached_property
+    def soup(self):
+        return BeautifulSoup(self.html_content, 'html.parser')
+
+    @cached_property
+    def robots_meta(self):
+        """Мета-тег директив: {'name', 'content'} (пріоритет googlebot, потім robots) або None."""
+        if self.backend == PARSER_BACKEND_STREAM:
+            return self.extractor.robots_meta
+        meta_tag = self.soup.find('meta', attrs={'name': 'googlebot'}) or self.soup.find('meta', attrs={'name': 'robots'})
+        if meta_tag is None:
+            return None
+        return {'name': meta_tag.get('name', 'robots'), 'content': meta_tag.get('content')}
+
+    @cached_property
+    def canonical_href(self):
+        """Значення href першого <link rel="canonical"> або None."""
+        if self.backend == PARSER_BACKEND_STREAM:
+            return self.extractor.canonical_href
+        link_tag = self.soup.find('link', rel='canonical')
+        return link_tag.get('href') if link_tag else None
+
+    @cached_property
+    def links(self):
+        """Усі посилання <a href> у порядку документа: [{'href', 'text', 'rel'}]."""
+        if self.backend == PARSER_BACKEND_STREAM:
+            return self.extractor.links
+        return [{
+            'href': link.get('href'),
+            'text': link.get_text(strip=True),
+            'rel': list(link.get('rel', []))
+        } for link in self.soup.find_all('a', href=True)]
+
+    def normalized_links(self, page_url):
+        """Посилання з абсолютними та нормалізованими URL і нормалізованими анкорами (кешується для page_url).
+           Посилання з невалідним href пропускаються, але зберігають свій порядковий index.
+        """
+        if page_url not in self._normalized_links:
+            normalized = []
+            # Анкори нормалізуються одним пакетом: тексти меню повторюються і беруться з кешу
+            normalized_anchors = normalize_texts([link['text'] for link in self.links])
+            for index, (link, normalized_anchor) in enumerate(zip(self.links, normalized_anchors)):
+                try:
+                    absolute_href = urljoin(page_url, link['href'])
+                    normalized_url = normalize_url(absolute_href)
+                except Exception:
+                    continue # Пропускаємо невалідні URL
+                normalized.append({
+                    'index': index,
+                    'url': absolute_href,
+                    'normalized_url': normalized_url,
+                    'text': link['text'],
+                    'normalized_anchor': normalized_anchor,
+                    'rel': link['rel']
+                })
+            self._normalized_links[page_url] = normalized
+        return self._normalized_links[page_url]
+
+    def links_by_url(self, page_url):
+        """Індекс посилань: нормалізований URL -> список посилань з normalized_links у порядку документа."""
+        if page_url not in self._links_by_url:
+            index = {}
+            for link in self.normalized_links(page_url):
+                index.setdefault(link['normalized_url'], []).append(link)
+            self._links_by_url[page_url] = index
+        return self._links_by_url[page_url]
+
+def _as_parsed_page(html_content):
+    """Приймає HTML-рядок або вже розібрану ParsedPage і повертає ParsedPage."""
+    return html_content if isinstance(html_content, ParsedPage) else ParsedPage(html_content)
 
 def check_indexing_directives(url, headers, html_content):
     """Перевіряє наявність noindex/nofollow в X-Robots-Tag та мета-тегах."""
@@ -54,15 +162,11 @@ def check_indexing_directives(url, headers, html_content):
     # 2. Якщо в заголовках немає, перевірка мета-тегів в HTML
     if not directives['source']:
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
             # Пріоритет для Googlebot, потім загальний robots
-            meta_tag_google = soup.find('meta', attrs={'name': 'googlebot'})
-            meta_tag_robots = soup.find('meta', attrs={'name': 'robots'})
-
-            meta_tag = meta_tag_google or meta_tag_robots # Використовуємо тег для Googlebot якщо є
+            meta_tag = _as_parsed_page(html_content).robots_meta
 
             if meta_tag and meta_tag.get('content'):
-                tag_name = meta_tag.get('name', 'robots').capitalize()
+                tag_name = meta_tag['name'].capitalize()
                 content = meta_tag['content'].lower()
                 print(f"   │   ├── Знайдено Meta {tag_name}: {meta_tag['content']}")
                 if 'noindex' in content:
@@ -92,11 +196,9 @@ def check_canonical_tag(url, html_content):
     canonical_url = None
     source_canonical = None
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        link_tag = soup.find('link', rel='canonical')
-        if link_tag and link_tag.get('href'):
+        source_canonical = _as_parsed_page(html_content).canonical_href
+        if source_canonical:
             # Робимо URL абсолютним і нормалізуємо
-            source_canonical = link_tag['href']
             canonical_url = normalize_url(urljoin(normalized_current_url, source_canonical))
 
             print(f"   │   ├── Знайдено Canonical: {canonical_url}")
@@ -111,211 +213,100 @@ def check_canonical_tag(url, html_content):
         print(f"   │   └── ⚠️ Помилка парсингу HTML для Canonical: {e}")
     return canonical_url
 
-# --- ОНОВЛЕНА ФУНКЦІЯ ---
-def check_links_on_page(html_content, page_url, anchor1, url1, anchor2, url2, anchor3, url3):
-    """Шукає вказані пари URL+Анкор на сторінці, пріоритезуючи точні співпадіння."""
+def _match_link_pairs(links_by_url, targets):
+    """Зіставляє пари з посиланнями сторінки за індексом URL.
+       targets: [(номер пари, нормалізований URL, нормалізований анкор)].
+       Повертає (точні збіги {номер: посилання}, невідповідності анкору {номер: посилання}).
+       Одне посилання дає точний збіг не більше ніж одній парі: однакові пари отримують
+       k-те входження такої пари URL+анкор на сторінці, і пріоритет має пара з меншим номером.
+    """
+    exact_matches = {}
+    used_by_pair = {}      # index посилання -> номер пари, якій воно точно співпало
+    taken = Counter()      # Скільки входжень (URL, анкор) вже зайнято парами з меншими номерами
+    for number, normalized_url, normalized_anchor in targets:
+        if not normalized_url or not normalized_anchor:
+            continue
+        key = (normalized_url, normalized_anchor)
+        occurrences = [link for link in links_by_url.get(normalized_url, ()) if link['normalized_anchor'] == normalized_anchor]
+        if taken[key] < len(occurrences):
+            link = occurrences[taken[key]]
+            taken[key] += 1
+            exact_matches[number] = link
+            used_by_pair[link['index']] = number
+
+    mismatches = {}
+    for number, normalized_url, normalized_anchor in targets:
+        if number in exact_matches or not normalized_url or not normalized_anchor:
+            continue
+        # Перше посилання з потрібним URL, але іншим анкором, не зайняте парою з меншим номером.
+        # Якщо воно точно співпало парі з більшим номером, невідповідність не зараховується
+        for link in links_by_url.get(normalized_url, ()):
+            if link['normalized_anchor'] != normalized_anchor and used_by_pair.get(link['index'], number) >= number:
+                if link['index'] not in used_by_pair:
+                    mismatches[number] = link
+                break
+    return exact_matches, mismatches
+
+def check_links_on_page(html_content, page_url, *anchors_and_urls):
+    """Шукає вказані пари URL+Анкор на сторінці, пріоритезуючи точні співпадіння.
+       Пари передаються як anchor1, url1, anchor2, url2, ... (будь-яка кількість);
+       результати для пари N — у полях urlN_found, anchorN_match, urlN_rel.
+    """
     print(f"   ├── Перевірка наявності посилань та анкорів на {page_url}...")
-    results = {
-        "url1_found": "Ні", "anchor1_match": "Ні", "url1_rel": None,
-        "url2_found": "Ні", "anchor2_match": "Ні", "url2_rel": None,
-        "url3_found": "Ні", "anchor3_match": "Ні", "url3_rel": None,
-        "error": None
-    }
-
-    normalized_url1 = normalize_url(url1) if url1 else None
-    normalized_anchor1 = normalize_text(anchor1) if anchor1 else None
-    normalized_url2 = normalize_url(url2) if url2 else None
-    normalized_anchor2 = normalize_text(anchor2) if anchor2 else None
-    normalized_url3 = normalize_url(url3) if url3 else None
-    normalized_anchor3 = normalize_text(anchor3) if anchor3 else None
+    pairs = list(zip(anchors_and_urls[0::2], anchors_and_urls[1::2]))
+    results = {}
+    for number in range(1, len(pairs) + 1):
+        results.update({f"url{number}_found": "Ні", f"anchor{number}_match": "Ні", f"url{number}_rel": None})
+    results["error"] = None
 
-    rel_attrs_to_check = {"nofollow", "sponsored", "noindex"}
+    targets = [
+        (number, normalize_url(url) if url else None, normalize_text(anchor) if anchor else None)
+        for number, (anchor, url) in enumerate(pairs, 1)
+    ]
 
-    # --- Трекери стану ---
-    pair1_exact_match_found = False
-    pair2_exact_match_found = False
-    pair3_exact_match_found = False
-    link_indices_used_by_exact_matches = set() # Зберігаємо індекси посилань, що точно співпали
+    rel_attrs_to_check = {"nofollow", "sponsored", "noindex"}
 
-    # Інформація про перше знайдене посилання з правильним URL, але неправильним анкором
-    url1_mismatch_info = None # {'url': url, 'found_anchor': anchor, 'rel': rel, 'text': text, 'index': index}
-    url2_mismatch_info = None # {'url': url, 'found_anchor': anchor, 'rel': rel, 'text': text, 'index': index}
-    url3_mismatch_info = None # {'url': url, 'found_anchor': anchor, 'rel': rel, 'text': text, 'index': index}
+    def found_rel(link):
+        # Цікаві для нас значення rel посилання або None
+        return ", ".join(sorted(set(link['rel']).intersection(rel_attrs_to_check))) or None
 
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        links = soup.find_all('a', href=True)
-
-        for index, link in enumerate(links):
-            href = link.get('href')
-            try:
-                # Робимо URL абсолютним та нормалізуємо його
-                absolute_href = urljoin(page_url, href)
-                normalized_found_url = normalize_url(absolute_href)
-            except Exception:
-                continue # Пропускаємо невалідні URL
-
-            link_text = link.get_text(strip=True)
-            normalized_found_anchor = normalize_text(link_text)
-            # Отримуємо значення rel як множину і перевіряємо цікаві для нас
-            rel_values = set(link.get('rel', []))
-            found_rel_str = ", ".join(sorted(list(rel_values.intersection(rel_attrs_to_check)))) or None
-
-            # --- Перевірка для Пари 1 ---
-            if not pair1_exact_match_found and normalized_url1 and normalized_found_url == normalized_url1:
-                if normalized_anchor1 and normalized_found_anchor == normalized_anchor1:
-                    # Знайдено точне співпадіння для Пари 1
-                    pair1_exact_match_found = True
-                    link_indices_used_by_exact_matches.add(index) # Запам'ятовуємо індекс
-                    results["url1_found"] = "Так"
-                    results["anchor1_match"] = "Так"
-                    results["url1_rel"] = found_rel_str
-                    # Виводимо повідомлення про успіх для Пари 1
-                    print(f"   │   ├── ✅ Знайдено Урл-1: {absolute_href}")
-                    print(f"   │   │   └── Текст посилання: '{link_text}'")
-                    print(f"   │   │   └── ✅ Анкор-1 співпадає (Нормалізовано: '{normalized_found_anchor}')")
-                    if found_rel_str:
-                        print(f"   │   │   └── ⚠️ Знайдено атрибути rel для Урл-1: {found_rel_str}")
-                    else:
-                        print(f"   │   │   └── ✅ Атрибути 'rel' ({', '.join(rel_attrs_to_check)}) для Урл-1 не знайдено.")
-                elif url1_mismatch_info is None and normalized_anchor1: # Перевіряємо mismatch тільки якщо anchor1 задано
-                    # Знайдено першу невідповідність для Пари 1 (URL ОК, Анкор не той)
-                    url1_mismatch_info = {
-                        'url': absolute_href,
-                        'found_anchor': link_text,
-                        'found_anchor_normalized': normalized_found_anchor,
-                        'rel': found_rel_str,
-                        'text': link_text,
-                        'index': index
-                    }
-
-            # --- Перевірка для Пари 2 ---
-            # Переконуємося, що це посилання ще не було використане для точного співпадіння іншої пари
-            if not pair2_exact_match_found and normalized_url2 and normalized_found_url == normalized_url2 and index not in link_indices_used_by_exact_matches:
-                 if normalized_anchor2 and normalized_found_anchor == normalized_anchor2:
-                    # Знайдено точне співпадіння для Пари 2
-                    pair2_exact_match_found = True
-                    link_indices_used_by_exact_matches.add(index) # Запам'ятовуємо індекс
-                    results["url2_found"] = "Так"
-                    results["anchor2_match"] = "Так"
-                    results["url2_rel"] = found_rel_str
-                    # Виводимо повідомлення про успіх для Пари 2
-                    print(f"   │   ├── ✅ Знайдено Урл-2: {absolute_href}")
-                    print(f"   │   │   └── Текст посилання: '{link_text}'")
-                    print(f"   │   │   └── ✅ Анкор-2 співпадає (Нормалізовано: '{normalized_found_anchor}')")
-                    if found_rel_str:
-                        print(f"   │   │   └── ⚠️ Знайдено атрибути rel для Урл-2: {found_rel_str}")
-                    else:
-                        print(f"   │   │   └── ✅ Атрибути 'rel' ({', '.join(rel_attrs_to_check)}) для Урл-2 не знайдено.")
-                 elif url2_mismatch_info is None and normalized_anchor2: # Перевіряємо mismatch тільки якщо anchor2 задано
-                     # Знайдено першу невідповідність для Пари 2 (URL ОК, Анкор не той)
-                     url2_mismatch_info = {
-                         'url': absolute_href,
-                         'found_anchor': link_text,
-                         'found_anchor_normalized': normalized_found_anchor,
-                         'rel': found_rel_str,
-                         'text': link_text,
-                         'index': index
-                     }
-
-            # --- Перевірка для Пари 3 ---
-            # Переконуємося, що це посилання ще не було використане для точного співпадіння іншої пари
-            if not pair3_exact_match_found and normalized_url3 and normalized_found_url == normalized_url3 and index not in link_indices_used_by_exact_matches:
-                 if normalized_anchor3 and normalized_found_anchor == normalized_anchor3:
-                    # Знайдено точне співпадіння для Пари 3
-                    pair3_exact_match_found = True
-                    link_indices_used_by_exact_matches.add(index) # Запам'ятовуємо індекс
-                    results["url3_found"] = "Так"
-                    results["anchor3_match"] = "Так"
-                    results["url3_rel"] = found_rel_str
-                    # Виводимо повідомлення про успіх для Пари 3
-                    print(f"   │   ├── ✅ Знайдено Урл-3: {absolute_href}")
-                    print(f"   │   │   └── Текст посилання: '{link_text}'")
-                    print(f"   │   │   └── ✅ Анкор-3 співпадає (Нормалізовано: '{normalized_found_anchor}')")
-                    if found_rel_str:
-                        print(f"   │   │   └── ⚠️ Знайдено атрибути rel для Урл-3: {found_rel_str}")
-                    else:
-                        print(f"   │   │   └── ✅ Атрибути 'rel' ({', '.join(rel_attrs_to_check)}) для Урл-3 не знайдено.")
-                 elif url3_mismatch_info is None and normalized_anchor3: # Перевіряємо mismatch тільки якщо anchor3 задано
-                     # Знайдено першу невідповідність для Пари 3 (URL ОК, Анкор не той)
-                     url3_mismatch_info = {
-                         'url': absolute_href,
-                         'found_anchor': link_text,
-                         'found_anchor_normalized': normalized_found_anchor,
-                         'rel': found_rel_str,
-                         'text': link_text,
-                         'index': index
-                     }
-
-
-        # --- Обробка результатів та вивід повідомлень ПІСЛЯ циклу ---
-
-        # Пара 1: Якщо точного співпадіння не було, перевіряємо невідповідність або повну відсутність
-        if not pair1_exact_match_found:
-            # Переконуємося, що можливий mismatch для url1 не використовував те ж посилання, що й точні збіги для інших пар
-            can_use_mismatch1 = url1_mismatch_info and url1_mismatch_info['index'] not in link_indices_used_by_exact_matches
-
-            if can_use_mismatch1:
-                # Виводимо інформацію про невідповідність (Формат 1.А)
-                print(f"   │   ├── ⚠️ Знайдено Урл-1: {url1_mismatch_info['url']}")
-                print(f"   │   │   └── Текст посилання: '{url1_mismatch_info['text']}'")
-                print(f"   │   │   └── ❌ Анкор-1 не співпадає (Очікувався: '{normalized_anchor1}', Знайдено: '{url1_mismatch_info['found_anchor']}')")
-                mismatch_rel = url1_mismatch_info['rel']
+        exact_matches, mismatches = _match_link_pairs(_as_parsed_page(html_content).links_by_url(page_url), targets)
+
+        # Точні співпадіння виводимо в порядку посилань на сторінці
+        for number, link in sorted(exact_matches.items(), key=lambda item: item[1]['index']):
+            found_rel_str = found_rel(link)
+            results[f"url{number}_found"] = "Так"
+            results[f"anchor{number}_match"] = "Так"
+            results[f"url{number}_rel"] = found_rel_str
+            print(f"   │   ├── ✅ Знайдено Урл-{number}: {link['url']}")
+            print(f"   │   │   └── Текст посилання: '{link['text']}'")
+            print(f"   │   │   └── ✅ Анкор-{number} співпадає (Нормалізовано: '{link['normalized_anchor']}')")
+            if found_rel_str:
+                print(f"   │   │   └── ⚠️ Знайдено атрибути rel для Урл-{number}: {found_rel_str}")
+            else:
+                print(f"   │   │   └── ✅ Атрибути 'rel' ({', '.join(rel_attrs_to_check)}) для Урл-{number} не знайдено.")
+
+        # Пари без точного співпадіння: невідповідність анкору або повна відсутність
+        for (number, normalized_url, normalized_anchor), (anchor, url) in zip(targets, pairs):
+            if number in exact_matches:
+                continue
+            link = mismatches.get(number)
+            if link:
+                mismatch_rel = found_rel(link)
+                print(f"   │   ├── ⚠️ Знайдено Урл-{number}: {link['url']}")
+                print(f"   │   │   └── Текст посилання: '{link['text']}'")
+                print(f"   │   │   └── ❌ Анкор-{number} не співпадає (Очікувався: '{normalized_anchor}', Знайдено: '{link['text']}')")
                 if mismatch_rel:
                      print(f"   │   │   └── Атрибути 'rel' для знайденого посилання: {mismatch_rel}")
                 else:
                      print(f"   │   │   └── Атрибути 'rel' для знайденого посилання: Не знайдено")
-                # Оновлюємо результати: URL знайдено, але анкор не той
-                results["url1_found"] = "Так"
-                results["anchor1_match"] = "Ні"
-                results["url1_rel"] = mismatch_rel # Зберігаємо rel з невідповідного посилання
-            elif normalized_url1: # Виводимо "не знайдено" тільки якщо ми шукали цей URL
-                print(f"   │   └── ❌ Точну пару Урл-1/Анкор-1 ({url1} / '{anchor1}') не знайдено.")
-
-        # Пара 2: Якщо точного співпадіння не було, перевіряємо невідповідність або повну відсутність
-        if not pair2_exact_match_found:
-            # Переконуємося, що можливий mismatch для url2 не використовував те ж посилання, що й точні збіги для інших пар
-            can_use_mismatch2 = url2_mismatch_info and url2_mismatch_info['index'] not in link_indices_used_by_exact_matches
-
-            if can_use_mismatch2:
-                 # Виводимо інформацію про невідповідність (Формат 1.А)
-                 print(f"   │   ├── ⚠️ Знайдено Урл-2: {url2_mismatch_info['url']}")
-                 print(f"   │   │   └── Текст посилання: '{url2_mismatch_info['text']}'")
-                 print(f"   │   │   └── ❌ Анкор-2 не співпадає (Очікувався: '{normalized_anchor2}', Знайдено: '{url2_mismatch_info['found_anchor']}')")
-                 mismatch_rel = url2_mismatch_info['rel']
-                 if mismatch_rel:
-                      print(f"   │   │   └── Атрибути 'rel' для знайденого посилання: {mismatch_rel}")
-                 else:
-                      print(f"   │   │   └── Атрибути 'rel' для знайденого посилання: Не знайдено")
-                 # Оновлюємо результати
-                 results["url2_found"] = "Так"
-                 results["anchor2_match"] = "Ні"
-                 results["url2_rel"] = mismatch_rel
-            elif normalized_url2: # Виводимо "не знайдено" тільки якщо ми шукали цей URL
-                 print(f"   │   └── ❌ Точну пару Урл-2/Анкор-2 ({url2} / '{anchor2}') не знайдено.")
-
-        # Пара 3: Якщо точного співпадіння не було, перевіряємо невідповідність або повну відсутність
-        if not pair3_exact_match_found:
-            # Переконуємося, що можливий mismatch для url3 не використовував те ж посилання, що й точні збіги для інших пар
-            can_use_mismatch3 = url3_mismatch_info and url3_mismatch_info['index'] not in link_indices_used_by_exact_matches
-
-            if can_use_mismatch3:
-                 # Виводимо інформацію про невідповідність
-                 print(f"   │   ├── ⚠️ Знайдено Урл-3: {url3_mismatch_info['url']}")
-                 print(f"   │   │   └── Текст посилання: '{url3_mismatch_info['text']}'")
-                 print(f"   │   │   └── ❌ Анкор-3 не співпадає (Очікувався: '{normalized_anchor3}', Знайдено: '{url3_mismatch_info['found_anchor']}')")
-                 mismatch_rel = url3_mismatch_info['rel']
-                 if mismatch_rel:
-                      print(f"   │   │   └── Атрибути 'rel' для знайденого посилання: {mismatch_rel}")
-                 else:
-                      print(f"   │   │   └── Атрибути 'rel' для знайденого посилання: Не знайдено")
-                 # Оновлюємо результати
-                 results["url3_found"] = "Так"
-                 results["anchor3_match"] = "Ні"
-                 results["url3_rel"] = mismatch_rel
-            elif normalized_url3: # Виводимо "не знайдено" тільки якщо ми шукали цей URL
-                 print(f"   │   └── ❌ Точну пару Урл-3/Анкор-3 ({url3} / '{anchor3}') не знайдено.")
-
+                # URL знайдено, але анкор не той; зберігаємо rel з невідповідного посилання
+                results[f"url{number}_found"] = "Так"
+                results[f"anchor{number}_match"] = "Ні"
+                results[f"url{number}_rel"] = mismatch_rel
+            elif normalized_url: # Виводимо "не знайдено" тільки якщо ми шукали цей URL
+                print(f"   │   └── ❌ Точну пару Урл-{number}/Анкор-{number} ({url} / '{anchor}') не знайдено.")
 
     except Exception as e:
         error_message = f"Помилка парсингу HTML для пошуку посилань: {e}"
@@ -323,16 +314,9 @@ def check_links_on_page(html_content, page_url, anchor1, url1, anchor2, url2, an
         results["error"] = error_message # Записуємо помилку в результати
 
     # Якщо не було помилки парсингу, перевіряємо, чи взагалі шукали щось
-    if not results["error"]:
-        # Додаємо перевірку для url3
-        if not normalized_url1 and not normalized_url2 and not normalized_url3:
-             print(f"   │   └── Не вказано Урл-1, Урл-2 та Урл-3 для пошуку.")
-        elif not pair1_exact_match_found and not url1_mismatch_info and not normalized_url1: # Якщо не шукали Урл-1
-             pass # Нічого не виводити для пари 1
-        elif not pair2_exact_match_found and not url2_mismatch_info and not normalized_url2: # Якщо не шукали Урл-2
-             pass # Нічого не виводити для пари 2
-        elif not pair3_exact_match_found and not url3_mismatch_info and not normalized_url3: # Якщо не шукали Урл-3
-             pass # Нічого не виводити для пари 3
+    if not results["error"] and not any(normalized_url for _, normalized_url, _ in targets):
+        url_names = [f"Урл-{number}" for number in range(1, len(pairs) + 1)]
+        listed = f"{', '.join(url_names[:-1])} та {url_names[-1]}" if len(url_names) > 1 else "".join(url_names)
+        print(f"   │   └── Не вказано {listed} для пошуку.")
 
     return results
-# --- КІНЕЦЬ ОНОВЛЕНОЇ ФУНКЦІЇ --- 
\ No newline at end of file
@@ -0,0 +1,252 @@
+import json
+import time
+import random
+import threading
+
+import gspread
+
+#
+# 4.1 ДОСТУП ДО GOOGLE SHEETS API З УРАХУВАННЯМ КВОТ
+#
+
+# Квоти Sheets API на користувача: запитів на читання і на запис за хвилину
+DEFAULT_READ_REQUESTS_PER_MINUTE = 60
+DEFAULT_WRITE_REQUESTS_PER_MINUTE = 60
+# Скільки запитів можна надіслати підряд без пауз (решта — рівномірно в межах квоти)
+DEFAULT_BURST = 10
+DEFAULT_MAX_RETRIES = 6
+# Повтори після 429 і збоїв сервера: експоненційна пауза з випадковою добавкою, не довша за BACKOFF_MAX секунд
+# (Retry-After її лише подовжує). Шість повторів сумарно перекривають хвилинне вікно квоти
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 64.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Статуси, після яких пакет запису ділиться навпіл: завеликий запит або сервер не встиг його обробити
+SHRINK_STATUSES = (413, 500, 502, 503, 504)
+# Межі розміру одного запиту values_batch_update (JSON-тіло); розмір підлаштовується під відповіді API
+MAX_WRITE_REQUEST_BYTES = 2 * 1024 * 1024
+MIN_WRITE_REQUEST_BYTES = 16 * 1024
+# Після стількох успішних пакетів поспіль розмір пакета знову подвоюється
+GROW_AFTER_SUCCESSES = 4
+
+
+class TokenBucket:
+    """Відро токенів: rate_per_minute запитів за хвилину з підрядними запитами до burst.
+       acquire() чекає, доки з'явиться токен; безпечний для кількох потоків.
+       Після 429 швидкість зменшується вдвічі (slow_down), а з кожним успішним запитом поступово
+       повертається до початкової (speed_up) — справжня квота може бути меншою за налаштовану.
+    """
+
+    def __init__(self, rate_per_minute, burst=DEFAULT_BURST, clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = rate_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def acquire(self):
+        """Забирає один токен, за потреби очікуючи на нього. Повертає час очікування в секундах."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Токен резервується одразу: наступні виклики стають у чергу за ним
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def slow_down(self):
+        with self._lock:
+            self.rate = max(self.max_rate / 64, self.rate / 2)
+
+    def speed_up(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 16)
+
+
+def api_error_status(error):
+    """HTTP-статус помилки gspread (None, якщо його не вдалося визначити)."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    return status if isinstance(status, int) and status > 0 else None
+
+
+def _retry_after_seconds(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
+
+class SheetsWriteError(Exception):
+    """batch_write не записав частину діапазонів: failed_ranges — їх A1-діапазони,
+       calls і sent_bytes — скільки викликів і байтів усе ж надіслано.
+    """
+
+    def __init__(self, failed_ranges, calls=0, sent_bytes=0):
+        super().__init__(f"Не вдалося записати діапазонів: {len(failed_ranges)}")
+        self.failed_ranges = failed_ranges
+        self.calls = calls
+        self.sent_bytes = sent_bytes
+
+
+class SheetsClient:
+    """Єдиний шлях до Sheets API для перевірки структури і запису результатів:
+       окремі відра токенів для читання і запису за квотами, повтори з паузою на 429 і збої сервера,
+       пакети запису, розмір яких зменшується після відмов і поступово відновлюється.
+    """
+
+    def __init__(self, read_per_minute=DEFAULT_READ_REQUESTS_PER_MINUTE, write_per_minute=DEFAULT_WRITE_REQUESTS_PER_MINUTE,
+                 max_retries=DEFAULT_MAX_RETRIES, max_request_bytes=MAX_WRITE_REQUEST_BYTES,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.read_bucket = TokenBucket(read_per_minute, clock=clock, sleep=sleep)
+        self.write_bucket = TokenBucket(write_per_minute, clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.max_request_bytes = max_request_bytes
+        self.request_bytes = max_request_bytes   # Поточна межа розміру пакета запису
+        self._sleep = sleep
+        self._successes = 0
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.bytes_sent = 0
+        self.retries = 0
+        self.failed_writes = 0
+
+    def _call(self, bucket, func, args, kwargs, retry_statuses=RETRY_STATUSES):
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                status = api_error_status(e)
+                if status == 429:
+                    bucket.slow_down()
+                if status not in retry_statuses or attempt >= self.max_retries:
+                    raise
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) + random.uniform(0, 1)
+                delay = max(delay, _retry_after_seconds(e) or 0.0)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                print(f"   ⏳ Sheets API відповів {status}: повтор {attempt}/{self.max_retries} через {delay:.1f} с")
+                self._sleep(delay)
+                continue
+            bucket.speed_up()
+            return result
+
+    def read(self, func, *args, **kwargs):
+        """Виконує запит на читання (наприклад, worksheet.get_all_values) в межах квоти читання."""
+        with self._lock:
+            self.reads += 1
+        return self._call(self.read_bucket, func, args, kwargs)
+
+    def write(self, func, *args, **kwargs):
+        """Виконує запит на запис (наприклад, worksheet.update) в межах квоти запису."""
+        result = self._call(self.write_bucket, func, args, kwargs)
+        payload = kwargs.get("values", args[0] if args else None)
+        with self._lock:
+            self.writes += 1
+            self.bytes_sent += len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+        return result
+
+    def batch_write(self, spreadsheet, entries, value_input_option="RAW"):
+        """Записує діапазони [{"range", "values"}] якомога меншою кількістю викликів values_batch_update.
+           Пакет ділиться навпіл після 413 чи збою сервера; пакет, який не вдалося записати і з найменшим
+           розміром, пропускається з попередженням, решта пакетів записується далі.
+           Повертає (кількість викликів, надіслано байтів); якщо якісь пакети пропущено — кидає SheetsWriteError
+           з їхніми діапазонами.
+        """
+        sized = [(entry, len(json.dumps(entry, ensure_ascii=False).encode("utf-8"))) for entry in entries]
+        calls = sent_bytes = 0
+        failed_ranges = []
+        start = 0
+        while start < len(sized):
+            limit = self.request_bytes
+            end, batch_bytes = start, 0
+            while end < len(sized) and (end == start or batch_bytes + sized[end][1] <= limit):
+                batch_bytes += sized[end][1]
+                end += 1
+            batch = [entry for entry, _ in sized[start:end]]
+            body = {"valueInputOption": value_input_option, "data": batch}
+            payload_bytes = len(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+            can_shrink = len(batch) > 1 and limit > MIN_WRITE_REQUEST_BYTES
+            print(f"  Надсилаємо пакет {calls + 1} ({len(batch)} блоків, {payload_bytes / 1024:.1f} КБ)...")
+            try:
+                # Пакет, який ще можна поділити, не повторюємо на збої сервера — ділимо одразу
+                self._call(self.write_bucket, spreadsheet.values_batch_update, (body,), {},
+                           retry_statuses=(429,) if can_shrink else RETRY_STATUSES)
+            except gspread.exceptions.APIError as api_e:
+                if can_shrink and api_error_status(api_e) in SHRINK_STATUSES:
+                    self._shrink(batch_bytes)
+                    continue
+                print(f"   ⚠️ Помилка API при оновленні пакету: {api_e}")
+                with self._lock:
+                    self.failed_writes += len(batch)
+                failed_ranges.extend(entry["range"] for entry in batch)
+                start = end
+                continue
+            calls += 1
+            sent_bytes += payload_bytes
+            with self._lock:
+                self.writes += 1
+                self.bytes_sent += payload_bytes
+            self._grow()
+            start = end
+        if failed_ranges:
+            raise SheetsWriteError(failed_ranges, calls, sent_bytes)
+        return calls, sent_bytes
+
+    def _shrink(self, batch_bytes):
+        with self._lock:
+            self.request_bytes = max(MIN_WRITE_REQUEST_BYTES, min(self.request_bytes, batch_bytes) // 2)
+            self._successes = 0
+        print(f"   ✂️ Зменшуємо пакет запису до {self.request_bytes / 1024:.0f} КБ")
+
+    def _grow(self):
+        with self._lock:
+            self._successes += 1
+            if self._successes >= GROW_AFTER_SUCCESSES and self.request_bytes < self.max_request_bytes:
+                self.request_bytes = min(self.max_request_bytes, self.request_bytes * 2)
+                self._successes = 0
+
+    def print_stats(self):
+        """Виводить звернення до Sheets API за запуск: запити, обсяг запису, повтори й очікування квоти."""
+        waited = self.read_bucket.waited + self.write_bucket.waited
+        print(f"📊 Sheets API: читань {self.reads}, записів {self.writes} ({self.bytes_sent / 1024:.1f} КБ), "
+              f"повторів {self.retries}, очікування квоти {waited:.1f} с")
+        if self.failed_writes:
+            print(f"⚠️ Не вдалося записати блоків: {self.failed_writes}")
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_sheets_client():
+    """Повертає спільний клієнт Sheets API (створює його під час першого звернення)."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = SheetsClient()
+        return _shared_client
+
+
+def configure_sheets_client(read_per_minute=DEFAULT_READ_REQUESTS_PER_MINUTE,
+                            write_per_minute=DEFAULT_WRITE_REQUESTS_PER_MINUTE, max_retries=DEFAULT_MAX_RETRIES):
+    """Замінює спільний клієнт Sheets API новим з вказаними квотами."""
+    global _shared_client
+    with _shared_client_lock:
+        _shared_client = SheetsClient(read_per_minute=read_per_minute, write_per_minute=write_per_minute,
+                                      max_retries=max_retries)
+        return _shared_client
@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+#
+# 3.6 ОБ'ЄДНАННЯ ОДНАКОВИХ ЗАПИТІВ (SINGLE-FLIGHT)
+#
+
+class SingleFlight:
+    """Виконує обчислення для кожного ключа лише один раз: паралельні виклики з тим самим ключем
+       чекають на результат першого, а пізніші отримують уже готовий.
+       max_entries обмежує кількість збережених результатів (найдавніші витісняються).
+       keep_released — скільки звільнених результатів (див. expect) тримати ще, на випадок нових очікувань.
+    """
+
+    def __init__(self, max_entries=None, keep_released=0):
+        self.max_entries = max_entries
+        self.keep_released = keep_released
+        self._futures = OrderedDict()  # ключ -> Future з результатом
+        self._remaining = {}           # ключ -> скільки звернень ще очікується (див. expect)
+        self._released = OrderedDict() # Звільнені ключі, чиї результати ще тримаються (не більше keep_released)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def expect(self, key, count):
+        """Вказує, що key буде запитано ще count разів: після останнього очікуваного звернення результат звільняється.
+           Повторні виклики додаються до ще не використаних очікувань.
+        """
+        with self._lock:
+            self._remaining[key] = self._remaining.get(key, 0) + count
+            self._released.pop(key, None)
+
+    def run(self, key, compute):
+        """Повертає (результат, shared). shared=True — результат обчислив інший виклик.
+           Якщо compute() завершилась винятком, той самий виняток отримують усі, хто на неї чекав,
+           а наступний виклик з цим ключем обчислює результат заново.
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._futures[key] = future
+                self.misses += 1
+                self._evict()
+            else:
+                self._futures.move_to_end(key)
+                self.hits += 1
+            self._consume(key)
+
+        if not leader:
+            return future.result(), True
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result, False
+
+    def get(self, key):
+        """Повертає готовий результат для key або None (без очікування і без підрахунку звернень)."""
+        with self._lock:
+            future = self._futures.get(key)
+        if future is None or not future.done() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def _consume(self, key):
+        remaining = self._remaining.get(key)
+        if remaining is None:
+            return
+        if remaining <= 1:
+            # Останнє очікуване звернення: Future вже в руках виклику, зі словника його можна прибрати
+            del self._remaining[key]
+            if not self.keep_released:
+                self._futures.pop(key, None)
+                return
+            self._released[key] = None
+            while len(self._released) > self.keep_released:
+                self._futures.pop(self._released.popitem(last=False)[0], None)
+        else:
+            self._remaining[key] = remaining - 1
+
+    def _evict(self):
+        while self.max_entries is not None and len(self._futures) > self.max_entries:
+            self._futures.popitem(last=False)
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import threading
+from urllib.parse import urlsplit
+
+from utils import CACHE_DIR
+
+#
+# 3.3 ПАМ'ЯТЬ ПРО ХОСТИ З НЕДІЙСНИМ SSL-СЕРТИФІКАТОМ
+#
+
+DEFAULT_SSL_POLICY_PATH = os.path.join(CACHE_DIR, "ssl_policy.json")
+DEFAULT_SSL_POLICY_TTL = 24 * 60 * 60  # Секунди, протягом яких збережений хост одразу перевіряється без SSL
+
+
+def host_key(url):
+    """Ключ хосту для політики SSL: сертифікат залежить від імені хосту і порту."""
+    parts = urlsplit(url)
+    if not parts.hostname:
+        return None
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.hostname}:{port}"
+
+
+def _error_reason(error):
+    """Клас і причина SSL-помилки: для requests.exceptions.SSLError — причина з MaxRetryError urllib3."""
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return type(error).__name__, str(reason if reason is not None else error)
+
+
+class SslPolicyCache:
+    """Хости, яким уже знадобився повтор з вимкненою перевіркою SSL, разом з текстом початкової помилки.
+       Наступні рядки цих хостів одразу йдуть запитом без перевірки SSL, а не чекають ще однієї
+       невдалої спроби. path=None — лише в межах запуску, інакше записи зберігаються на диск з TTL.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_SSL_POLICY_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._entries = {}    # host:port -> {"error_class", "reason", "recorded_at"}
+        self._lock = threading.Lock()
+        self.hits = 0         # Скільки запитів одразу пішли без перевірки SSL
+        self.load()
+
+    def load(self):
+        """Завантажує збережені записи з диска, відкидаючи прострочені."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Не вдалося прочитати збережені SSL-політики хостів ({self.path}): {e}")
+            return
+        with self._lock:
+            for host, entry in stored.items():
+                # Записи старого формату (без класу і причини помилки) відкидаються
+                if "reason" in entry and not self._is_expired(entry):
+                    self._entries[host] = entry
+
+    def save(self):
+        """Зберігає на диск актуальні записи."""
+        if not self.path:
+            return
+        with self._lock:
+            stored = {host: entry for host, entry in self._entries.items() if not self._is_expired(entry)}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stored, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Не вдалося зберегти SSL-політики хостів ({self.path}): {e}")
+
+    def _is_expired(self, entry):
+        return time.time() - entry.get("recorded_at", 0) > self.ttl
+
+    def record(self, failed_url, error):
+        """Запам'ятовує, що запит до failed_url (хост, де сталася SSL-помилка) потребував вимкнення SSL.
+           error — виняток SSL-помилки: зберігаються його клас і причина.
+        """
+        host = host_key(failed_url)
+        if host is None:
+            return
+        error_class, reason = _error_reason(error)
+        with self._lock:
+            self._entries[host] = {"error_class": error_class, "reason": reason, "recorded_at": time.time()}
+
+    def fallback_error(self, url):
+        """Текст помилки для url, якщо хост уже потребував вимкнення SSL, інакше None.
+           Текст стосується хосту (клас і причина збереженої помилки), а не конкретного url.
+        """
+        host = host_key(url)
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None or self._is_expired(entry):
+                return None
+            self.hits += 1
+        return f"{entry['error_class']}: перевірку SSL для {host} не пройдено раніше ({entry['reason']})"
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+_shared_policy = None
+_shared_policy_lock = threading.Lock()
+
+
+def get_ssl_policy():
+    """Повертає спільну для запуску SSL-політику хостів (створює її під час першого звернення)."""
+    global _shared_policy
+    with _shared_policy_lock:
+        if _shared_policy is None:
+            _shared_policy = SslPolicyCache()
+        return _shared_policy
+
+
+def configure_ssl_policy(path=None, ttl=DEFAULT_SSL_POLICY_TTL):
+    """Замінює спільну SSL-політику новою. path — файл для збереження між запусками (None — лише в пам'яті)."""
+    global _shared_policy
+    with _shared_policy_lock:
+        _shared_policy = SslPolicyCache(path=path, ttl=ttl)
+        return _shared_policy
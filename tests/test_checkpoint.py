@@ -0,0 +1,69 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль checkpoint
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from checkpoint import Checkpoint
+
+
+ROWS = [{"Url": f"https://donor.com/{n}", "Анкор-1": "Анкор", "Урл-1": "https://target.com/", "row_number": n + 2}
+        for n in range(3)]
+
+
+def _result(row):
+    return {"url": row["Url"], "final_status_code": 200, **row}
+
+
+def test_recorded_results_fill_resumed_run(tmp_path):
+    # Записані результати відновлюються, а недописаний останній рядок файлу ігнорується
+    path = str(tmp_path / "checkpoint.jsonl")
+    checkpoint = Checkpoint(path)
+    checkpoint.start()
+    for row in ROWS[:2]:
+        checkpoint.record(row, _result(row))
+    checkpoint.close()
+    assert checkpoint.written == 2
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "обірвано')
+
+    moved_rows = [{**row, "row_number": row["row_number"] + 10} for row in ROWS]
+    results = [None] * len(moved_rows)
+    pending = Checkpoint(path).fill(moved_rows, results, [0, 1, 2])
+    assert pending == [2]
+    assert [r["row_number"] for r in results[:2]] == [12, 13]
+
+
+def test_resume_appends_and_new_run_starts_over(tmp_path):
+    # resume=True дописує до файлу, звичайний запуск починає його заново
+    path = str(tmp_path / "checkpoint.jsonl")
+    for row, resume in ((ROWS[0], False), (ROWS[1], True)):
+        checkpoint = Checkpoint(path)
+        checkpoint.start(resume=resume)
+        checkpoint.record(row, _result(row))
+        checkpoint.close()
+    assert len(Checkpoint(path).load()) == 2
+
+    checkpoint = Checkpoint(path)
+    checkpoint.start()
+    checkpoint.close()
+    assert Checkpoint(path).load() == {}
+    checkpoint.remove()
+    assert not os.path.exists(path)
+
+
+def test_preloaded_checkpoint_fills_chunks_with_duplicate_rows(tmp_path):
+    # Записи, завантажені один раз, заповнюють кожну частину таблиці; однаковий вміст у двох рядках не змішує їхні номери
+    path = str(tmp_path / "checkpoint.jsonl")
+    checkpoint = Checkpoint(path)
+    checkpoint.start()
+    checkpoint.record(ROWS[0], _result(ROWS[0]))
+    checkpoint.close()
+
+    checkpointed = Checkpoint(path).load()
+    results = []
+    for row_number in (20, 30):
+        chunk = [{**ROWS[0], "row_number": row_number}, {**ROWS[1], "row_number": row_number + 1}]
+        chunk_results = [None] * len(chunk)
+        assert Checkpoint(path).fill(chunk, chunk_results, [0, 1], checkpointed) == [1]
+        results.append(chunk_results[0])
+    assert [r["row_number"] for r in results] == [20, 30]
@@ -0,0 +1,122 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль dns_cache
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_session
+from dns_cache import DnsCache
+
+
+def _fake_resolver(calls):
+    # Підміна системного резолвера: alive.com має IPv4-адресу, flaky.com — тимчасовий збій, решти хостів не існує
+    def resolve(host, port, family=0, type=0, proto=0, flags=0):
+        calls.append((host, port))
+        if host == "alive.com":
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", 0))]
+        if host == "flaky.com":
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+    return resolve
+
+
+def test_prefetch_resolves_once_and_marks_dead_hosts():
+    # Попередній етап визначає кожен хост один раз; неіснуючі хости кешуються, тимчасові збої — ні
+    calls = []
+    cache = DnsCache(resolver=_fake_resolver(calls))
+    assert cache.prefetch(["alive.com", "dead.com", "alive.com", "10.0.0.1", "flaky.com"]) == ({"dead.com"}, {"flaky.com"})
+    with pytest.raises(socket.gaierror):
+        cache.resolve("dead.com")
+    with pytest.raises(socket.gaierror):
+        cache.resolve("flaky.com")
+    assert sorted(calls) == [("alive.com", None), ("dead.com", None), ("flaky.com", None), ("flaky.com", None)]
+
+
+def test_prefetched_missing_hosts_kept_until_released():
+    # Відсутні хости з попереднього етапу не застарівають через negative_ttl, поки перевірка не скінчиться
+    calls = []
+    cache = DnsCache(negative_ttl=0, resolver=_fake_resolver(calls))
+    cache.prefetch(["dead.com"])
+    with pytest.raises(socket.gaierror):
+        cache.resolve("dead.com")
+    assert calls == [("dead.com", None)]
+    cache.release_missing()
+    with pytest.raises(socket.gaierror):
+        cache.resolve("dead.com")
+    assert calls == [("dead.com", None)] * 2
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_create_connection_uses_cached_address(local_server):
+    # З'єднання відкривається до вже визначеної IP-адреси без повторного DNS-запиту
+    calls = []
+    cache = DnsCache(resolver=_fake_resolver(calls))
+    cache.prefetch(["alive.com"])
+    sock = cache.create_connection(("alive.com", local_server), 1)
+    sock.close()
+    assert calls == [("alive.com", None)]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_shared_pool_resolves_through_cache_without_patching_socket(local_server, monkeypatch):
+    # Спільний HTTP-пул бере адреси з кешу, а socket.getaddrinfo решти процесу лишається системним
+    monkeypatch.setattr(http_session, "_breaker", http_session.CircuitBreaker())
+    monkeypatch.setattr(http_session, "_latency", http_session.LatencyTracker())
+    calls = []
+    cache = DnsCache(resolver=_fake_resolver(calls))
+    http_session.configure_pool()
+    system_getaddrinfo = socket.getaddrinfo
+    with http_session.use_dns_cache(cache):
+        assert socket.getaddrinfo is system_getaddrinfo
+        response = http_session.get(f"http://alive.com:{local_server}/", timeout=5)
+        assert response.status_code == 200 and response.text == "ok"
+        with pytest.raises(requests.exceptions.ConnectionError, match="NameResolutionError"):
+            http_session.get(f"http://dead.com:{local_server}/", timeout=5)
+    assert calls == [("alive.com", None), ("dead.com", None)]
+    assert http_session._dns_cache is None
+
+
+def test_missing_hosts_cached_for_negative_ttl():
+    # Відсутність хосту кешується коротше за адреси: після negative_ttl він визначається знову
+    calls = []
+    cache = DnsCache(negative_ttl=0, resolver=_fake_resolver(calls))
+    for _ in range(2):
+        cache.resolve("alive.com")
+        with pytest.raises(socket.gaierror):
+            cache.resolve("dead.com")
+    assert calls == [("alive.com", None), ("dead.com", None), ("dead.com", None)]
+
+
+def test_expired_entries_resolved_again():
+    # Після ttl адреса визначається заново
+    calls = []
+    cache = DnsCache(ttl=0, resolver=_fake_resolver(calls))
+    cache.resolve("alive.com")
+    cache.resolve("alive.com")
+    assert calls == [("alive.com", None)] * 2
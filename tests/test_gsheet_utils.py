@@ -0,0 +1,504 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль gsheet_utils
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import types
+
+import gspread
+import pytest
+
+import gsheet_utils
+from gsheet_utils import SheetResultWriter, _pack_blocks, _result_row_updates
+from sheets_client import SheetsWriteError
+
+
+class _FakeWorksheet:
+    # Аркуш у пам'яті: grid — рядки таблиці, починаючи з заголовків; row_count може бути більшим за дані,
+    # як у справжньої таблиці з порожніми рядками в кінці
+    def __init__(self, grid, title="Аркуш1", row_count=None, id=0):
+        self.grid = [list(row) for row in grid]
+        self.title = title
+        self.id = id
+        self.spreadsheet = object()
+        self._row_count = row_count or 0
+        self.batch_gets = []
+
+    @property
+    def row_count(self):
+        return max(self._row_count, len(self.grid))
+
+    def _cell(self, row_idx, col_idx):
+        row = self.grid[row_idx - 1] if row_idx <= len(self.grid) else []
+        return row[col_idx] if col_idx < len(row) else ""
+
+    def row_values(self, row_idx):
+        return _trim(self.grid[row_idx - 1] if row_idx <= len(self.grid) else [])
+
+    def batch_get(self, ranges):
+        # Як Sheets API: без кінцевих порожніх комірок у рядках і кінцевих порожніх рядків діапазону
+        self.batch_gets.append(list(ranges))
+        value_ranges = []
+        for range_name in ranges:
+            (first_row, first_col), (last_row, last_col) = map(gspread.utils.a1_to_rowcol, range_name.split(":"))
+            values = [_trim([self._cell(row_idx, col_idx) for col_idx in range(first_col - 1, last_col)])
+                      for row_idx in range(first_row, last_row + 1)]
+            while values and not values[-1]:
+                values.pop()
+            value_ranges.append(values)
+        return value_ranges
+
+    def get_all_values(self):
+        data = [_trim(row) for row in self.grid]
+        while data and not data[-1]:
+            data.pop()
+        width = max(map(len, data), default=0)
+        return [row + [""] * (width - len(row)) for row in data]
+
+    def set_cell(self, row_idx, col_idx, value):
+        while len(self.grid) < row_idx:
+            self.grid.append([])
+        row = self.grid[row_idx - 1]
+        row.extend([""] * (col_idx + 1 - len(row)))
+        row[col_idx] = value
+
+    def update(self, values, range_name):
+        first_row, first_col = gspread.utils.a1_to_rowcol(range_name.split(":")[0])
+        for row_offset, row in enumerate(values):
+            for col_offset, value in enumerate(row):
+                self.set_cell(first_row + row_offset, first_col - 1 + col_offset, value)
+
+
+def _trim(row):
+    row = list(row)
+    while row and row[-1] in ("", None):
+        row.pop()
+    return row
+
+
+class _FakeClient:
+    # Клієнт Sheets API: записує блоки прямо в аркуш і запам'ятовує діапазони
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.ranges = []
+
+    def read(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def write(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def batch_write(self, spreadsheet, entries, value_input_option="RAW"):
+        for entry in entries:
+            range_name = entry["range"].split("!", 1)[1]
+            self.ranges.append(range_name)
+            self.worksheet.update(entry["values"], range_name)
+        return 1, 0
+
+
+HEADERS = ["Url", "Анкор-1", "Урл-1", "Анкор-2", "Урл-2", "Status Code", "Клієнт",
+           "Final Redirect URL", "Final Status Code", "Robots.txt", "Meta Robots/X-Robots-Tag", "Canonical"]
+
+
+def _result(url, row_number, **extra):
+    result = {"url": url, "row_number": row_number, "status_code": 200, "final_status_code": 200,
+              "url1_found": "Так", "anchor1_match": "Так", "url1_rel": "dofollow"}
+    result.update(extra)
+    return result
+
+
+def test_pack_blocks_splits_row_gaps():
+    # Рядки з пропуском між ними не потрапляють в один прямокутник
+    row_targets = {2: {0: "a", 1: "b"}, 3: {0: "c", 1: "d"}, 5: {0: "e", 1: "f"}}
+    assert _pack_blocks(row_targets) == [("A2:B3", [["a", "b"], ["c", "d"]]), ("A5:B5", [["e", "f"]])]
+
+
+def test_pack_blocks_skips_columns_without_values():
+    # Стовпці без обчислених значень розривають блок і не записуються
+    row_targets = {2: {0: 1, 1: 2, 3: 4}, 3: {0: 5, 1: 6, 3: 8}}
+    assert _pack_blocks(row_targets) == [("A2:B3", [["1", "2"], ["5", "6"]]), ("D2:D3", [["4"], ["8"]])]
+
+
+def test_pack_blocks_splits_rows_with_different_columns():
+    # Сусідні рядки з різним набором стовпців пакуються окремо, без заповнення чужих комірок
+    row_targets = {2: {0: "a", 1: "b"}, 3: {1: "c"}}
+    assert _pack_blocks(row_targets) == [("A2:B2", [["a", "b"]]), ("B3:B3", [["c"]])]
+
+
+def test_result_row_updates_multiple_link_pairs():
+    # Пара з даними отримує результати, пара без анкора чи урла — очищається
+    header_indices = {h: i for i, h in enumerate(HEADERS + ["Урл-1 наявність", "Анкор-1 співпадає", "Урл-1 rel",
+                                                           "Урл-2 наявність", "Анкор-2 співпадає", "Урл-2 rel"])}
+    result = _result("https://a.com/", 2, **{"Анкор-2": "якір", "Урл-2": "https://b.com/",
+                                             "url2_found": "Ні", "anchor2_match": "Ні", "url2_rel": None})
+    updates = _result_row_updates(result, "https://a.com/", header_indices, [1, 2])
+    assert updates[header_indices["Урл-1 наявність"]] == "Так"
+    assert updates[header_indices["Урл-1 rel"]] == "dofollow"
+    assert updates[header_indices["Урл-2 наявність"]] == "Ні"
+    assert updates[header_indices["Урл-2 rel"]] == ""
+    result.pop("Урл-2")
+    updates = _result_row_updates(result, "https://a.com/", header_indices, [1, 2])
+    assert [updates[header_indices[h]] for h in ("Урл-2 наявність", "Анкор-2 співпадає", "Урл-2 rel")] == ["", "", ""]
+
+
+def test_writer_keeps_untouched_cells_edited_during_run():
+    # Комірки, яких немає серед результатів, не перезаписуються значеннями зі знімка
+    grid = [HEADERS,
+            ["https://a.com/", "якір", "https://x.com/", "", "", "", "Клієнт А"],
+            ["https://b.com/", "якір", "https://x.com/", "", "", "", "Клієнт Б"],
+            ["", "", "", "", "", "", "Примітка"],
+            ["https://c.com/", "якір", "https://x.com/", "", "", "", "Клієнт В"]]
+    worksheet = _FakeWorksheet(grid)
+    client = _FakeClient(worksheet)
+    writer = SheetResultWriter(worksheet, [list(row) for row in grid], client=client)
+    assert writer.prepare()
+    # Користувач редагує таблицю вже після знімка
+    client_col = HEADERS.index("Клієнт")
+    status_col = HEADERS.index("Status Code")
+    worksheet.set_cell(2, client_col, "Клієнт А (змінено)")
+    worksheet.set_cell(4, client_col, "Нова примітка")
+    worksheet.set_cell(5, status_col, "вручну")
+    # Для c.com статус не обчислено (немає ні коду, ні помилки): Status Code і Final-стовпці не пишуться
+    no_status = {"url": "https://c.com/", "row_number": 5, "canonical_url": "https://c.com/main"}
+    results = [_result("https://a.com/", 2), _result("https://b.com/", 3), no_status]
+    assert writer.write(results) == 3
+    assert worksheet.grid[1][client_col] == "Клієнт А (змінено)"
+    assert worksheet.grid[3][client_col] == "Нова примітка"
+    assert worksheet.grid[4][status_col] == "вручну"
+    # Рядок 4 без URL і стовпець "Клієнт" не входять у жоден блок
+    for range_name in client.ranges:
+        first, last = range_name.split(":")
+        (first_row, first_col), (last_row, last_col) = gspread.utils.a1_to_rowcol(first), gspread.utils.a1_to_rowcol(last)
+        assert not first_col - 1 <= client_col <= last_col - 1
+        assert not first_row <= 4 <= last_row
+    header_row = worksheet.grid[0]
+    assert worksheet.grid[1][header_row.index("Status Code")] == "200"
+    assert worksheet.grid[2][header_row.index("Урл-1 rel")] == "dofollow"
+    # Пара 2 без даних: її порожні результати збігаються зі знімком і не записуються
+    assert header_row.index("Урл-2 наявність") >= len(worksheet.grid[2])
+
+
+def test_writer_writes_only_changed_rows():
+    # Записуються лише комірки, значення яких відрізняється від знімка
+    worksheet = _FakeWorksheet([HEADERS, ["https://a.com/"], ["https://b.com/"]])
+    client = _FakeClient(worksheet)
+    writer = SheetResultWriter(worksheet, [list(row) for row in worksheet.grid], client=client)
+    assert writer.prepare()
+    assert writer.write([_result("https://a.com/", 2), _result("https://b.com/", 3)]) == 2
+
+    writer = SheetResultWriter(worksheet, [list(row) for row in worksheet.grid], client=client)
+    assert writer.prepare()
+    client.ranges.clear()
+    assert writer.write([_result("https://a.com/", 2), _result("https://b.com/", 3, url1_rel="nofollow")]) == 1
+    assert writer.changed_cells == 1
+    rel_cell = gspread.utils.rowcol_to_a1(3, worksheet.grid[0].index("Урл-1 rel") + 1)
+    assert client.ranges == [f"{rel_cell}:{rel_cell}"]
+    assert worksheet.grid[2][worksheet.grid[0].index("Урл-1 rel")] == "nofollow"
+
+
+class _BrokenClient(_FakeClient):
+    # Клієнт, у якого запис падає неочікуваною помилкою (не APIError, яку рахує SheetsClient)
+    def batch_write(self, spreadsheet, entries, value_input_option="RAW"):
+        raise ValueError("зламаний пакет")
+
+
+def test_unexpected_write_error_counts_failed_rows(monkeypatch, capsys):
+    # Неочікувана помилка запису не ковтається: рядки без записаних змін видно в підсумку
+    worksheet = _FakeWorksheet([HEADERS, ["https://a.com/"], ["https://b.com/"]])
+    writer = SheetResultWriter(worksheet, [list(row) for row in worksheet.grid], client=_BrokenClient(worksheet))
+    assert writer.prepare()
+    with pytest.raises(ValueError):
+        writer.write([_result("https://a.com/", 2), _result("https://b.com/", 3)])
+    assert writer.failed_rows == 2
+    writer.print_summary()
+    assert "зміни в 2 рядках не записано" in capsys.readouterr().out
+
+    # update_sheet_with_results повідомляє про помилку і все одно друкує підсумок
+    monkeypatch.setattr(gsheet_utils, "get_sheets_client", lambda: _BrokenClient(worksheet))
+    gsheet_utils.update_sheet_with_results(worksheet, [_result("https://a.com/", 2)], [list(row) for row in worksheet.grid])
+    out = capsys.readouterr().out
+    assert "зламаний пакет" in out and "зміни в 1 рядках не записано" in out
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def _started_writer(worksheet, client, **kwargs):
+    # Фоновий запис, як у main.py: лише заголовки, рядки додаються частинами
+    kwargs.setdefault("flush_rows", 1000)
+    kwargs.setdefault("flush_interval", 1000.0)
+    writer = SheetResultWriter(worksheet, headers=worksheet.grid[0], client=client, **kwargs)
+    assert writer.start()
+    return writer
+
+
+def test_background_writer_flushes_before_releasing_rows():
+    # Результати, що надійшли до release_rows, записуються до звільнення рядків; після звільнення рядок не знаходиться
+    worksheet = _FakeWorksheet([HEADERS, ["https://a.com/"], ["https://b.com/"], ["https://a.com/"]])
+    client = _FakeClient(worksheet)
+    writer = _started_writer(worksheet, client)
+    status_col = HEADERS.index("Status Code")
+    writer.add_rows(2, [list(row) for row in worksheet.grid[1:3]])
+    writer.record(_result("https://a.com/", 2))
+    writer.release_rows(2, 3)
+    # Наступна частина: той самий URL у рядку 4
+    writer.add_rows(4, [list(worksheet.grid[3])])
+    writer.record(_result("https://b.com/", 3))
+    writer.record(_result("https://a.com/", 4, status_code=404, final_status_code=404))
+    writer.release_rows(4, 4)
+    writer.close()
+    assert worksheet.grid[1][status_col] == "200"
+    assert worksheet.grid[3][status_col] == "404"
+    # Рядок 3 звільнено до того, як надійшов його результат
+    assert writer.not_found_urls == ["https://b.com/"]
+    assert len(worksheet.grid[2]) == 1
+    assert not writer._rows and not writer.url_to_row_indices
+
+
+def test_background_writer_flushes_on_close():
+    # Пакет, що не досяг flush_rows і flush_interval, записується під час close()
+    worksheet = _FakeWorksheet([HEADERS, ["https://a.com/"]])
+    client = _FakeClient(worksheet)
+    writer = _started_writer(worksheet, client)
+    writer.add_rows(2, [list(worksheet.grid[1])])
+    writer.record(_result("https://a.com/", 2))
+    time.sleep(0.05)
+    assert not client.ranges
+    writer.close()
+    assert client.ranges and worksheet.grid[1][HEADERS.index("Status Code")] == "200"
+    assert writer._thread is None
+    writer.close() # Повторний close нічого не робить
+
+
+def test_background_writer_flushes_by_rows_and_interval():
+    # Пакет надсилається, щойно набереться flush_rows результатів або мине flush_interval
+    worksheet = _FakeWorksheet([HEADERS, ["https://a.com/"], ["https://b.com/"], ["https://c.com/"]])
+    client = _FakeClient(worksheet)
+    writer = _started_writer(worksheet, client, flush_rows=2)
+    writer.add_rows(2, [list(row) for row in worksheet.grid[1:]])
+    writer.record(_result("https://a.com/", 2))
+    writer.record(_result("https://b.com/", 3))
+    assert _wait_for(lambda: len(worksheet.grid[2]) > 1)
+    writer.close()
+
+    worksheet = _FakeWorksheet([HEADERS, ["https://a.com/"]])
+    client = _FakeClient(worksheet)
+    writer = _started_writer(worksheet, client, flush_interval=0.05)
+    writer.add_rows(2, [list(worksheet.grid[1])])
+    writer.record(_result("https://a.com/", 2))
+    assert _wait_for(lambda: len(worksheet.grid[1]) > 1)
+    writer.close()
+
+
+class _FlakyClient(_FakeClient):
+    # Перший пакет падає неочікуваною помилкою, наступні записуються
+    def __init__(self, worksheet):
+        super().__init__(worksheet)
+        self.failures = 1
+
+    def batch_write(self, spreadsheet, entries, value_input_option="RAW"):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("збій мережі")
+        return super().batch_write(spreadsheet, entries, value_input_option)
+
+
+def test_background_writer_survives_write_error(capsys):
+    # Помилка всередині потоку не зупиняє запис: наступні пакети записуються, втрачені рядки видно в підсумку
+    worksheet = _FakeWorksheet([HEADERS, ["https://a.com/"], ["https://b.com/"]])
+    client = _FlakyClient(worksheet)
+    writer = _started_writer(worksheet, client, flush_rows=1)
+    writer.add_rows(2, [list(row) for row in worksheet.grid[1:]])
+    writer.record(_result("https://a.com/", 2))
+    assert _wait_for(lambda: writer.failed_rows == 1)
+    writer.record(_result("https://b.com/", 3))
+    writer.close()
+    assert len(worksheet.grid[1]) == 1
+    assert worksheet.grid[2][HEADERS.index("Status Code")] == "200"
+    out = capsys.readouterr().out
+    assert "збій мережі" in out
+    writer.print_summary()
+    assert "зміни в 1 рядках не записано" in capsys.readouterr().out
+
+
+def _old_missing_data(worksheet, mandatory_headers=("Анкор-1", "Урл-1", "Url")):
+    # Перевірка обов'язкових даних, як до читання частинами: уся таблиця одним get_all_values
+    data = worksheet.get_all_values()
+    headers = data[0]
+    return {col: idxs for col in mandatory_headers
+            if col in headers and (idxs := [row_idx for row_idx, row in enumerate(data[1:], 2) if row[headers.index(col)] in ("", None)])}
+
+
+def _check_structure(monkeypatch, worksheet):
+    # check_sheet_structure без Colab і мережі: авторизація і відкриття таблиці підмінені
+    monkeypatch.setitem(sys.modules, "google.colab", types.SimpleNamespace(auth=types.SimpleNamespace(authenticate_user=lambda: None)))
+    monkeypatch.setattr(gsheet_utils, "default", lambda: (None, None))
+    spreadsheet = types.SimpleNamespace(worksheets=lambda: [worksheet], get_worksheet=lambda index: worksheet)
+    monkeypatch.setattr(gsheet_utils.gspread, "authorize", lambda credentials: types.SimpleNamespace(open_by_key=lambda key: spreadsheet))
+    monkeypatch.setattr(gsheet_utils, "get_sheets_client", lambda: _FakeClient(worksheet))
+    return gsheet_utils.check_sheet_structure("https://docs.google.com/spreadsheets/d/abc/edit#gid=0")
+
+
+def _chunked_missing_data(worksheet, chunk_rows):
+    # Порожні обов'язкові комірки, знайдені під час читання частинами, як у main
+    headers = worksheet.grid[0]
+    missing_data = {}
+    for first_row, rows in gsheet_utils.iter_sheet_rows(worksheet, headers, chunk_rows, client=_FakeClient(worksheet)):
+        for col, idxs in gsheet_utils.find_missing_data(headers, first_row, rows).items():
+            missing_data.setdefault(col, []).extend(idxs)
+    return missing_data
+
+
+def test_structure_check_reports_missing_headers(monkeypatch):
+    # Без обов'язкового стовпця — помилка заголовків
+    worksheet = _FakeWorksheet([["Анкор-1", "Url"], ["a", "https://a.com/"]])
+    result = _check_structure(monkeypatch, worksheet)
+    assert not result["success"]
+    assert result["error"].startswith("Відсутні обов'язкові заголовки: Урл-1.")
+    assert result["actual_headers"] == ["Анкор-1", "Url"]
+    assert not worksheet.batch_gets
+
+
+MISSING_GRID = [["Анкор-1", "Урл-1", "Url", "Примітка"],
+                ["a", "https://x.com/", "https://a.com/", "ок"],
+                ["", "https://x.com/", "https://b.com/"],
+                ["a", "https://x.com/"],
+                [],
+                ["", "", "", "лише примітка"],
+                ["a", "", "https://c.com/"]]
+
+
+def test_structure_check_reads_only_headers(monkeypatch):
+    # Перевірка структури читає лише заголовки: дані читаються один раз, під час перевірки частинами
+    worksheet = _FakeWorksheet(MISSING_GRID)
+    result = _check_structure(monkeypatch, worksheet)
+    assert result["success"] and result["message"] == "Таблиця має правильну структуру."
+    assert result["headers"] == MISSING_GRID[0] and result["worksheet"] is worksheet
+    assert not worksheet.batch_gets
+
+
+@pytest.mark.parametrize("chunk_rows", [2, 3, 100])
+def test_chunked_missing_data_matches_full_read(chunk_rows):
+    # Порожні обов'язкові комірки, короткі рядки й порожні рядки між даними — як у перевірці через get_all_values
+    worksheet = _FakeWorksheet(MISSING_GRID)
+    missing = _old_missing_data(worksheet)
+    assert missing == {"Анкор-1": [3, 5, 6], "Урл-1": [5, 6, 7], "Url": [4, 5, 6]}
+    assert _chunked_missing_data(worksheet, chunk_rows) == missing
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 100])
+def test_missing_data_ignores_trailing_blank_rows(chunk_rows):
+    # Порожні рядки в кінці сітки (row_count більший за дані) не вважаються пропущеними даними
+    grid = [["Анкор-1", "Урл-1", "Url"], ["a", "https://x.com/", "https://a.com/"], ["", "", ""], []]
+    worksheet = _FakeWorksheet(grid, row_count=10)
+    assert _old_missing_data(worksheet) == {}
+    assert _chunked_missing_data(worksheet, chunk_rows) == {}
+
+
+def test_read_rows_reads_only_requested_columns():
+    # Один запит на всі проміжки стовпців; решта стовпців порожні, кінцеві порожні рядки відкидаються
+    headers = ["Анкор-1", "Урл-1", "Примітка", "Url", "Status Code"]
+    worksheet = _FakeWorksheet([headers, ["a", "u", "x", "https://a.com/", "200"], ["b", "", "y"], ["", "", "z"], []], row_count=8)
+    rows = gsheet_utils._read_rows(_FakeClient(worksheet), worksheet, headers, {"Анкор-1", "Урл-1", "Url"}, 2, 8)
+    assert worksheet.batch_gets == [["A2:B8", "D2:D8"]]
+    assert rows == [["a", "u", "", "https://a.com/", ""], ["b", "", "", "", ""]]
+
+
+def _expected_rows(worksheet, headers, column_names):
+    # Рядки даних, як у get_all_values, де залишено лише стовпці column_names
+    return [[value if headers[col_idx] in column_names else "" for col_idx, value in enumerate(row[:len(headers)] + [""] * (len(headers) - len(row)))]
+            for row in worksheet.get_all_values()[1:]]
+
+
+GAP_GRID = [["Анкор-1", "Урл-1", "Url", "Примітка"],
+            ["a", "u", "https://a.com/", "x"],
+            ["b"],                                   # Короткий рядок
+            [], [], [], [],                          # Проміжок у 4 рядки: частину до 3 рядків він займає цілком
+            ["", "", "https://c.com/"],
+            ["", "", "", "лише примітка"],           # Рядок без вхідних даних — читається як порожній
+            ["d", "u", "https://d.com/"],
+            [], []]
+
+
+@pytest.mark.parametrize("chunk_rows", range(4, 14))
+def test_iter_sheet_rows_matches_full_read(chunk_rows):
+    # Склеєні частини збігаються з get_all_values за будь-якої межі частин, з пропусками і кінцевими порожніми рядками
+    worksheet = _FakeWorksheet(GAP_GRID, row_count=1000)
+    headers = GAP_GRID[0]
+    chunks = list(gsheet_utils.iter_sheet_rows(worksheet, headers, chunk_rows, column_names={"Анкор-1", "Урл-1", "Url"},
+                                               client=_FakeClient(worksheet)))
+    next_row = 2
+    for first_row, rows in chunks:
+        assert first_row == next_row and rows
+        assert all(len(row) == len(headers) for row in rows)
+        next_row = first_row + len(rows)
+    assert [row for _, rows in chunks for row in rows] == _expected_rows(worksheet, headers, {"Анкор-1", "Урл-1", "Url"})
+    # Останній рядок з даними — 10; порожні рядки після нього не віддаються
+    assert next_row == 11
+    # Кожну частину прочитано одним запитом; порожній хвіст сітки — лише одна порожня частина після даних
+    assert len(worksheet.batch_gets) == len(range(2, 11, chunk_rows)) + 1
+
+
+@pytest.mark.parametrize("chunk_rows", range(1, 4))
+def test_iter_sheet_rows_stops_at_empty_chunk(chunk_rows):
+    # Проміжок, що займає цілу частину, вважається кінцем даних: рядки після нього не читаються
+    worksheet = _FakeWorksheet(GAP_GRID, row_count=1000)
+    headers = GAP_GRID[0]
+    chunks = list(gsheet_utils.iter_sheet_rows(worksheet, headers, chunk_rows, column_names={"Анкор-1", "Урл-1", "Url"},
+                                               client=_FakeClient(worksheet)))
+    assert [row for _, rows in chunks for row in rows] == _expected_rows(worksheet, headers, {"Анкор-1", "Урл-1", "Url"})[:2]
+    assert all(not range_name.startswith(("A8:", "A9:", "A10:")) for ranges in worksheet.batch_gets for range_name in ranges)
+
+
+def test_iter_sheet_rows_sheet_shorter_than_chunk():
+    # Таблиця, коротша за частину, читається одним запитом і віддається однією частиною
+    headers = ["Анкор-1", "Урл-1", "Url"]
+    worksheet = _FakeWorksheet([headers, ["a", "u", "https://a.com/"], ["b", "", "https://b.com/"]])
+    chunks = list(gsheet_utils.iter_sheet_rows(worksheet, headers, 5000, client=_FakeClient(worksheet)))
+    assert chunks == [(2, [["a", "u", "https://a.com/"], ["b", "", "https://b.com/"]])]
+    assert worksheet.batch_gets == [["A2:C3"]]
+
+
+def test_iter_sheet_rows_empty_sheet():
+    # Лише заголовки або лише порожні рядки — жодної частини
+    headers = ["Анкор-1", "Урл-1", "Url"]
+    assert list(gsheet_utils.iter_sheet_rows(_FakeWorksheet([headers]), headers, 2, client=_FakeClient(None))) == []
+    worksheet = _FakeWorksheet([headers, [], []], row_count=7)
+    assert list(gsheet_utils.iter_sheet_rows(worksheet, headers, 2, client=_FakeClient(worksheet))) == []
+    assert len(worksheet.batch_gets) == 1
+
+
+class _RejectingClient(_FakeClient):
+    # Як SheetsClient: блоки рядка rejected_row відхилено API, решта записується
+    def __init__(self, worksheet, rejected_row):
+        super().__init__(worksheet)
+        self.rejected_row = rejected_row
+
+    def batch_write(self, spreadsheet, entries, value_input_option="RAW"):
+        rejected = [entry for entry in entries if entry["range"].endswith(f"{self.rejected_row}")]
+        super().batch_write(spreadsheet, [entry for entry in entries if entry not in rejected], value_input_option)
+        if rejected:
+            raise SheetsWriteError([entry["range"] for entry in rejected], calls=1, sent_bytes=10)
+        return 1, 10
+
+
+def test_rejected_blocks_count_as_failed_rows(capsys):
+    # Блоки, які API так і не прийняв, рахуються незаписаними рядками, і підсумок не звітує про успіх
+    # (рядок 3 з Canonical має інший набір стовпців, тож пакується окремим блоком)
+    worksheet = _FakeWorksheet([HEADERS, ["https://a.com/"], ["https://b.com/"], ["https://c.com/"]])
+    writer = SheetResultWriter(worksheet, [list(row) for row in worksheet.grid], client=_RejectingClient(worksheet, 3))
+    assert writer.prepare()
+    with pytest.raises(SheetsWriteError):
+        writer.write([_result("https://a.com/", 2), _result("https://b.com/", 3, canonical_url="https://b.com/main"), _result("https://c.com/", 4)])
+    assert writer.failed_rows == 1
+    assert writer.api_calls == 2  # Заголовки і пакет з прийнятими блоками
+    assert len(worksheet.grid[2]) == 1 and worksheet.grid[3][HEADERS.index("Status Code")] == "200"
+    capsys.readouterr()
+    writer.print_summary()
+    out = capsys.readouterr().out
+    assert "✅" not in out and "зміни в 1 рядках не записано" in out
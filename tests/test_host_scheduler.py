@@ -0,0 +1,61 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль host_scheduler
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import asyncio
+from host_scheduler import HostScheduler
+
+
+def _run(scheduler, items, delay=0.01):
+    # Запускає планувальник і збирає журнал: (подія, хост, елемент, час)
+    log = []
+    active = {}
+
+    async def worker(item):
+        host, value = item
+        active[host] = active.get(host, 0) + 1
+        log.append(("start", host, value, time.monotonic(), active[host]))
+        await asyncio.sleep(delay)
+        active[host] -= 1
+        return value * 10
+
+    results = asyncio.run(scheduler.run(items, key=lambda item: item[0], worker=worker))
+    return results, log
+
+
+def test_results_in_input_order():
+    # Результати повертаються в порядку вхідних елементів, незалежно від хостів
+    items = [("a", 1), ("b", 2), ("a", 3), ("c", 4), ("b", 5)]
+    results, _ = _run(HostScheduler(10, per_host_limit=1, min_host_delay=0), items)
+    assert results == [10, 20, 30, 40, 50]
+
+
+def test_per_host_limit_respected():
+    # На одному хості одночасно виконується не більше per_host_limit завдань
+    items = [("a", i) for i in range(6)]
+    _, log = _run(HostScheduler(10, per_host_limit=2, min_host_delay=0), items)
+    assert max(entry[4] for entry in log) == 2
+
+
+def test_hosts_interleaved():
+    # Хости чергуються: спершу по одному завданню на кожен хост
+    items = [("a", 1), ("a", 2), ("a", 3), ("b", 4), ("c", 5)]
+    _, log = _run(HostScheduler(1, per_host_limit=1, min_host_delay=0), items)
+    assert [entry[1] for entry in log][:3] == ["a", "b", "c"]
+
+
+def test_min_host_delay():
+    # Між запусками завдань одного хосту минає щонайменше min_host_delay
+    items = [("a", 1), ("a", 2), ("a", 3)]
+    _, log = _run(HostScheduler(10, per_host_limit=5, min_host_delay=0.05), items, delay=0)
+    starts = [entry[3] for entry in log]
+    assert all(later - earlier >= 0.045 for earlier, later in zip(starts, starts[1:]))
+
+
+def test_none_key_has_no_host_limits():
+    # Елементи без origin (None) не обмежуються ні лімітом хосту, ні паузою
+    items = [(None, i) for i in range(4)]
+    _, log = _run(HostScheduler(10, per_host_limit=1, min_host_delay=10), items)
+    assert len(log) == 4 and max(entry[4] for entry in log) == 4
@@ -0,0 +1,68 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль html_stream
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from html_stream import HtmlStreamExtractor, LinkTargets
+
+
+PAGE = (
+    '<html><head><title>T</title><link rel="canonical" href="/c"></head>'
+    '<body><a href="/one">Перше  <b>посилання</b></a>'
+    '<a href="https://target.com" rel="nofollow sponsored">Анкор</a></body></html>'
+).encode('utf-8')
+
+
+def _extract(data, chunk_size):
+    # Подаємо сторінку частинами заданого розміру і збираємо всі посилання
+    links = []
+    extractor = HtmlStreamExtractor(on_link=lambda href, text, rel: links.append((href, text, rel)))
+    for i in range(0, len(data), chunk_size):
+        extractor.feed_bytes(data[i:i + chunk_size])
+    extractor.close()
+    return extractor, links
+
+
+def test_extractor_collects_links_like_get_text_strip():
+    # Текст посилання збирається з обрізаних текстових вузлів без роздільників, rel — список
+    extractor, links = _extract(PAGE, 1024)
+    assert links == [
+        ("/one", "Першепосилання", []),
+        ("https://target.com", "Анкор", ["nofollow", "sponsored"]),
+    ]
+    assert extractor.head_closed
+
+
+def test_extractor_same_result_for_any_chunking():
+    # Розбиття на фрагменти (навіть посеред UTF-8 символу) не впливає на результат
+    _, expected = _extract(PAGE, 1024)
+    for chunk_size in (1, 3, 7, 64):
+        assert _extract(PAGE, chunk_size)[1] == expected
+
+
+def test_extractor_head_not_closed_before_body():
+    # До </head> або <body> екстрактор не вважає <head> пройденим
+    extractor = HtmlStreamExtractor()
+    extractor.feed_bytes(b'<html><head><meta name="robots" content="noindex">')
+    assert not extractor.head_closed
+    extractor.feed_bytes(b'</head>')
+    assert extractor.head_closed
+
+
+def test_link_targets_complete_after_exact_matches():
+    # Усі пари з URL і анкором мають знайтися точно; пари без анкору не очікуються
+    targets = LinkTargets("https://donor.com/page", [("Анкор", "https://target.com"), (None, "https://other.com")])
+    assert not targets.complete
+    targets.add_link("https://target.com/", "Інший текст")
+    assert not targets.complete
+    targets.add_link("https://target.com", " анкор ")
+    assert targets.complete
+
+
+def test_link_targets_one_link_per_pair():
+    # Однакові пари потребують двох різних посилань
+    targets = LinkTargets("https://donor.com/", [("A", "https://donor.com/x"), ("A", "https://donor.com/x")])
+    targets.add_link("https://donor.com/x", "a")
+    assert not targets.complete
+    targets.add_link("/x", "A")
+    assert targets.complete
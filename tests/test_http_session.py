@@ -0,0 +1,199 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль http_session
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import http_session
+from utils import is_ssl_error
+
+
+@pytest.fixture(autouse=True)
+def _default_retries():
+    # Після кожного тесту повертаємо типову політику повторів, новий запобіжник і трекер затримок
+    yield
+    http_session.configure_retries()
+    http_session.configure_timeouts()
+
+
+class _FakeResponse:
+    def __init__(self, status_code, headers=None, elapsed=0.1, url="https://site.com/", history=()):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.elapsed = datetime.timedelta(seconds=elapsed)
+        self.url = url
+        self.history = list(history)
+
+    def close(self):
+        pass
+
+
+def _fake_network(monkeypatch, outcomes):
+    # Підміна мережі: кожен запит забирає наступний результат (відповідь або виняток)
+    calls = []
+    sleeps = []
+
+    class Session:
+        def request(self, method, url, **kwargs):
+            calls.append(url)
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+    monkeypatch.setattr(http_session, "new_session", Session)
+    monkeypatch.setattr(http_session.time, "sleep", sleeps.append)
+    return calls, sleeps
+
+
+def test_retries_503_honoring_retry_after(monkeypatch):
+    # 503 з Retry-After повторюється після вказаної паузи, далі повертається успішна відповідь
+    http_session.configure_retries(max_retries=2)
+    calls, sleeps = _fake_network(monkeypatch, [_FakeResponse(503, {"Retry-After": "3"}), _FakeResponse(200)])
+    assert http_session.get("https://site.com/").status_code == 200
+    assert len(calls) == 2 and sleeps == [3.0]
+
+
+def test_long_retry_after_and_timeouts_not_retried(monkeypatch):
+    # Retry-After довший за backoff_max і таймаути не повторюються
+    http_session.configure_retries(max_retries=2, backoff_max=10)
+    calls, sleeps = _fake_network(monkeypatch, [_FakeResponse(429, {"Retry-After": "120"}),
+                                                requests.exceptions.ReadTimeout("read timed out")])
+    assert http_session.get("https://site.com/").status_code == 429
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        http_session.get("https://site.com/")
+    assert len(calls) == 2 and sleeps == []
+
+
+def test_breaker_fails_host_fast_after_consecutive_failures(monkeypatch):
+    # Після threshold невдач поспіль запити до хосту відхиляються без з'єднання, інші хости працюють
+    http_session.configure_retries(max_retries=0, breaker_threshold=2)
+    calls, _ = _fake_network(monkeypatch, [requests.exceptions.ConnectTimeout("timeout")] * 2 + [_FakeResponse(200)])
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            http_session.get("https://dead.com/a")
+    with pytest.raises(http_session.HostCircuitOpenError) as fast_failure:
+        http_session.get("https://dead.com/b")
+    assert not is_ssl_error(str(fast_failure.value))
+    assert http_session.get("https://alive.com/").status_code == 200
+    assert calls == ["https://dead.com/a", "https://dead.com/a", "https://alive.com/"]
+
+
+def test_ssl_errors_do_not_trip_breaker(monkeypatch):
+    # SSL-помилки обробляє повтор без перевірки сертифіката, запобіжник їх не рахує
+    http_session.configure_retries(max_retries=0, breaker_threshold=1)
+    _fake_network(monkeypatch, [requests.exceptions.SSLError("certificate verify failed"), _FakeResponse(200)])
+    with pytest.raises(requests.exceptions.SSLError):
+        http_session.get("https://selfsigned.com/")
+    assert http_session.get("https://selfsigned.com/").status_code == 200
+
+
+def test_p2_quantile_tracks_p95_without_storing_samples():
+    # Оцінка P² близька до точного p95 на великій вибірці
+    rng = random.Random(7)
+    samples = [rng.expovariate(1.0) for _ in range(5000)]
+    estimator = http_session.P2Quantile(0.95)
+    for value in samples:
+        estimator.add(value)
+    exact = sorted(samples)[int(0.95 * len(samples))]
+    assert abs(estimator.value() - exact) / exact < 0.05
+    assert len(estimator._heights) == 5
+
+
+def test_timeouts_follow_host_p95_within_bounds(monkeypatch):
+    # Поки зразків мало — фіксований таймаут; далі p95 * множник у межах [floor, ceiling], тож повільний,
+    # але справний хост отримує довший за фіксований таймаут
+    http_session.configure_timeouts(floor=2.0, ceiling=30.0, multiplier=4.0)
+    timeouts = []
+    elapsed = {"fast.com": 0.05, "slow.com": 5.0, "mid.com": 1.0, "crawl.com": 10.0}
+
+    class Session:
+        def request(self, method, url, **kwargs):
+            timeouts.append(kwargs["timeout"])
+            return _FakeResponse(200, elapsed=elapsed[url.split("/")[2]], url=url)
+
+    monkeypatch.setattr(http_session, "new_session", Session)
+    for host in elapsed:
+        for _ in range(http_session.MIN_LATENCY_SAMPLES):
+            http_session.get(f"https://{host}/", timeout=15)
+    assert set(timeouts) == {15}
+    for host in elapsed:
+        http_session.get(f"https://{host}/", timeout=15)
+    # Таймаут з'єднання без зразків часу з'єднання лишається фіксованим
+    assert timeouts[-4:] == [(15, 2.0), (15, 20.0), (15, 4.0), (15, 30.0)]
+    # Звіт показує саме ті таймаути, що застосовано
+    assert [(host, timeout) for host, _, _, timeout in http_session._latency.report()] == [
+        ("crawl.com", 30.0), ("slow.com", 20.0), ("mid.com", 4.0), ("fast.com", 2.0)]
+
+
+def test_timed_out_requests_are_not_latency_samples(monkeypatch):
+    # Таймаути не подовжують таймаут хосту: без успішних відповідей діє фіксований таймаут запиту
+    http_session.configure_retries(max_retries=0, breaker_threshold=100)
+    http_session.configure_timeouts(floor=1.0, ceiling=60.0, multiplier=2.0, enabled=True)
+    _fake_network(monkeypatch, [requests.exceptions.ReadTimeout("read timed out")] * 6)
+    for _ in range(6):
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            http_session.get("https://slow.com/", timeout=10)
+    assert http_session._latency.timeout_for("slow.com", 10) == 10
+    for _ in range(http_session.MIN_LATENCY_SAMPLES):
+        http_session._latency.record("slow.com", 30.0)
+    assert http_session._latency.timeout_for("slow.com", 10) == (10, 60.0)
+    http_session.configure_timeouts(enabled=False)
+    assert http_session._latency.timeout_for("slow.com", 10) == 10
+
+
+def test_connect_timeout_from_connection_samples():
+    # Таймаут з'єднання рахується з часу встановлення з'єднань, окремо від затримки відповіді
+    latency = http_session.LatencyTracker(floor=2.0, multiplier=4.0, connect_floor=0.5)
+    for _ in range(http_session.MIN_LATENCY_SAMPLES):
+        latency.record_connect("site.com", 0.05)
+    assert latency.timeout_for("site.com", 15) == (0.5, 15)
+    for _ in range(http_session.MIN_LATENCY_SAMPLES):
+        latency.record_connect("slow.com", 1.0)
+        latency.record("slow.com", 3.0)
+    assert latency.timeout_for("slow.com", 15) == (4.0, 12.0)
+
+
+def test_redirect_hops_sampled_under_their_own_hosts(monkeypatch):
+    # Затримка кожного кроку редиректу рахується для хосту, що відповів, а не для хосту початкового URL
+    hop = _FakeResponse(301, elapsed=0.2, url="https://old.com/")
+    _fake_network(monkeypatch, [_FakeResponse(200, elapsed=3.0, url="https://new.com/page", history=[hop])])
+    http_session.get("https://old.com/", timeout=15)
+    assert http_session._latency._hosts["old.com"].value() == 0.2
+    assert http_session._latency._hosts["new.com"].value() == 3.0
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_new_connections_sampled_for_connect_timeout():
+    # Час з'єднання записується лише для нових з'єднань: повторне використання keep-alive зразка не дає
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        http_session.configure_pool()
+        for _ in range(3):
+            assert http_session.get(f"http://127.0.0.1:{server.server_address[1]}/", timeout=5).text == "ok"
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert http_session._latency._connect["127.0.0.1"].count == 1
+    assert http_session._latency._hosts["127.0.0.1"].count == 3
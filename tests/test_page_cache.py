@@ -0,0 +1,35 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль page_cache
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from page_cache import PageCache
+
+
+ENTRY = {
+    "final_url": "https://donor.com/page", "etag": '"v1"', "last_modified": None, "headers": {},
+    "backend": "stream", "stopped_early": False, "robots_meta": None, "canonical_href": "/page",
+    "links": [{"href": "https://target.com/", "text": "Анкор", "rel": ["nofollow"]}],
+}
+
+
+def test_entries_persist_between_runs(tmp_path):
+    # Записи зберігаються в SQLite і доступні новому екземпляру (наступному запуску)
+    path = str(tmp_path / "cache" / "pages.sqlite")
+    cache = PageCache(path=path)
+    cache.put("https://donor.com/page", ENTRY)
+    cache.close()
+
+    reopened = PageCache(path=path)
+    assert reopened.get("https://donor.com/page") == ENTRY
+    assert reopened.get("https://donor.com/other") is None
+
+
+def test_unusable_path_falls_back_to_memory(tmp_path):
+    # Якщо файл відкрити неможливо, сховище працює в пам'яті, а не падає
+    blocker = tmp_path / "file"
+    blocker.write_text("x")
+    cache = PageCache(path=str(blocker / "pages.sqlite"))
+    cache.put("https://donor.com/page", ENTRY)
+    assert cache.get("https://donor.com/page") == ENTRY
+    assert cache.stored == 1
@@ -0,0 +1,289 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль request_processor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import requests
+import urllib3
+from requests.structures import CaseInsensitiveDict
+
+import page_cache as page_cache_module
+import request_processor
+from page_cache import PageCache
+from ssl_policy import SslPolicyCache
+
+
+PAGE = (
+    '<html><head><meta name="robots" content="nofollow"><link rel="canonical" href="/page"></head>'
+    '<body><a href="https://target.com/" rel="sponsored">Анкор</a><a href="https://other.com/">Інше</a></body></html>'
+)
+ANCHORS = ("Анкор", "https://target.com/", "Не той", "https://other.com/")
+
+
+def test_parse_stage_in_processes_matches_inline(capsys):
+    # Перевірки сторінки в пулі процесів дають ті самі результати та вивід, що й у потоці
+    url = "https://donor.com/page"
+    headers = CaseInsensitiveDict({"x-robots-tag": "noindex"})
+    inline = {}
+    request_processor._run_page_checks(url, PAGE, headers, ANCHORS, inline)
+    inline_output = capsys.readouterr().out
+
+    with request_processor._parse_stage(2) as pool:
+        assert request_processor._parse_pool is pool
+        jobs = [pool.submit(request_processor._check_page_in_process, url, PAGE.encode("cp1251"), "cp1251",
+                            headers, ANCHORS, backend) for backend in ("stream", "bs4")]
+        for job in jobs:
+            assert job.result() == (inline, inline_output, None, None)
+    assert request_processor._parse_pool is None
+
+
+def test_parse_stage_disabled_without_workers():
+    # parse_workers=0 — розбір лишається в потоках завантаження
+    with request_processor._parse_stage(0) as pool:
+        assert pool is None
+        assert request_processor._parse_pool is None
+
+
+class _FakeResponse:
+    # Мінімальна потокова відповідь requests без мережі
+    def __init__(self, url, body, status_code=200, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.history = []
+        self.headers = CaseInsensitiveDict({"Content-Type": "text/html; charset=utf-8", **(headers or {})})
+        self._body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def close(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self._body), chunk_size):
+            yield self._body[start:start + chunk_size]
+
+
+def test_duplicate_urls_fetched_once(monkeypatch):
+    # Рядки з однаковим Url: один запит і один розбір, а пари кожного рядка перевіряються окремо
+    requested = []
+
+    def fake_get(url, **kwargs):
+        requested.append(url)
+        return _FakeResponse(url, PAGE.encode("utf-8"))
+
+    monkeypatch.setattr(request_processor.http_session, "get", fake_get)
+    monkeypatch.setattr(request_processor, "check_robots_txt", lambda *args, **kwargs: True)
+    monkeypatch.setattr(request_processor, "_finish_robots_cache", lambda: None)
+    monkeypatch.setattr(request_processor, "get_dns_cache", lambda: None)
+    page_cache = PageCache(path=None)
+    monkeypatch.setattr(request_processor, "get_page_cache", lambda: page_cache)
+    rows = [
+        {"Url": "https://donor.com/page", "Анкор-1": "Анкор", "Урл-1": "https://target.com/", "row_number": 2},
+        {"Url": "https://donor.com/page", "Анкор-1": "Інше", "Урл-1": "https://other.com/", "row_number": 3},
+        {"Url": "https://donor.com/page", "Анкор-1": "Інше", "Урл-1": "https://other.com/",
+         "Анкор-2": "Анкор", "Урл-2": "https://target.com/", "row_number": 4},
+    ]
+    finished = []
+    results = request_processor.check_status_code_requests(rows, fetch_mode=request_processor.FETCH_MODE_GET,
+                                                           on_result=lambda row, result: finished.append(result))
+
+    assert requested == ["https://donor.com/page"]
+    assert finished == results
+    assert [(r["row_number"], r["url1_found"], r["url1_rel"]) for r in results] == [
+        (2, "Так", "sponsored"), (3, "Так", None), (4, "Так", None)
+    ]
+    assert results[2]["anchor2_match"] == "Так"
+    assert all(r["canonical_url"] == "https://donor.com/page" for r in results)
+    assert request_processor._coalescer is None
+
+
+def test_concurrent_engine_matches_sequential(monkeypatch):
+    # Асинхронний рушій повертає ті самі словники результатів і в тому самому порядку, що й послідовний
+    def fake_get(url, **kwargs):
+        if "missing" in url:
+            return _FakeResponse(url, b"", status_code=404)
+        return _FakeResponse(url, PAGE.encode("utf-8"))
+
+    monkeypatch.setattr(request_processor.http_session, "get", fake_get)
+    monkeypatch.setattr(request_processor, "check_robots_txt", lambda *args, **kwargs: True)
+    monkeypatch.setattr(request_processor, "_finish_robots_cache", lambda: None)
+    monkeypatch.setattr(request_processor, "get_dns_cache", lambda: None)
+    monkeypatch.setattr(request_processor, "get_ssl_policy", lambda: SslPolicyCache(path=None))
+    rows = [{"Url": f"https://donor{n % 3}.com/{'missing' if n % 4 == 3 else 'page'}/{n}",
+             "Анкор-1": "Анкор" if n % 2 else "Інше", "Урл-1": "https://target.com/", "row_number": n + 2}
+            for n in range(9)] + [{"Url": "", "Анкор-1": "Анкор", "Урл-1": "https://target.com/", "row_number": 11}]
+
+    runs = []
+    for check in (lambda rows: request_processor.check_status_code_requests(rows, fetch_mode=request_processor.FETCH_MODE_GET),
+                  lambda rows: request_processor.check_status_code_requests_concurrent(rows, fetch_mode=request_processor.FETCH_MODE_GET,
+                                                                                       max_concurrency=4, min_host_delay=0)):
+        page_cache = PageCache(path=None)
+        monkeypatch.setattr(request_processor, "get_page_cache", lambda: page_cache)
+        runs.append(check([dict(row) for row in rows]))
+
+    assert runs[1] == runs[0]
+    assert [r["row_number"] for r in runs[1]] == [row["row_number"] for row in rows]
+    assert [r["final_status_code"] for r in runs[0][:4]] == [200, 200, 200, 404]
+
+
+def test_ssl_fallback_remembered_per_host(monkeypatch):
+    # Після першої SSL-помилки інші рядки хосту одразу йдуть без перевірки SSL, а помилка і прапорець лишаються в кожному рядку
+    verified_attempts = []
+
+    def fake_head(url, verify=True, **kwargs):
+        if verify:
+            verified_attempts.append(url)
+            failed = requests.Request("HEAD", url).prepare()
+            reason = urllib3.exceptions.SSLError("certificate verify failed")
+            raise requests.exceptions.SSLError(
+                urllib3.exceptions.MaxRetryError(None, failed.path_url, reason=reason), request=failed)
+        return _FakeResponse(url, b"")
+
+    monkeypatch.setattr(request_processor.http_session, "head", fake_head)
+    monkeypatch.setattr(request_processor, "_finish_robots_cache", lambda: None)
+    monkeypatch.setattr(request_processor, "get_dns_cache", lambda: None)
+    page_cache = PageCache(path=None)
+    monkeypatch.setattr(request_processor, "get_page_cache", lambda: page_cache)
+    ssl_policy = SslPolicyCache(path=None)
+    monkeypatch.setattr(request_processor, "get_ssl_policy", lambda: ssl_policy)
+    rows = [{"Url": "https://bad.com/a"}, {"Url": "https://bad.com/b?x=1"}, {"Url": "https://other.com/"}]
+    results = request_processor.check_status_code_requests(rows, fetch_mode=request_processor.FETCH_MODE_HEAD)
+
+    assert verified_attempts == ["https://bad.com/a", "https://other.com/"]
+    assert [r["ssl_disabled"] for r in results] == [True, True, True]
+    assert "url: /a (Caused by SSLError" in results[0]["error"]
+    assert results[1]["error"] == ("SSL вимкнено: SSLError: перевірку SSL для bad.com:443 не пройдено раніше "
+                                   "(certificate verify failed)")
+    assert all(r["error"].startswith("SSL вимкнено: ") and r["final_status_code"] == 200 for r in results)
+    assert ssl_policy.hits == 1
+
+
+def test_ssl_fallback_recorded_for_redirect_origin(monkeypatch):
+    # SSL-помилка на хості редиректу запам'ятовується і для хосту Url: інші рядки того ж хосту йдуть без перевірки SSL
+    verified_attempts = []
+
+    def fake_head(url, verify=True, **kwargs):
+        if verify:
+            verified_attempts.append(url)
+            failed = requests.Request("HEAD", "https://bad.com/target").prepare()
+            reason = urllib3.exceptions.SSLError("certificate verify failed")
+            raise requests.exceptions.SSLError(
+                urllib3.exceptions.MaxRetryError(None, failed.path_url, reason=reason), request=failed)
+        return _FakeResponse(url, b"")
+
+    monkeypatch.setattr(request_processor.http_session, "head", fake_head)
+    monkeypatch.setattr(request_processor, "_finish_robots_cache", lambda: None)
+    monkeypatch.setattr(request_processor, "get_dns_cache", lambda: None)
+    page_cache = PageCache(path=None)
+    monkeypatch.setattr(request_processor, "get_page_cache", lambda: page_cache)
+    ssl_policy = SslPolicyCache(path=None)
+    monkeypatch.setattr(request_processor, "get_ssl_policy", lambda: ssl_policy)
+    rows = [{"Url": "https://old.com/a"}, {"Url": "https://old.com/b"}]
+    results = request_processor.check_status_code_requests(rows, fetch_mode=request_processor.FETCH_MODE_HEAD)
+
+    assert verified_attempts == ["https://old.com/a"]
+    assert ssl_policy.fallback_error("https://bad.com/") is not None
+    assert results[1]["error"].startswith("SSL вимкнено: SSLError: перевірку SSL для old.com:443 не пройдено раніше")
+
+
+def test_page_cache_stats_do_not_create_cache(monkeypatch, tmp_path):
+    # Підсумок за запуск без збережених сторінок не створює файл сховища в робочому каталозі
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(page_cache_module, "_shared_cache", None)
+    request_processor._print_page_cache_stats()
+    assert page_cache_module.peek_page_cache() is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_stopped_page_covers_only_found_pairs():
+    # Тіло, обірване після знайдених пар іншого рядка, підходить лише рядкам, чиї пари на ньому є
+    page = request_processor.ParsedPage(PAGE)
+    fetched = request_processor._FetchedPage("https://donor.com/page", {}, page=page, stopped_early=True)
+    assert fetched.covers(("Анкор", "https://target.com/"))
+    assert not fetched.covers(("Анкор", "https://missing.com/"))
+    assert request_processor._FetchedPage("https://donor.com/page", {}, page=page).covers(("Анкор", "https://missing.com/"))
+
+
+@pytest.mark.parametrize("parse_workers", [0, 1])
+def test_unchanged_page_revalidated_with_etag(monkeypatch, tmp_path, parse_workers):
+    # Повторний запуск: умовний запит з If-None-Match, на 304 — збережені дані без завантаження тіла
+    # (і тоді, коли сторінку розбирав пул процесів)
+    requests_sent = []
+
+    def fake_get(url, headers=None, **kwargs):
+        requests_sent.append(headers.get("If-None-Match"))
+        if headers.get("If-None-Match") == '"v1"':
+            return _FakeResponse(url, b"", status_code=304)
+        return _FakeResponse(url, PAGE.encode("utf-8"), headers={"ETag": '"v1"', "X-Robots-Tag": "noindex"})
+
+    monkeypatch.setattr(request_processor.http_session, "get", fake_get)
+    monkeypatch.setattr(request_processor, "check_robots_txt", lambda *args, **kwargs: True)
+    monkeypatch.setattr(request_processor, "_finish_robots_cache", lambda: None)
+    monkeypatch.setattr(request_processor, "get_dns_cache", lambda: None)
+    rows = [{"Url": "https://donor.com/page", "Анкор-1": "Анкор", "Урл-1": "https://target.com/",
+             "Анкор-2": "Інше", "Урл-2": "https://other.com/"}]
+
+    runs = []
+    for _ in range(2):
+        # Кожен запуск відкриває збережені сторінки заново, як окремий процес
+        page_cache = PageCache(path=str(tmp_path / "pages.sqlite"))
+        monkeypatch.setattr(request_processor, "get_page_cache", lambda: page_cache)
+        runs.append(request_processor.check_status_code_requests([dict(row) for row in rows], fetch_mode=request_processor.FETCH_MODE_GET,
+                                                                 parse_workers=parse_workers))
+
+    assert requests_sent == [None, '"v1"']
+    assert page_cache.revalidated == 1
+    assert runs[1] == runs[0]
+    assert runs[1][0]["final_status_code"] == 200
+    assert runs[1][0]["indexing_directives"]["source"] == "X-Robots-Tag"
+
+
+@pytest.mark.parametrize("max_concurrency", [None, 4])
+def test_chunked_run_matches_single_run(monkeypatch, capsys, max_concurrency):
+    # Перевірка частинами в межах одного check_run: ті самі результати і запити, що й одним викликом,
+    # повторні Url з інших частин не запитуються заново, пул з'єднань налаштовується і статистика виводиться один раз
+    requested = []
+
+    def fake_get(url, **kwargs):
+        requested.append(url)
+        if "missing" in url:
+            return _FakeResponse(url, b"", status_code=404)
+        return _FakeResponse(url, PAGE.encode("utf-8"))
+
+    pool_configured = []
+    monkeypatch.setattr(request_processor.http_session, "get", fake_get)
+    monkeypatch.setattr(request_processor.http_session, "configure_pool", lambda **kwargs: pool_configured.append(kwargs))
+    monkeypatch.setattr(request_processor, "check_robots_txt", lambda *args, **kwargs: True)
+    monkeypatch.setattr(request_processor, "_finish_robots_cache", lambda: None)
+    monkeypatch.setattr(request_processor, "get_dns_cache", lambda: None)
+    monkeypatch.setattr(request_processor, "get_ssl_policy", lambda: SslPolicyCache(path=None))
+    rows = [{"Url": f"https://donor{n % 3}.com/{'missing' if n % 5 == 4 else 'page'}/{n % 4}",
+             "Анкор-1": "Анкор" if n % 2 else "Інше", "Урл-1": "https://target.com/", "row_number": n + 2}
+            for n in range(11)]
+
+    runs = []
+    for chunk_size in (len(rows), 3):
+        requested.clear()
+        page_cache = PageCache(path=None)
+        monkeypatch.setattr(request_processor, "get_page_cache", lambda: page_cache)
+        finished = []
+        with request_processor.check_run(fetch_mode=request_processor.FETCH_MODE_GET, on_result=lambda row, result: finished.append(result),
+                                         max_concurrency=max_concurrency, min_host_delay=0) as run:
+            results = [result for start in range(0, len(rows), chunk_size)
+                       for result in run.check([dict(row) for row in rows[start:start + chunk_size]])]
+        assert request_processor._coalescer is None
+        output = capsys.readouterr().out
+        assert output.count("📊 РЕЗУЛЬТАТИ ПЕРЕВІРКИ") == 1
+        assert f"📊 РЕЗУЛЬТАТИ ПЕРЕВІРКИ {len(rows)} URL:" in output
+        assert sorted(r["row_number"] for r in finished) == [row["row_number"] for row in rows]
+        runs.append((results, sorted(requested)))
+
+    assert runs[1] == runs[0]
+    # Кожен унікальний Url запитано один раз на запуск, хоч би в скількох частинах він був
+    assert len(runs[0][1]) == len({row["Url"] for row in rows})
+    assert len(pool_configured) == (0 if max_concurrency is None else 2)
@@ -0,0 +1,48 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль results_store
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import results_store
+from results_store import ResultsStore, row_key
+
+
+ROW = {"Url": "https://donor.com/page", "Анкор-1": "Анкор", "Урл-1": "https://target.com/",
+       "Анкор-2": None, "Урл-2": None, "row_number": 2}
+
+
+def _result(row, final_status_code=200):
+    return {"url": row["Url"], "final_status_code": final_status_code, "url1_found": "Так", **row}
+
+
+def test_row_key_depends_on_content_only():
+    # Номер рядка і порожні пари не впливають на ключ, зміна анкора — впливає
+    assert row_key(ROW) == row_key({**ROW, "row_number": 7, "Анкор-3": "", "Урл-3": None})
+    assert row_key(ROW) != row_key({**ROW, "Анкор-1": "Інший анкор"})
+    assert row_key(ROW) != row_key({**ROW, "Url": "https://donor.com/other"})
+
+
+def test_split_rows_reuses_fresh_results(tmp_path):
+    # Свіжі результати беруться зі сховища (з поточним номером рядка), нові й змінені рядки — до перевірки
+    store = ResultsStore(path=str(tmp_path / "results.sqlite"))
+    store.put_many([(ROW, _result(ROW))])
+    moved = {**ROW, "row_number": 5}
+    edited = {**ROW, "Анкор-1": "Новий", "row_number": 6}
+
+    results, pending = store.split_rows([moved, edited])
+    assert pending == [1]
+    assert results[0]["url1_found"] == "Так" and results[0]["row_number"] == 5
+    assert results[1] is None
+
+
+def test_split_rows_rechecks_stale_and_failed(tmp_path, monkeypatch):
+    # Застарілі результати і рядки з невдалим запитом (статус 0) перевіряються знову
+    store = ResultsStore(path=str(tmp_path / "results.sqlite"))
+    failed = {**ROW, "Url": "https://down.com/"}
+    store.put_many([(ROW, _result(ROW)), (failed, _result(failed, final_status_code=0))])
+    assert store.split_rows([ROW, failed])[1] == [1]
+
+    later = time.time() + 2 * results_store.DEFAULT_MAX_AGE
+    monkeypatch.setattr(results_store.time, "time", lambda: later)
+    assert store.split_rows([ROW, failed])[1] == [0, 1]
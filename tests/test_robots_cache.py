@@ -0,0 +1,70 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль robots_cache
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+import robots_cache
+
+
+ROBOTS_TEXT = "User-agent: *\nDisallow: /private\n\nUser-agent: Googlebot\nDisallow: /\n"
+
+
+def _fake_fetch(calls, status=200, text=ROBOTS_TEXT, error=None):
+    # Підміна мережевого запиту: рахуємо виклики і повертаємо готовий запис
+    def fetch(origin, verify_ssl=True):
+        calls.append(origin)
+        return {"status": status, "text": text, "error": error, "fetched_at": time.time()}
+    return fetch
+
+
+def test_one_fetch_per_origin_for_all_user_agents(monkeypatch):
+    # Для одного origin robots.txt завантажується один раз, а відповіді різні для різних user-agent
+    calls = []
+    monkeypatch.setattr(robots_cache, "_fetch_robots", _fake_fetch(calls))
+    cache = robots_cache.RobotsCache(path=None)
+    assert cache.can_fetch("https://site.com/page", "*")[0] is True
+    assert cache.can_fetch("https://site.com/private/x", "*")[0] is False
+    assert cache.can_fetch("https://site.com/page", "Googlebot")[0] is False
+    assert calls == ["https://site.com"]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_missing_or_failed_robots_allows(monkeypatch):
+    # 404 та помилки мережі трактуються як "дозволено"
+    monkeypatch.setattr(robots_cache, "_fetch_robots", _fake_fetch([], status=404, text=""))
+    assert robots_cache.RobotsCache(path=None).can_fetch("https://a.com/x", "*")[0] is True
+    monkeypatch.setattr(robots_cache, "_fetch_robots", _fake_fetch([], status=None, text="", error="timeout"))
+    assert robots_cache.RobotsCache(path=None).can_fetch("https://a.com/x", "*")[0] is True
+
+
+def test_persisted_between_runs(monkeypatch, tmp_path):
+    # Збережений на диск запис використовується наступним запуском без мережі
+    calls = []
+    monkeypatch.setattr(robots_cache, "_fetch_robots", _fake_fetch(calls))
+    path = str(tmp_path / "robots.json")
+    first = robots_cache.RobotsCache(path=path)
+    first.can_fetch("https://site.com/", "*")
+    first.save()
+
+    second = robots_cache.RobotsCache(path=path)
+    assert second.can_fetch("https://site.com/private/", "*")[0] is False
+    assert calls == ["https://site.com"]
+
+
+def test_expired_and_failed_entries_not_reused(monkeypatch, tmp_path):
+    # Прострочені записи ігноруються, а помилки мережі взагалі не зберігаються на диск
+    calls = []
+    monkeypatch.setattr(robots_cache, "_fetch_robots", _fake_fetch(calls))
+    path = str(tmp_path / "robots.json")
+    cache = robots_cache.RobotsCache(path=path, ttl=0)
+    cache.can_fetch("https://site.com/", "*")
+    cache.save()
+    robots_cache.RobotsCache(path=path, ttl=0).can_fetch("https://site.com/", "*")
+    assert len(calls) == 2
+
+    monkeypatch.setattr(robots_cache, "_fetch_robots", _fake_fetch(calls, status=None, text="", error="timeout"))
+    failed = robots_cache.RobotsCache(path=path)
+    failed.can_fetch("https://down.com/", "*")
+    failed.save()
+    assert "https://down.com" not in robots_cache.RobotsCache(path=path)._entries
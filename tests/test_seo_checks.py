@@ -0,0 +1,114 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль seo_checks
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from urllib.parse import urljoin
+
+import seo_checks
+from html_stream import HtmlStreamExtractor
+
+
+PAGE = (
+    '<html><head><meta name="robots" content="noindex"><link rel="canonical" href="/canon"></head>'
+    '<body><a href="https://target.com" rel="nofollow">Анкор</a><a href="/inner">Інше</a></body></html>'
+)
+
+
+def test_parsed_page_parses_once(monkeypatch):
+    # Усі три перевірки використовують один DOM: еталонний бекенд викликає BeautifulSoup лише раз
+    calls = []
+    original = seo_checks.BeautifulSoup
+
+    def counting_soup(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(seo_checks, "BeautifulSoup", counting_soup)
+    page = seo_checks.ParsedPage(PAGE, seo_checks.PARSER_BACKEND_BS4)
+    url = "https://donor.com/page"
+    directives = seo_checks.check_indexing_directives(url, {}, page)
+    canonical = seo_checks.check_canonical_tag(url, page)
+    links = seo_checks.check_links_on_page(page, url, "Анкор", "https://target.com", None, None, None, None)
+
+    assert len(calls) == 1
+    assert directives == {'noindex': True, 'nofollow': False, 'source': 'Meta Robots'}
+    assert canonical == "https://donor.com/canon"
+    assert (links["url1_found"], links["anchor1_match"], links["url1_rel"]) == ("Так", "Так", "nofollow")
+
+
+def test_parsed_page_lazy_extracts():
+    # Витягнуті дані кешуються на об'єкті
+    page = seo_checks.ParsedPage(PAGE)
+    assert page.robots_meta == {'name': 'robots', 'content': 'noindex'}
+    assert page.canonical_href == "/canon"
+    assert [link['href'] for link in page.links] == ["https://target.com", "/inner"]
+    assert page.normalized_links("https://donor.com/")[1]['url'] == "https://donor.com/inner"
+    assert page.normalized_links("https://donor.com/") is page.normalized_links("https://donor.com/")
+
+
+def test_checks_still_accept_html_string():
+    # Зворотна сумісність: функції й далі приймають HTML-рядок
+    assert seo_checks.check_canonical_tag("https://donor.com/canon", PAGE) == "https://donor.com/canon"
+
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "pages")
+PAGE_FILES = sorted(name for name in os.listdir(PAGES_DIR) if name.endswith(".html"))
+
+
+def _check_all(page, url, pairs):
+    # Результати всіх перевірок сторінки разом із тим, що вони вивели
+    return (
+        seo_checks.check_indexing_directives(url, {}, page),
+        seo_checks.check_canonical_tag(url, page),
+        seo_checks.check_links_on_page(page, url, *pairs),
+    )
+
+
+@pytest.mark.parametrize("name", PAGE_FILES)
+def test_stream_backend_matches_bs4_on_saved_pages(name, capsys):
+    # Потоковий екстрактор і BeautifulSoup дають однакові дані та результати перевірок на збережених сторінках
+    with open(os.path.join(PAGES_DIR, name), encoding="utf-8") as f:
+        html = f.read()
+    stream = seo_checks.ParsedPage(html, seo_checks.PARSER_BACKEND_STREAM)
+    reference = seo_checks.ParsedPage(html, seo_checks.PARSER_BACKEND_BS4)
+    assert stream.robots_meta == reference.robots_meta
+    assert stream.canonical_href == reference.canonical_href
+    assert stream.links == reference.links
+
+    url = "https://example.com/page/"
+    for link in reference.links[:6]:
+        pairs = (link['text'], urljoin(url, link['href']), "інший анкор", urljoin(url, link['href']), None, None)
+        stream_results = _check_all(stream, url, pairs)
+        stream_output = capsys.readouterr().out
+        assert stream_results == _check_all(reference, url, pairs)
+        assert stream_output == capsys.readouterr().out
+
+
+def test_stream_backend_from_network_chunks():
+    # Екстрактор, якому HTML подавався байтовими фрагментами, дає ту саму сторінку
+    with open(os.path.join(PAGES_DIR, "blog_article.html"), "rb") as f:
+        data = f.read()
+    extractor = HtmlStreamExtractor()
+    for i in range(0, len(data), 5):
+        extractor.feed_bytes(data[i:i + 5])
+    page = seo_checks.ParsedPage.from_extractor(extractor)
+    reference = seo_checks.ParsedPage(data.decode("utf-8"), seo_checks.PARSER_BACKEND_BS4)
+    assert (page.robots_meta, page.canonical_href, page.links) == (reference.robots_meta, reference.canonical_href, reference.links)
+
+
+def test_links_any_number_of_pairs():
+    # П'ять пар: однакові пари отримують різні посилання, одне посилання — не більше одного точного збігу
+    html = (
+        '<a href="https://t.com/a">A</a><a href="https://t.com/a">A</a>'
+        '<a href="https://t.com/b" rel="sponsored">B</a><a href="https://t.com/c">інший</a>'
+    )
+    pairs = ("A", "https://t.com/a", "A", "https://t.com/a", "A", "https://t.com/a",
+             "B", "https://t.com/b", "C", "https://t.com/c")
+    results = seo_checks.check_links_on_page(html, "https://donor.com/", *pairs)
+    assert [(results[f"url{n}_found"], results[f"anchor{n}_match"]) for n in range(1, 6)] == [
+        ("Так", "Так"), ("Так", "Так"), ("Ні", "Ні"), ("Так", "Так"), ("Так", "Ні")
+    ]
+    assert results["url4_rel"] == "sponsored"
+    assert "url6_found" not in results
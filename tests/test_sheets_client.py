@@ -0,0 +1,124 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль sheets_client
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+import gspread
+import pytest
+
+from sheets_client import SheetsClient, SheetsWriteError, TokenBucket, MIN_WRITE_REQUEST_BYTES
+
+
+class _FakeClock:
+    # Годинник і sleep без реального очікування: sleep лише просуває час
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class _FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ""
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": f"fake {self.status_code}", "status": "FAKE"}}
+
+
+class _FakeSpreadsheet:
+    """Локальна заміна Sheets API: застосовує values_batch_update до сітки комірок,
+       відповідає 429, якщо за хвилину надійшло більше запитів, ніж дозволяє квота,
+       і 413 на запити, більші за max_request_bytes.
+    """
+
+    def __init__(self, clock, quota_per_minute=60, max_request_bytes=None):
+        self.clock = clock
+        self.quota = quota_per_minute
+        self.max_request_bytes = max_request_bytes
+        self.cells = {}
+        self.accepted = []
+        self.rejected = []
+
+    def values_batch_update(self, body):
+        window = [t for t in self.accepted if t > self.clock() - 60]
+        if len(window) >= self.quota:
+            self.rejected.append(429)
+            raise gspread.exceptions.APIError(_FakeResponse(429, {"Retry-After": "5"}))
+        if self.max_request_bytes and len(json.dumps(body, ensure_ascii=False).encode("utf-8")) > self.max_request_bytes:
+            self.rejected.append(413)
+            raise gspread.exceptions.APIError(_FakeResponse(413))
+        self.accepted.append(self.clock())
+        for entry in body["data"]:
+            self.cells[entry["range"]] = entry["values"]
+        return {}
+
+
+def _entries(count, size=100):
+    return [{"range": f"'Аркуш'!A{row}:B{row}", "values": [["x" * size, str(row)]]} for row in range(2, count + 2)]
+
+
+def test_token_bucket_spreads_requests_over_quota():
+    # Після підрядних burst запитів решта йде з інтервалом 60 / rate секунд
+    clock = _FakeClock()
+    bucket = TokenBucket(60, burst=5, clock=clock, sleep=clock.sleep)
+    for _ in range(8):
+        bucket.acquire()
+    assert clock.sleeps == [pytest.approx(1.0)] * 3
+    assert bucket.waited == pytest.approx(3.0)
+
+
+def test_rate_limited_writes_back_off_on_429_without_losing_data():
+    # Квота сервера менша за клієнтську: 429 з Retry-After повторюється, жоден запис не втрачено
+    clock = _FakeClock()
+    backend = _FakeSpreadsheet(clock, quota_per_minute=3)
+    client = SheetsClient(write_per_minute=600, max_request_bytes=300, clock=clock, sleep=clock.sleep)
+    calls, _ = client.batch_write(backend, _entries(6))
+
+    assert calls == 6 and len(backend.cells) == 6
+    assert 429 in backend.rejected and min(clock.sleeps) >= 2
+    assert client.retries == backend.rejected.count(429) and client.failed_writes == 0
+
+
+def test_batch_size_shrinks_after_413_without_losing_data():
+    # Завеликий пакет ділиться навпіл до прийнятного розміру; кожен блок записано рівно один раз
+    clock = _FakeClock()
+    backend = _FakeSpreadsheet(clock, quota_per_minute=1000, max_request_bytes=40 * 1024)
+    client = SheetsClient(write_per_minute=6000, max_request_bytes=256 * 1024, clock=clock, sleep=clock.sleep)
+    entries = _entries(200, size=1000)
+    client.batch_write(backend, entries)
+
+    assert len(backend.cells) == 200 and client.failed_writes == 0
+    assert backend.rejected and set(backend.rejected) == {413}
+    assert MIN_WRITE_REQUEST_BYTES <= client.request_bytes <= 256 * 1024
+    assert client.writes == len(backend.accepted)
+
+
+def test_failed_batch_reported_with_its_ranges():
+    # Пакет, відхилений і після поділу до найменшого розміру, не губиться мовчки: решта записується, а його діапазони — у винятку
+    clock = _FakeClock()
+    backend = _FakeSpreadsheet(clock, quota_per_minute=1000)
+    rejected_range = "'Аркуш'!A3:B3"
+
+    def values_batch_update(body):
+        if any(entry["range"] == rejected_range for entry in body["data"]):
+            backend.rejected.append(400)
+            raise gspread.exceptions.APIError(_FakeResponse(400))
+        return _FakeSpreadsheet.values_batch_update(backend, body)
+
+    backend.values_batch_update = values_batch_update
+    client = SheetsClient(write_per_minute=6000, max_request_bytes=300, clock=clock, sleep=clock.sleep)
+    with pytest.raises(SheetsWriteError) as error:
+        client.batch_write(backend, _entries(3))
+    assert error.value.failed_ranges == [rejected_range]
+    assert error.value.calls == 2 and set(backend.cells) == {"'Аркуш'!A2:B2", "'Аркуш'!A4:B4"}
+    assert client.failed_writes == 1
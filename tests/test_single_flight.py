@@ -0,0 +1,83 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль single_flight
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_compute_once():
+    # Паралельні виклики з одним ключем чекають на перше обчислення і отримують його результат
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "page"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = executor.submit(flight.run, "url", compute)
+        started.wait(5)
+        others = [executor.submit(flight.run, "url", compute) for _ in range(3)]
+        release.set()
+        assert first.result() == ("page", False)
+        assert [job.result() for job in others] == [("page", True)] * 3
+    assert len(calls) == 1
+    assert (flight.hits, flight.misses) == (3, 1)
+
+
+def test_expected_count_releases_result():
+    # Після останнього очікуваного звернення результат більше не тримається в пам'яті
+    flight = SingleFlight()
+    flight.expect("url", 2)
+    assert flight.run("url", lambda: 1) == (1, False)
+    assert flight.get("url") == 1
+    assert flight.run("url", lambda: 2) == (1, True)
+    assert flight.get("url") is None
+
+
+def test_max_entries_evicts_oldest():
+    # Зберігається не більше max_entries результатів, найдавніший витісняється
+    flight = SingleFlight(max_entries=2)
+    for key in ("a", "b", "c"):
+        flight.run(key, lambda key=key: key.upper())
+    assert flight.get("a") is None
+    assert (flight.get("b"), flight.get("c")) == ("B", "C")
+
+
+def test_failed_compute_is_retried():
+    # Виняток не кешується: наступний виклик обчислює результат заново
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("timeout")
+
+    with pytest.raises(ValueError):
+        flight.run("url", fail)
+    assert flight.run("url", lambda: "ok") == ("ok", False)
+
+
+def test_expectations_add_up_and_released_results_kept():
+    # Очікування з кількох частин запуску додаються; звільнений результат тримається, доки не витіснять новіші
+    flight = SingleFlight(keep_released=1)
+    flight.expect("a", 1)
+    flight.expect("a", 1)
+    assert flight.run("a", lambda: "A") == ("A", False)
+    assert flight.run("a", lambda: "?") == ("A", True)
+    # Усі очікування використано, але результат ще в пам'яті: нова частина з тим самим ключем його отримує
+    flight.expect("a", 1)
+    assert flight.run("a", lambda: "?") == ("A", True)
+    flight.expect("b", 1)
+    assert flight.run("b", lambda: "B") == ("B", False)
+    # Звільнених результатів не більше keep_released: "a" витіснено новішим "b"
+    assert flight.get("a") is None
+    assert flight.get("b") == "B"
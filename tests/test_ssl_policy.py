@@ -0,0 +1,52 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль ssl_policy
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import time
+
+import requests
+import urllib3
+
+from ssl_policy import SslPolicyCache, host_key
+
+
+REASON = "[SSL: CERTIFICATE_VERIFY_FAILED] certificate verify failed"
+ERROR = requests.exceptions.SSLError(
+    urllib3.exceptions.MaxRetryError(None, "/old", reason=urllib3.exceptions.SSLError(REASON)))
+FALLBACK = f"SSLError: перевірку SSL для bad.com:443 не пройдено раніше ({REASON})"
+
+
+def test_policy_keyed_by_host_and_port():
+    # Сертифікат залежить від хосту і порту: інший порт того самого хосту перевіряється як зазвичай
+    policy = SslPolicyCache(path=None)
+    policy.record("https://Bad.com/old", ERROR)
+    assert host_key("https://bad.com/x") == host_key("https://bad.com:443/y") == "bad.com:443"
+    assert policy.fallback_error("https://bad.com:8443/x") is None
+    # Текст помилки стосується хосту: однаковий для будь-якого шляху, без розбору повідомлення urllib3
+    assert policy.fallback_error("https://bad.com/new?q=1") == policy.fallback_error("https://bad.com/old") == FALLBACK
+    assert policy.hits == 2
+
+
+def test_policy_persisted_between_runs_with_ttl(tmp_path):
+    # Збережені хости діють у наступному запуску, доки не минув TTL
+    path = str(tmp_path / "ssl_policy.json")
+    policy = SslPolicyCache(path=path)
+    policy.record("https://bad.com/old", ERROR)
+    policy.save()
+
+    assert SslPolicyCache(path=path).fallback_error("https://bad.com/old") == FALLBACK
+    assert SslPolicyCache(path=None).fallback_error("https://bad.com/old") is None
+
+    expired = SslPolicyCache(path=path, ttl=60)
+    expired._entries["bad.com:443"]["recorded_at"] = time.time() - 120
+    assert expired.fallback_error("https://bad.com/old") is None
+
+
+def test_old_format_entries_ignored(tmp_path):
+    # Записи з текстом помилки замість класу і причини (попередній формат файлу) не використовуються
+    path = tmp_path / "ssl_policy.json"
+    path.write_text(json.dumps({"bad.com:443": {"error": "текст", "path": "/old", "recorded_at": time.time()}}),
+                    encoding="utf-8")
+    assert SslPolicyCache(path=str(path)).fallback_error("https://bad.com/old") is None
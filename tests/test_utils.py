@@ -189,3 +189,78 @@ def test_detect_encoding_windows1251_for_cyrillic(monkeypatch):
     monkeypatch.setattr(utils, 'chardet', types.SimpleNamespace(detect=fake_detect))
     data = bytes([0xC0, 0xC1, 0xD0, 0xE0])
     assert utils.detect_encoding(data) == 'windows-1251'
+
+
+# ------------------------ TEST get_origin ------------------------
+
+
+def test_get_origin_basic():
+    # Схема і хост у нижньому регістрі, шлях і параметри відкидаються
+    assert utils.get_origin("HTTPS://Example.COM/path?x=1") == "https://example.com"
+
+
+def test_get_origin_keeps_port():
+    # Порт є частиною origin
+    assert utils.get_origin("http://example.com:8080/a") == "http://example.com:8080"
+
+
+def test_get_origin_invalid():
+    # Порожні значення та URL без схеми/хосту → None
+    assert utils.get_origin("") is None
+    assert utils.get_origin(None) is None
+    assert utils.get_origin("example.com/page") is None
+
+
+# ------------------------ TEST get_link_pair_numbers ------------------------
+
+
+def test_get_link_pair_numbers_dynamic_columns():
+    # Пари 1-3 є завжди, додаткові Анкор-N/Урл-N знаходяться за назвами стовпців
+    headers = ["Анкор-1", "Урл-1", "Url", "Урл-7", "Анкор-10", "Урл-10", "Інше", "Анкор-x"]
+    assert utils.get_link_pair_numbers(headers) == [1, 2, 3, 7, 10]
+
+
+def test_get_link_pair_numbers_min_pairs():
+    # min_pairs=0 повертає лише номери, що реально зустрічаються
+    assert utils.get_link_pair_numbers(["Анкор-2", "Url"], min_pairs=0) == [2]
+
+
+# ------------------------ TEST normalize_texts / кеш ------------------------
+
+
+def test_normalize_texts_matches_single_calls():
+    # Пакетна нормалізація дає той самий результат, що й виклики normalize_text по одному
+    texts = ["  Hello   World ", "Café", None, "", 0, 12345, "Привіт\tсвіт", "Café", "ÁÉÍÓÚ", "ﬁ ①"]
+    assert utils.normalize_texts(texts) == [utils.normalize_text(text) for text in texts]
+
+
+def test_normalize_text_cache_counts_hits():
+    # Повторний текст береться з кешу
+    before = utils.normalize_text_cache_info()
+    utils.normalize_text("Унікальний текст для кешу")
+    utils.normalize_text("Унікальний текст для кешу")
+    after = utils.normalize_text_cache_info()
+    assert after.misses - before.misses == 1
+    assert after.hits - before.hits == 1
+
+
+def test_detect_encoding_tiers_before_chardet(monkeypatch):
+    # Заголовок, BOM і <meta charset> визначають кодування без виклику chardet
+    def failing_detect(b):
+        raise AssertionError("chardet не мав викликатися")
+    monkeypatch.setattr(utils, 'chardet', types.SimpleNamespace(detect=failing_detect))
+    assert utils.detect_encoding(b'<html>', 'text/html; charset=Windows-1251') == 'cp1251'
+    assert utils.detect_encoding(b'\xef\xbb\xbf<html>', 'text/html') == 'utf-8-sig'
+    assert utils.detect_encoding(b'<head><meta charset="koi8-r">') == 'koi8-r'
+    assert utils.detect_encoding(b'<meta http-equiv="Content-Type" content="text/html; charset=utf-16">') == 'utf-8'
+    assert utils.ENCODING_DETECTION_STATS['meta'] >= 2
+
+
+def test_detect_encoding_chardet_gets_bounded_sample(monkeypatch):
+    # chardet бачить лише вибірку; UTF-8 за її межами не плутається з windows-1251
+    seen = []
+    fake_detect = lambda b: seen.append(len(b)) or {'encoding': 'ascii'}
+    monkeypatch.setattr(utils, 'chardet', types.SimpleNamespace(detect=fake_detect))
+    data = b'a' * (utils.CHARDET_SAMPLE_BYTES + 10) + 'Привіт'.encode('utf-8')
+    assert utils.detect_encoding(data) == 'utf-8'
+    assert seen == [utils.CHARDET_SAMPLE_BYTES]
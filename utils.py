@@ -1,5 +1,10 @@
+import os
 import re
+import codecs
+import threading
 import unicodedata
+from collections import Counter
+from functools import lru_cache
 import chardet
 from urllib.parse import urlparse, parse_qs, urlunparse, unquote
 
@@ -7,20 +12,70 @@ from urllib.parse import urlparse, parse_qs, urlunparse, unquote
 # 1. УТИЛІТНІ ФУНКЦІЇ
 #
 
+# Папка для локальних кешів між запусками (robots.txt тощо)
+CACHE_DIR = os.environ.get("OUTRICH_CACHE_DIR", ".checker_cache")
+
+# Визначення кодування: скільки байт початку сторінки шукати <meta charset> і скільки давати chardet
+META_CHARSET_SCAN_BYTES = 4096
+CHARDET_SAMPLE_BYTES = 64 * 1024
+META_CHARSET_RE = re.compile(rb'<meta[^>]*?charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+HIGH_BYTE_RE = re.compile(rb'[\xc0-\xff]')
+# UTF-32 LE перевіряється раніше за UTF-16 LE, бо їхні BOM починаються однаково
+ENCODING_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'), (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+# Скільки разів кожне джерело (header, bom, meta, chardet) визначило кодування
+ENCODING_DETECTION_STATS = Counter()
+_encoding_stats_lock = threading.Lock()
+
+# Стовпці пар посилань: Анкор-N / Урл-N. Пари 1-3 входять у базовий формат таблиці
+LINK_PAIR_COLUMN_RE = re.compile(r'^(?:Анкор|Урл)-(\d+)$')
+DEFAULT_LINK_PAIRS = 3
+
+# Скільки різних нормалізованих текстів тримати в пам'яті (тексти меню повторюються на тисячах сторінок)
+NORMALIZE_TEXT_CACHE_SIZE = 65536
+
+@lru_cache(maxsize=NORMALIZE_TEXT_CACHE_SIZE)
+def _normalize_text_cached(text):
+    lowered = text.lower()
+    # Для ASCII NFKD нічого не змінює і комбінувальних знаків немає
+    if lowered.isascii():
+        return " ".join(lowered.split())
+    # NFKD розкладає символи на базові та комбінувальні знаки
+    nfkd_form = unicodedata.normalize('NFKD', lowered)
+    # Фільтруємо символи, що не є пробілами (видаляємо діакритику)
+    normalized = "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+    # Нормалізуємо пробіли (видаляємо зайві)
+    return " ".join(normalized.split())
+
 def normalize_text(text):
-    """Нормалізує текст: нижній регістр, видалення діакритики та зайвих пробілів."""
+    """Нормалізує текст: нижній регістр, видалення діакритики та зайвих пробілів.
+       Результати кешуються (див. normalize_text_cache_info).
+    """
     if not text: return ""
     try:
-        # NFKD розкладає символи на базові та комбінувальні знаки
-        nfkd_form = unicodedata.normalize('NFKD', str(text).lower())
-        # Фільтруємо символи, що не є пробілами (видаляємо діакритику)
-        normalized = "".join([c for c in nfkd_form if not unicodedata.combining(c)])
-        # Нормалізуємо пробіли (видаляємо зайві)
-        return " ".join(normalized.split())
+        return _normalize_text_cached(str(text))
     except Exception:
         # У випадку помилки повертаємо оригінальний текст у нижньому регістрі
         return str(text).lower().strip()
 
+def normalize_texts(texts):
+    """Нормалізує список текстів за один виклик; однакові тексти обчислюються один раз."""
+    normalized = {}
+    result = []
+    for text in texts:
+        key = text if isinstance(text, str) else str(text) if text else ""
+        if key not in normalized:
+            normalized[key] = normalize_text(text)
+        result.append(normalized[key])
+    return result
+
+def normalize_text_cache_info():
+    """Статистика кешу normalize_text: hits, misses, maxsize, currsize."""
+    return _normalize_text_cached.cache_info()
+
 def normalize_url(url_string):
     """Нормалізує URL, додаючи слеш до кореневого шляху, якщо він відсутній."""
     if not url_string: return url_string
@@ -52,15 +107,88 @@ def is_ssl_error(error_text):
     return any(keyword.lower() in error_text.lower() for keyword in
               ['ssl', 'certificate', 'cert', 'handshake', 'verify', 'verification', 'CERTIFICATE_VERIFY_FAILED'])
 
-def detect_encoding(html_content_bytes):
-    """Визначає кодування HTML-контенту."""
-    # Спробуємо визначити кодування за допомогою chardet
-    detected = chardet.detect(html_content_bytes)
+def detect_encoding(html_content_bytes, content_type=None):
+    """Визначає кодування HTML-контенту, від найдешевшого джерела до найдорожчого:
+       charset із Content-Type, BOM, <meta charset> на початку сторінки і лише потім chardet на обмеженій вибірці.
+       Яке джерело спрацювало, рахується в ENCODING_DETECTION_STATS.
+    """
+    encoding, tier = _detect_encoding_tiered(html_content_bytes, content_type)
+    with _encoding_stats_lock:
+        ENCODING_DETECTION_STATS[tier] += 1
+    return encoding
+
+def _detect_encoding_tiered(html_content_bytes, content_type):
+    # 1. charset із заголовка Content-Type
+    header_charset = get_charset_from_content_type(content_type)
+    if header_charset:
+        return header_charset, "header"
+
+    # 2. BOM (лише якщо після нього є вміст)
+    for bom, bom_encoding in ENCODING_BOMS:
+        if html_content_bytes.startswith(bom) and len(html_content_bytes) > len(bom):
+            return bom_encoding, "bom"
+
+    # 3. <meta charset> або <meta http-equiv="Content-Type"> на початку сторінки
+    match = META_CHARSET_RE.search(html_content_bytes[:META_CHARSET_SCAN_BYTES])
+    if match:
+        try:
+            meta_charset = codecs.lookup(match.group(1).decode('ascii')).name
+        except LookupError:
+            meta_charset = None
+        if meta_charset:
+            # Якщо meta прочитався як ASCII, сторінка не може бути в UTF-16/32
+            return ('utf-8' if meta_charset.startswith(('utf-16', 'utf-32')) else meta_charset), "meta"
+
+    # 4. Статистичне визначення chardet на вибірці
+    sample = html_content_bytes[:CHARDET_SAMPLE_BYTES]
+    detected = chardet.detect(sample)
     encoding = detected['encoding']
 
     # Якщо визначено як ascii, але є кириличні символи, використовуємо windows-1251
-    if encoding == 'ascii' and any(b >= 0xC0 for b in html_content_bytes):
+    # (байти за межами вибірки chardet не бачив — вони можуть бути й UTF-8)
+    if encoding == 'ascii' and HIGH_BYTE_RE.search(html_content_bytes):
         encoding = 'windows-1251'
+        if len(html_content_bytes) > len(sample) and not HIGH_BYTE_RE.search(sample):
+            try:
+                html_content_bytes.decode('utf-8')
+                encoding = 'utf-8'
+            except UnicodeDecodeError:
+                pass
 
     # Перевіряємо чи знайдено валідне кодування, інакше використовуємо utf-8
-    return encoding if encoding else 'utf-8' 
\ No newline at end of file
+    return (encoding if encoding else 'utf-8'), "chardet"
+
+def get_origin(url):
+    """Повертає origin URL (схема://хост[:порт]) у нижньому регістрі або None, якщо URL некоректний."""
+    if not url: return None
+    try:
+        parsed = urlparse(str(url).strip())
+    except Exception:
+        return None
+    if not parsed.scheme or not parsed.netloc: return None
+    return f"{parsed.scheme}://{parsed.netloc}".lower()
+
+def get_charset_from_content_type(content_type):
+    """Витягує charset із заголовка Content-Type (або None, якщо його немає чи він невідомий)."""
+    if not content_type: return None
+    match = re.search(r'charset\s*=\s*["\']?([\w.:-]+)', str(content_type), re.IGNORECASE)
+    if not match: return None
+    try:
+        return codecs.lookup(match.group(1)).name
+    except LookupError:
+        return None
+
+def get_mime_type(content_type):
+    """Повертає MIME-тип без параметрів у нижньому регістрі ('text/html; charset=utf-8' → 'text/html')."""
+    return str(content_type or "").split(';', 1)[0].strip().lower()
+
+def get_link_pair_numbers(names, min_pairs=DEFAULT_LINK_PAIRS):
+    """Повертає відсортовані номери пар N, для яких серед names (заголовки таблиці або ключі рядка)
+       є стовпець Анкор-N або Урл-N. Пари 1..min_pairs повертаються завжди.
+    """
+    numbers = set(range(1, min_pairs + 1))
+    for name in names:
+        match = LINK_PAIR_COLUMN_RE.match(str(name))
+        if match and int(match.group(1)) > 0:
+            numbers.add(int(match.group(1)))
+    return sorted(numbers)